@@ -0,0 +1,356 @@
+# analyzer/batch.py
+# OBIXConfig Doctor - vectorized (NumPy) versions of the analyzer hot paths
+# ผลลัพธ์ต้องตรงกับ path แบบ scalar ใน app.py ทุกค่า (ใช้สูตรและลำดับการคำนวณเดียวกัน)
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analyzer.drone_class import CLASS_INDEX, detect_drone_class_batch
+from analyzer.flight_sim import PROFILE_NAMES, flight_minutes_batch
+from analyzer.thrust_table import THRUST_TABLE
+from logic.inputs import BUILD_DEFAULTS, BUILD_SCHEMA, battery_cells, safe_float, safe_int
+from logic.presets import PRESETS
+from logic.results import ANALYZER_BASELINES, CLASS_BASELINES, RowMessages, freeze
+from logic.rules import RULES
+from logic.schema import InputError
+
+# -----------------------
+# Category codes
+# -----------------------
+BATTERIES = ("4S", "6S")            # code len(BATTERIES) = unknown
+BATTERY_CELLS = np.array([4.0, 6.0, np.nan])  # cells per battery code (labels outside BATTERIES: battery_cells_column)
+
+# rule tables (data/rules.json): codes below index the outcomes of each rule
+PITCH_RULE = RULES["pitch"]
+BLADES_RULE = RULES["blades"]
+RECOMMEND_RULE = RULES["recommend"]
+WEIGHT_CLASS_RULE = RULES["weight_class"]
+FLIGHT_PROFILE_RULE = RULES["flight_profile"]
+
+EFFICIENCY_LABELS = PITCH_RULE.values["efficiency"]
+GRIP_LABELS = BLADES_RULE.values["grip"]
+WEIGHT_CLASS_LABELS = WEIGHT_CLASS_RULE.values["label"]
+CONFIDENCE_LEVELS = np.array(["LOW", "MEDIUM", "HIGH"], dtype=object)
+# flight_profile rule outcome -> index into flight_sim.PROFILE_NAMES
+FLIGHT_PROFILE_CODES = np.array([PROFILE_NAMES.index(p) for p in FLIGHT_PROFILE_RULE.values["profile"]], dtype=np.int8)
+FLIGHT_PROFILE_LABELS = np.array(PROFILE_NAMES, dtype=object)
+DEFAULT_FLIGHT_PROFILE = PROFILE_NAMES.index(FLIGHT_PROFILE_RULE.outcome({"style": BUILD_DEFAULTS["style"]})["profile"])
+
+ANALYZER_CLASS_KEYS = np.array(CLASS_INDEX.keys, dtype=object)
+
+# max rows per /api/analyze/batch request
+BATCH_MAX_ROWS = 10000
+# classes listed per row in the soft classification ranking
+CLASS_TOP_K = 3
+
+
+# -----------------------
+# Column coercion
+# -----------------------
+def _column(values: Any, n: int) -> Optional[Sequence[Any]]:
+    if values is None:
+        return None
+    if isinstance(values, (list, tuple)):
+        if len(values) != n:
+            raise ValueError("column length mismatch")
+        return values
+    # scalar -> broadcast
+    return [values] * n
+
+
+def category_codes(values: Any, n: int, labels: Sequence[str], default: str) -> np.ndarray:
+    values = _column(values, n)
+    if values is None:
+        return np.full(n, labels.index(default), dtype=np.int8)
+    arr = np.asarray(values, dtype=object)
+    codes = np.full(n, len(labels), dtype=np.int8)
+    for i, label in enumerate(labels):
+        codes[arr == label] = i
+    return codes
+
+
+# -----------------------
+# Vectorized analyzer kernels
+# -----------------------
+def analyze_propeller_batch(pitch: np.ndarray, blades: np.ndarray) -> Dict[str, np.ndarray]:
+    """Vectorized analyze_propeller(): pitch / blade rule codes + noise/motor_load."""
+    columns = {"pitch": pitch, "blades": blades}
+    pitch_tier = PITCH_RULE.codes(columns)
+    blade_tier = BLADES_RULE.codes(columns)
+    return {
+        "pitch_tier": pitch_tier,
+        "blade_tier": blade_tier,
+        "noise": PITCH_RULE.take("noise", pitch_tier) + BLADES_RULE.take("noise", blade_tier),
+        "motor_load": PITCH_RULE.take("load", pitch_tier) + BLADES_RULE.take("load", blade_tier),
+    }
+
+
+def calculate_thrust_weight_batch(motor_load: np.ndarray, weight: np.ndarray) -> np.ndarray:
+    """Unrounded (motor_load * 100) / weight; 0 where weight == 0."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = (motor_load * 100) / weight
+    return np.where(weight == 0, 0.0, ratio)
+
+
+def thrust_ratio_batch(
+    motor_load: np.ndarray,
+    weight: np.ndarray,
+    prop_size: np.ndarray,
+    pitch: np.ndarray,
+    blades: np.ndarray,
+    cells: np.ndarray,
+) -> np.ndarray:
+    """Unrounded thrust-to-weight: measured thrust tables where they cover the build, else the motor_load formula."""
+    heuristic = calculate_thrust_weight_batch(motor_load, weight)
+    if THRUST_TABLE is None:
+        return heuristic
+    measured = THRUST_TABLE.thrust_ratio_batch(prop_size, pitch, blades, cells, weight)
+    return np.where(np.isnan(measured), heuristic, measured)
+
+
+def battery_cells_column(battery: np.ndarray) -> np.ndarray:
+    """Cells per row from the pack label ("2S" -> 2.0, once per distinct label); nan when not <n>S."""
+    labels, inverse = np.unique(np.asarray(battery, dtype=object).astype(str), return_inverse=True)
+    cells = np.array([np.nan if (c := battery_cells(label)) is None else float(c) for label in labels.tolist()])
+    return cells[inverse.reshape(np.shape(battery))]
+
+
+def estimate_battery_runtime_batch(weight: np.ndarray, battery_code: np.ndarray) -> np.ndarray:
+    """Unrounded runtime (minutes); 0 for unknown packs, nan where weight == 0."""
+    base = 3.5
+    cells = np.where(battery_code == 0, 4, 6)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        runtime = base * (1500 / 1000) / weight * cells
+    runtime = np.where(weight == 0, np.nan, runtime)
+    return np.where(battery_code >= len(BATTERIES), 0.0, runtime)
+
+
+def classify_weight_batch(size: np.ndarray, weight: np.ndarray) -> np.ndarray:
+    """Vectorized classify_weight(): codes into WEIGHT_CLASS_LABELS."""
+    return WEIGHT_CLASS_RULE.codes({"size": size, "weight": weight}).astype(np.int8)
+
+
+def confidence_level_batch(score: np.ndarray) -> np.ndarray:
+    """Codes into CONFIDENCE_LEVELS (same thresholds as analyze_drone())."""
+    return np.where(score >= 70, 2, np.where(score >= 40, 1, 0)).astype(np.int8)
+
+
+def validation_masks(
+    size: np.ndarray,
+    weight: np.ndarray,
+    prop_size: np.ndarray,
+    pitch: np.ndarray,
+    blades: np.ndarray,
+) -> List[Tuple[np.ndarray, str]]:
+    """One (row mask, message) pair per validate_input() check."""
+    columns = {"size": size, "weight": weight, "prop_size": prop_size, "pitch": pitch, "blades": blades}
+    return RULES.masks("validate", columns, "warn")
+
+
+def validate_input_batch(
+    size: np.ndarray,
+    weight: np.ndarray,
+    prop_size: np.ndarray,
+    pitch: np.ndarray,
+    blades: np.ndarray,
+) -> RowMessages:
+    """Vectorized validate_input(): one mask per check, expanded to per-row lists only in JSON."""
+    return RowMessages(size.shape[0], validation_masks(size, weight, prop_size, pitch, blades))
+
+
+# -----------------------
+# Whole pipeline
+# -----------------------
+def analyze_columns(
+    size: np.ndarray,
+    weight: np.ndarray,
+    battery_code: np.ndarray,
+    prop_size: np.ndarray,
+    pitch: np.ndarray,
+    blades: np.ndarray,
+    cells: Optional[np.ndarray] = None,
+    flight_profile: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Numeric part of the /app pipeline for already-coerced columns (cells default:
+    from battery_code; flight_profile = PROFILE_NAMES index per row, default: the default style's).
+    """
+    if cells is None:
+        cells = BATTERY_CELLS[battery_code]
+    if flight_profile is None:
+        flight_profile = np.full(size.shape, DEFAULT_FLIGHT_PROFILE, dtype=np.int8)
+    prop = analyze_propeller_batch(pitch, blades)
+    # every class scored at once; the reported confidence is the detected class's column
+    drone_class = detect_drone_class_batch(size, weight)
+    class_scores = CLASS_INDEX.score_matrix(size, weight)
+    confidence = class_scores[np.arange(len(drone_class)), drone_class]
+    return {
+        "pitch_tier": prop["pitch_tier"],
+        "blade_tier": prop["blade_tier"],
+        "noise": prop["noise"],
+        "motor_load": prop["motor_load"],
+        "thrust_ratio": thrust_ratio_batch(prop["motor_load"], weight, prop_size, pitch, blades, cells),
+        "battery_est": estimate_battery_runtime_batch(weight, battery_code),
+        "flight_profile": flight_profile,
+        "flight_time": flight_minutes_batch(weight, prop_size, cells, flight_profile),
+        "weight_class": classify_weight_batch(size, weight),
+        "drone_class": drone_class,
+        # one classification per build: detected_class is the drone class (as in /app)
+        "detected_class": drone_class,
+        "confidence_score": confidence,
+        "confidence_level": confidence_level_batch(confidence),
+        "class_scores": class_scores,
+    }
+
+
+def coerce_columns(data: Dict[str, Any], max_rows: int = BATCH_MAX_ROWS, strict: bool = True) -> Dict[str, Any]:
+    """
+    Turn a columnar JSON payload into typed arrays through BUILD_SCHEMA, applying
+    the form defaults and preset override per row. Raises ValueError on ragged
+    columns; rows the schema rejects raise InputError, or with strict=False are
+    flagged in "invalid" (bad fields hold their default) with the details in "checked".
+    """
+    lengths = [len(v) for v in data.values() if isinstance(v, (list, tuple))]
+    if not lengths:
+        raise ValueError("no columns given")
+    n = lengths[0]
+    if n > max_rows:
+        raise ValueError(f"too many rows (max {max_rows})")
+
+    checked = BUILD_SCHEMA.columns(data, n)
+    if strict and checked.invalid.any():
+        raise InputError(checked.errors(), checked.error_count)
+    c = checked.columns
+    size, weight, prop_size, pitch, blades = c["size"], c["weight"], c["prop_size"], c["pitch"], c["blades"]
+    battery, style, preset = c["battery"], c["style"], c["preset"]
+
+    # override with preset (one mask per preset key, not per row)
+    for key, p in PRESETS.items():
+        rows = preset == key
+        if not rows.any():
+            continue
+        size[rows] = safe_float(p.get("size"))
+        weight[rows] = safe_float(p.get("weight"))
+        prop_size[rows] = safe_float(p.get("prop_size"))
+        pitch[rows] = safe_float(p.get("pitch"))
+        blades[rows] = safe_int(p.get("blades"))
+        battery[rows] = p.get("battery")
+        style[rows] = p.get("style")
+
+    return {
+        "n": n,
+        "size": size,
+        "weight": weight,
+        "prop_size": prop_size,
+        "pitch": pitch,
+        "blades": blades,
+        "battery": battery,
+        "style": style,
+        "battery_code": category_codes(list(battery), n, BATTERIES, BUILD_DEFAULTS["battery"]),
+        "cells": battery_cells_column(battery),
+        "flight_profile": FLIGHT_PROFILE_CODES[FLIGHT_PROFILE_RULE.codes({"style": style})],
+        "preset": preset,
+        "invalid": checked.invalid,
+        "checked": checked,
+    }
+
+
+def round_like_python(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    np.round() with Python round() results. Only values sitting next to a
+    rounding tie (where x * 10**n loses precision) go through round().
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    out = np.round(scaled) / scale
+    near = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    idx = np.flatnonzero(near & np.isfinite(values))
+    if idx.size:
+        out.flat[idx] = [round(v, ndigits) for v in values.flat[idx].tolist()]
+    return out
+
+
+def _rounded(values: np.ndarray, ndigits: int, zero_rows: Optional[np.ndarray] = None) -> List[Any]:
+    # round_like_python keeps the output bit-identical to the scalar round(); nan -> None, zero rows -> int 0
+    values = np.asarray(values, dtype=np.float64)
+    out = round_like_python(values, ndigits).astype(object)
+    out[np.isnan(values)] = None
+    if zero_rows is not None:
+        out = np.where(zero_rows, 0, out)
+    return out.tolist()
+
+
+# per-class baselines (same values as baseline_stage), built once at import
+LOOKUP_TABLES = freeze({
+    "classes": {
+        key: {
+            "description": ANALYZER_BASELINES[key]["class_meta"]["description"],
+            "pid_baseline": frag["pid_baseline"],
+            "filter_baseline": frag["filter_baseline"],
+        }
+        for key, frag in CLASS_BASELINES.items()
+    },
+})
+
+
+def class_ranking(scores: np.ndarray, k: int = CLASS_TOP_K) -> Dict[str, List[Any]]:
+    """
+    Top-k classes per row from a score_matrix(): keys, scores and share of
+    the row's total score (a probability-like distribution over all classes).
+    """
+    idx, top = CLASS_INDEX.top_k(scores, k)
+    total = scores.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(total > 0, top / total, 0.0)
+    return {
+        "class_top": ANALYZER_CLASS_KEYS[idx].tolist(),
+        "class_top_score": top.tolist(),
+        "class_top_share": round_like_python(share, 3).tolist(),
+    }
+
+
+def result_columns(cols: Dict[str, Any], res: Dict[str, np.ndarray]) -> Dict[str, List[Any]]:
+    """JSON-ready output columns (same values as the scalar analysis dict)."""
+    zero_w = cols["weight"] == 0
+    unknown_pack = cols["battery_code"] >= len(BATTERIES)
+    return {
+        "preset_used": [p or "custom" for p in cols["preset"].tolist()],
+        "weight_class": WEIGHT_CLASS_LABELS[res["weight_class"]].tolist(),
+        "thrust_ratio": _rounded(res["thrust_ratio"], 2, zero_w),
+        "battery_est": _rounded(res["battery_est"], 1, unknown_pack),
+        "flight_profile": FLIGHT_PROFILE_LABELS[res["flight_profile"]].tolist(),
+        "flight_time": _rounded(res["flight_time"], 1),
+        "noise": res["noise"].tolist(),
+        "motor_load": res["motor_load"].tolist(),
+        "efficiency": EFFICIENCY_LABELS[res["pitch_tier"]].tolist(),
+        "grip": GRIP_LABELS[res["blade_tier"]].tolist(),
+        "recommendation": RECOMMEND_RULE.take("recommendation", RECOMMEND_RULE.codes(cols)).tolist(),
+        "drone_class": ANALYZER_CLASS_KEYS[res["drone_class"]].tolist(),
+        "detected_class": ANALYZER_CLASS_KEYS[res["detected_class"]].tolist(),
+        "confidence_score": res["confidence_score"].tolist(),
+        "confidence_level": CONFIDENCE_LEVELS[res["confidence_level"]].tolist(),
+        **class_ranking(res["class_scores"]),
+    }
+
+
+def analyze_coerced(cols: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    return analyze_columns(
+        cols["size"], cols["weight"], cols["battery_code"],
+        cols["prop_size"], cols["pitch"], cols["blades"], cols["cells"], cols["flight_profile"],
+    )
+
+
+def analyze_batch(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Columnar batch version of the /app POST pipeline.
+    Input: {"size": [...], "weight": [...], ...}; output columns line up by row.
+    Per-class baselines are returned once under "lookup" instead of per row.
+    """
+    cols = coerce_columns(data)
+    results = result_columns(cols, analyze_coerced(cols))
+    results["warnings"] = validate_input_batch(
+        cols["size"], cols["weight"], cols["prop_size"], cols["pitch"], cols["blades"]
+    )
+    return {"count": cols["n"], "results": results, "lookup": LOOKUP_TABLES}
@@ -0,0 +1,320 @@
+# analyzer/bf_dump.py
+# OBIXConfig Doctor - Betaflight CLI `diff` / `diff all` / `dump` parser + bulk baseline comparison
+#
+# parse ครั้งเดียวต่อไฟล์ (single pass) เก็บ `set name = value` แยก master / profile / rateprofile
+# ชื่อ setting ถูก intern ครั้งเดียว (KEY_INDEX) ทุก dump จึงใช้ key object เดียวกัน
+#   parse_dump(): ครบทุก setting (วนทีละบรรทัด)
+#   scan_dump():  เฉพาะ setting ที่ต้องเทียบ (regex pass เดียว) — ใช้ตอน compare หลายพันไฟล์
+#
+# usage:
+#   python -m analyzer.bf_dump configs/ --size 5
+#   python -m analyzer.bf_dump quad1.txt quad2.txt --class freestyle_5 --tolerance 0.15
+
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from analyzer.drone_class import DRONE_CLASSES, detect_drone_class
+from logic.presets import get_baseline_for_class
+
+# setting name -> interned str (shared by every parsed dump)
+KEY_INDEX: Dict[str, str] = {}
+
+# our field -> Betaflight setting names, newest first (4.3+ then 4.0-4.2)
+SETTING_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "roll.p": ("p_roll",), "roll.i": ("i_roll",), "roll.d": ("d_roll",),
+    "pitch.p": ("p_pitch",), "pitch.i": ("i_pitch",), "pitch.d": ("d_pitch",),
+    "yaw.p": ("p_yaw",), "yaw.i": ("i_yaw",), "yaw.d": ("d_yaw",),
+    "gyro_lpf2": ("gyro_lpf2_static_hz", "gyro_lowpass2_hz"),
+    "dterm_lpf1": ("dterm_lpf1_static_hz", "dterm_lowpass_hz"),
+    "dyn_notch": ("dyn_notch_count",),
+}
+
+# `diff` only lists changed values: missing keys fall back to Betaflight 4.3 defaults
+BF_DEFAULTS: Dict[str, float] = {
+    "roll.p": 45, "roll.i": 80, "roll.d": 40,
+    "pitch.p": 47, "pitch.i": 84, "pitch.d": 46,
+    "yaw.p": 45, "yaw.i": 80, "yaw.d": 0,
+    "gyro_lpf2": 500, "dterm_lpf1": 75, "dyn_notch": 3,
+}
+
+DEFAULT_TOLERANCE = 0.20
+
+# every setting compare_dump() may read
+COMPARE_SETTINGS: Tuple[str, ...] = tuple(n for names in SETTING_ALIASES.values() for n in names)
+
+
+class ParsedDump(NamedTuple):
+    name: str
+    version: str
+    board: str
+    craft_name: str
+    master: Dict[str, str]
+    profiles: Dict[int, Dict[str, str]]
+    rateprofiles: Dict[int, Dict[str, str]]
+    active_profile: int
+
+    def get(self, key: str) -> Optional[str]:
+        """Active PID profile first, then master scope."""
+        profile = self.profiles.get(self.active_profile)
+        if profile is not None and key in profile:
+            return profile[key]
+        return self.master.get(key)
+
+
+# -----------------------
+# Parser
+# -----------------------
+def _key(name: str) -> str:
+    key = KEY_INDEX.get(name)
+    if key is None:
+        key = KEY_INDEX[name] = sys.intern(name)
+    return key
+
+
+def parse_dump(lines: Iterable[str], name: str = "") -> ParsedDump:
+    """Full parse: single pass over CLI output; unknown commands are skipped."""
+    master: Dict[str, str] = {}
+    profiles: Dict[int, Dict[str, str]] = {}
+    rateprofiles: Dict[int, Dict[str, str]] = {}
+    scope = master
+    active = 0
+    version = board = craft = ""
+
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            continue
+        c = line[0]
+        if c == "s" and line.startswith("set "):
+            setting, sep, value = line[4:].partition("=")
+            if sep:
+                scope[_key(setting.strip())] = value.strip()
+        elif c == "#":
+            if not version and line.startswith("# Betaflight"):
+                version = line[2:]
+        elif c == "p" and line.startswith("profile "):
+            try:
+                active = int(line[8:])
+            except ValueError:
+                continue
+            scope = profiles.setdefault(active, {})
+        elif c == "r" and line.startswith("rateprofile "):
+            try:
+                scope = rateprofiles.setdefault(int(line[12:]), {})
+            except ValueError:
+                continue
+        elif c == "b" and line.startswith("board_name "):
+            board = line[11:].strip()
+        elif c == "n" and line.startswith("name "):
+            # pre-4.3 craft name command
+            craft = line[5:].strip()
+
+    craft = master.get("craft_name", craft) or craft
+    return ParsedDump(name, version, board, craft, master, profiles, rateprofiles, active)
+
+
+# compiled scanner per requested key set
+_SCANNERS: Dict[Tuple[str, ...], "re.Pattern[str]"] = {}
+
+
+def _scanner(keys: Tuple[str, ...]) -> "re.Pattern[str]":
+    pattern = _SCANNERS.get(keys)
+    if pattern is None:
+        for k in keys:
+            _key(k)
+        names = "|".join(re.escape(k) for k in sorted(keys, key=len, reverse=True))
+        # every branch starts at a line break, so the regex engine only stops at "\n"
+        pattern = _SCANNERS[keys] = re.compile(
+            r"\n(?:set (%s) =[ \t]*([^\r\n]*)|(profile|rateprofile) (\d+)|board_name ([^\r\n]*)"
+            r"|name ([^\r\n]*)|# (Betaflight[^\r\n]*))" % names
+        )
+    return pattern
+
+
+def scan_dump(text: str, keys: Iterable[str], name: str = "") -> ParsedDump:
+    """
+    Keyed parse for comparisons: one regex pass that only stops on the
+    requested settings and section markers, so cost tracks file size
+    instead of the number of `set` lines.
+    """
+    keys = tuple(keys)
+    if "craft_name" not in keys:
+        keys += ("craft_name",)
+    master: Dict[str, str] = {}
+    profiles: Dict[int, Dict[str, str]] = {}
+    rateprofiles: Dict[int, Dict[str, str]] = {}
+    scope = master
+    active = 0
+    version = board = craft = ""
+    for setting, value, section, idx, board_name, old_name, fw in _scanner(keys).findall("\n" + text):
+        if setting:
+            scope[KEY_INDEX[setting]] = value.strip()
+        elif section:
+            if section == "profile":
+                active = int(idx)
+                scope = profiles.setdefault(active, {})
+            else:
+                scope = rateprofiles.setdefault(int(idx), {})
+        elif board_name:
+            board = board_name.strip()
+        elif old_name:
+            craft = old_name.strip()
+        elif fw and not version:
+            version = fw.strip()
+    craft = master.pop("craft_name", craft) or craft
+    return ParsedDump(name, version, board, craft, master, profiles, rateprofiles, active)
+
+
+def parse_file(path: str, keys: Optional[Iterable[str]] = None) -> ParsedDump:
+    """Full parse, or a keyed scan when keys are given."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        if keys is None:
+            return parse_dump(f, os.path.basename(path))
+        return scan_dump(f.read(), keys, os.path.basename(path))
+
+
+def iter_dump_files(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in sorted(os.scandir(path), key=lambda e: e.name):
+                if entry.is_file() and not entry.name.startswith("."):
+                    yield entry.path
+        else:
+            yield path
+
+
+# -----------------------
+# Baseline + comparison
+# -----------------------
+def class_baseline(cls_key: str) -> Dict[str, Any]:
+    """
+    Flat {field: value} baseline for a class key. Keys of analyzer.drone_class
+    (per-axis PID) win; other keys come from get_baseline_for_class (roll/pitch P/I/D).
+    """
+    meta = DRONE_CLASSES.get(cls_key)
+    flat: Dict[str, Any] = {}
+    if meta is not None:
+        for axis, terms in meta.get("pid", {}).items():
+            for term, value in terms.items():
+                flat[f"{axis}.{term}"] = value
+        flat.update(meta.get("filter", {}))
+    else:
+        ctrl = get_baseline_for_class(cls_key)
+        pid = ctrl.get("pid", {})
+        for axis in ("roll", "pitch"):
+            for term in ("p", "i", "d"):
+                if term.upper() in pid:
+                    flat[f"{axis}.{term}"] = pid[term.upper()]
+        f = ctrl.get("filter", {})
+        flat["gyro_lpf2"] = f.get("gyro_cutoff")
+        flat["dterm_lpf1"] = f.get("dterm_lowpass")
+    return {k: v for k, v in flat.items() if v is not None}
+
+
+def resolve_class(cls_key: Optional[str] = None, size: Optional[float] = None,
+                  weight: Optional[float] = None) -> str:
+    if cls_key:
+        return cls_key
+    if size is None:
+        raise ValueError("need a class key or a frame size")
+    key, _meta = detect_drone_class(size, weight if weight is not None else 0)
+    if key is None:
+        raise ValueError("cannot detect class from size")
+    return key
+
+
+def compare_dump(dump: ParsedDump, baseline: Dict[str, Any],
+                 tolerance: float = DEFAULT_TOLERANCE) -> Dict[str, Any]:
+    """Per-field value vs baseline; deviations are |value - base| / base > tolerance."""
+    fields = []
+    deviations = []
+    for field, base in baseline.items():
+        raw = None
+        for setting in SETTING_ALIASES.get(field, ()):
+            raw = dump.get(setting)
+            if raw is not None:
+                break
+        source = "config"
+        if raw is None:
+            value: Optional[float] = BF_DEFAULTS.get(field)
+            source = "default"
+        else:
+            try:
+                value = float(raw)
+            except ValueError:
+                value = None
+        row = {"field": field, "value": value, "baseline": base, "source": source}
+        if value is not None:
+            row["delta"] = round(value - base, 2)
+            row["pct"] = round((value - base) / base * 100.0, 1) if base else None
+            if base and abs(value - base) / base > tolerance:
+                deviations.append(row)
+        fields.append(row)
+    return {
+        "name": dump.name,
+        "craft_name": dump.craft_name,
+        "board": dump.board,
+        "version": dump.version,
+        "active_profile": dump.active_profile,
+        "settings": len(dump.master) + sum(len(p) for p in dump.profiles.values()),
+        "ok": not deviations,
+        "deviations": deviations,
+        "fields": fields,
+    }
+
+
+def compare_many(dumps: Iterable[ParsedDump], cls_key: str,
+                 tolerance: float = DEFAULT_TOLERANCE) -> Dict[str, Any]:
+    baseline = class_baseline(cls_key)
+    if not baseline:
+        raise ValueError(f"no baseline for class {cls_key!r}")
+    quads = [compare_dump(d, baseline, tolerance) for d in dumps]
+    return {
+        "class": cls_key,
+        "tolerance": tolerance,
+        "baseline": baseline,
+        "count": len(quads),
+        "with_deviations": sum(1 for q in quads if not q["ok"]),
+        "quads": quads,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m analyzer.bf_dump",
+                                 description="compare Betaflight diff/dump files against a class baseline")
+    ap.add_argument("paths", nargs="+", help="dump files or directories")
+    ap.add_argument("--class", dest="cls", help="class key (analyzer.drone_class / presets)")
+    ap.add_argument("--size", type=float, help="frame size (inch) to detect the class")
+    ap.add_argument("--weight", type=float, help="AUW (g), refines class detection")
+    ap.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    ap.add_argument("--json", action="store_true", help="full JSON report")
+    args = ap.parse_args(argv)
+
+    try:
+        cls_key = resolve_class(args.cls, args.size, args.weight)
+        dumps = (parse_file(p, COMPARE_SETTINGS) for p in iter_dump_files(args.paths))
+        report = compare_many(dumps, cls_key, args.tolerance)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0
+    print(f"class {report['class']}  tolerance {report['tolerance']:.0%}  "
+          f"{report['with_deviations']}/{report['count']} quads deviate")
+    for q in report["quads"]:
+        label = q["craft_name"] or q["name"]
+        if q["ok"]:
+            print(f"  OK   {label}")
+            continue
+        devs = ", ".join(f"{d['field']} {d['value']:g} (base {d['baseline']:g}, {d['pct']:+.0f}%)" for d in q["deviations"])
+        print(f"  DIFF {label}: {devs}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
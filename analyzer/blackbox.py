@@ -0,0 +1,284 @@
+# analyzer/blackbox.py
+# OBIXConfig Doctor - Betaflight blackbox CSV (blackbox_decode / Explorer export) -> gyro noise spectrum
+#
+# อ่านไฟล์ทีละ block (memory คงที่ ไม่ว่า log จะใหญ่แค่ไหน) เอาเฉพาะคอลัมน์ time + gyro
+# แล้วทำ Welch PSD แบบ streaming: segment ละ nperseg ตัวอย่าง, Hann window, overlap 50%
+# peak ของ noise -> คำแนะนำ gyro_lpf2 / dterm_lpf1 / dyn_notch เทียบกับ baseline
+#
+# usage:
+#   python -m analyzer.blackbox LOG00001.csv --size 5
+
+import argparse
+import io
+import json
+import math
+import sys
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# unfiltered gyro (debug_mode = GYRO_SCALED / blackbox "gyroUnfilt") shows the noise the
+# filters have to remove; fall back to the filtered gyroADC trace
+GYRO_COLUMNS: Tuple[Tuple[str, ...], ...] = (
+    ("gyroUnfilt[0]", "gyroUnfilt[1]", "gyroUnfilt[2]"),
+    ("gyroADC[0]", "gyroADC[1]", "gyroADC[2]"),
+)
+TIME_COLUMNS = ("time (us)", "time")
+AXES = ("roll", "pitch", "yaw")
+
+BLOCK_BYTES = 8 << 20
+HEADER_SCAN_LINES = 400
+
+# filter recommendation limits (Hz)
+MIN_PEAK_HZ = 50.0
+GYRO_LPF_RANGE = (60, 500)
+DTERM_LPF_RANGE = (50, 300)
+PEAK_THRESHOLD_DB = 8.0
+
+
+# -----------------------
+# Streaming CSV parse
+# -----------------------
+def _split_header(line: bytes) -> List[str]:
+    return [c.strip().strip('"') for c in line.decode("utf-8", "replace").strip().split(",")]
+
+
+def find_columns(stream: BinaryIO) -> Tuple[int, Optional[int], Tuple[int, int, int], str]:
+    """
+    Skip the "key","value" preamble of Explorer exports, return
+    (column count, time column, gyro columns, gyro source name).
+    """
+    for _ in range(HEADER_SCAN_LINES):
+        line = stream.readline()
+        if not line:
+            break
+        names = _split_header(line)
+        for group in GYRO_COLUMNS:
+            if all(g in names for g in group):
+                time_col = next((names.index(t) for t in TIME_COLUMNS if t in names), None)
+                gyro = tuple(names.index(g) for g in group)
+                return len(names), time_col, gyro, group[0].split("[")[0]  # type: ignore[return-value]
+    raise ValueError("no gyroADC / gyroUnfilt columns found (blackbox_decode CSV expected)")
+
+
+def iter_blocks(stream: BinaryIO, usecols: Sequence[int], block_bytes: int = BLOCK_BYTES) -> Iterator[np.ndarray]:
+    """Yield float arrays (rows x len(usecols)) parsed from ~block_bytes of CSV at a time."""
+    while True:
+        buf = stream.read(block_bytes)
+        if not buf:
+            return
+        if not buf.endswith(b"\n"):
+            buf += stream.readline()
+        try:
+            rows = np.loadtxt(io.BytesIO(buf), delimiter=",", usecols=usecols, dtype=np.float64, ndmin=2)
+        except ValueError:
+            # blank / truncated fields: slow path, drop incomplete rows
+            rows = np.genfromtxt(io.BytesIO(buf), delimiter=",", usecols=usecols, dtype=np.float64,
+                                 invalid_raise=False)
+            rows = rows.reshape(-1, len(usecols))
+            rows = rows[~np.isnan(rows).any(axis=1)]
+        if len(rows):
+            yield rows
+
+
+# -----------------------
+# Streaming Welch PSD
+# -----------------------
+class WelchAccumulator:
+    """Averaged one-sided PSD over Hann-windowed, 50%-overlapped segments, fed in chunks."""
+
+    def __init__(self, nperseg: int = 2048, channels: int = 3):
+        self.nperseg = nperseg
+        self.step = nperseg // 2
+        self.window = np.hanning(nperseg)
+        self.win_power = float(np.sum(self.window ** 2))
+        self.carry = np.empty((0, channels))
+        self.power = np.zeros((channels, nperseg // 2 + 1))
+        self.segments = 0
+
+    def feed(self, samples: np.ndarray) -> None:
+        buf = np.concatenate([self.carry, samples]) if len(self.carry) else samples
+        count = (len(buf) - self.nperseg) // self.step + 1 if len(buf) >= self.nperseg else 0
+        if count > 0:
+            # (segments, channels, nperseg) view, no copy until the detrend
+            segs = np.lib.stride_tricks.sliding_window_view(buf, self.nperseg, axis=0)[::self.step][:count]
+            segs = segs - segs.mean(axis=2, keepdims=True)
+            spec = np.fft.rfft(segs * self.window, axis=2)
+            self.power += (spec.real ** 2 + spec.imag ** 2).sum(axis=0)
+            self.segments += count
+        self.carry = buf[count * self.step:].copy()
+
+    def psd(self, fs: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(freqs, psd per channel) in units^2/Hz."""
+        if not self.segments:
+            raise ValueError(f"log too short: need at least {self.nperseg} samples")
+        psd = self.power / (self.segments * fs * self.win_power)
+        psd[:, 1:-1] *= 2.0
+        return np.fft.rfftfreq(self.nperseg, 1.0 / fs), psd
+
+
+# -----------------------
+# Peaks -> filter recommendation
+# -----------------------
+def find_peaks(freqs: np.ndarray, psd_db: np.ndarray, threshold_db: float = PEAK_THRESHOLD_DB,
+               min_hz: float = MIN_PEAK_HZ, max_peaks: int = 5, min_spacing_hz: float = 20.0) -> List[Dict[str, float]]:
+    """Local maxima at least threshold_db above the median noise floor, strongest first."""
+    band = freqs >= min_hz
+    if band.sum() < 3:
+        return []
+    floor = float(np.median(psd_db[band]))
+    x = psd_db
+    local = np.zeros_like(x, dtype=bool)
+    local[1:-1] = (x[1:-1] > x[:-2]) & (x[1:-1] >= x[2:])
+    idx = np.nonzero(local & band & (x >= floor + threshold_db))[0]
+    peaks: List[Dict[str, float]] = []
+    for i in idx[np.argsort(x[idx])[::-1]]:
+        hz = float(freqs[i])
+        if any(abs(hz - p["hz"]) < min_spacing_hz for p in peaks):
+            continue
+        peaks.append({"hz": round(hz, 1), "db": round(float(x[i]), 1), "above_floor_db": round(float(x[i]) - floor, 1)})
+        if len(peaks) == max_peaks:
+            break
+    return peaks
+
+
+def _clamp5(value: float, lo: int, hi: int) -> int:
+    return int(min(hi, max(lo, 5 * round(value / 5))))
+
+
+def recommend_filters(peaks: List[Dict[str, float]], baseline: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Cutoffs sit below the lowest significant noise peak; never raise a
+    cutoff above the baseline, only lower it when the noise demands it.
+    """
+    baseline = baseline or {}
+    gyro = baseline.get("gyro_lpf2")
+    dterm = baseline.get("dterm_lpf1")
+    if not peaks:
+        return {
+            "gyro_lpf2": gyro,
+            "dterm_lpf1": dterm,
+            "dyn_notch": baseline.get("dyn_notch"),
+            "notch_range_hz": None,
+            "note": "ไม่พบ noise peak เด่น — ใช้ค่า baseline ได้",
+        }
+    lowest = min(p["hz"] for p in peaks)
+    highest = max(p["hz"] for p in peaks)
+    gyro_rec = _clamp5(0.8 * lowest, *GYRO_LPF_RANGE)
+    dterm_rec = _clamp5(0.6 * lowest, *DTERM_LPF_RANGE)
+    if gyro:
+        gyro_rec = min(gyro_rec, int(gyro))
+    if dterm:
+        dterm_rec = min(dterm_rec, int(dterm))
+    return {
+        "gyro_lpf2": gyro_rec,
+        "dterm_lpf1": dterm_rec,
+        "dyn_notch": min(5, max(1, len(peaks))),
+        "notch_range_hz": [_clamp5(0.8 * lowest, 50, 1000), _clamp5(1.2 * highest, 100, 1000)],
+        "note": f"noise peak ต่ำสุด ~{lowest:.0f} Hz — ตั้ง lowpass ต่ำกว่านั้นและให้ dynamic notch ครอบช่วง peak",
+    }
+
+
+# -----------------------
+# Entry points
+# -----------------------
+def _sample_rate(times_us: np.ndarray) -> float:
+    dt = np.diff(times_us)
+    dt = dt[dt > 0]
+    return 1e6 / float(np.median(dt)) if len(dt) else float("nan")
+
+
+def analyze_log(stream: BinaryIO, sample_rate: Optional[float] = None, nperseg: int = 2048,
+                baseline: Optional[Dict[str, Any]] = None, spectrum_bins: int = 256,
+                block_bytes: int = BLOCK_BYTES) -> Dict[str, Any]:
+    """Parse a blackbox CSV stream block by block and return spectrum, peaks and filter advice."""
+    if sample_rate is not None and not (math.isfinite(sample_rate) and sample_rate > 0):
+        raise ValueError("sample_rate must be a positive number (Hz)")
+    ncols, time_col, gyro_cols, source = find_columns(stream)
+    if time_col is None and not sample_rate:
+        raise ValueError("no time column: pass sample_rate")
+    usecols = ((time_col,) if time_col is not None else ()) + gyro_cols
+    acc = WelchAccumulator(nperseg, channels=3)
+    rows = 0
+    rates: List[float] = []
+    for block in iter_blocks(stream, usecols, block_bytes):
+        rows += len(block)
+        if time_col is not None:
+            # a few thousand deltas per block are plenty for the median
+            rates.append(_sample_rate(block[:4096, 0]))
+            acc.feed(block[:, 1:])
+        else:
+            acc.feed(block)
+    if not sample_rate:
+        rates = [r for r in rates if r == r]
+        if not rates:
+            raise ValueError("cannot infer sample rate from time column")
+        sample_rate = float(np.median(rates))
+
+    freqs, psd = acc.psd(sample_rate)
+    psd_db = 10.0 * np.log10(psd + 1e-12)
+    # roll + pitch drive the filter choice; yaw is reported separately
+    combined_db = 10.0 * np.log10(psd[:2].mean(axis=0) + 1e-12)
+    peaks = find_peaks(freqs, combined_db)
+    axis_peaks = {axis: find_peaks(freqs, psd_db[i], max_peaks=3) for i, axis in enumerate(AXES)}
+
+    # downsample for Chart.js (max per bin keeps peaks visible)
+    edges = np.linspace(0, len(freqs), min(spectrum_bins, len(freqs)) + 1).astype(int)
+    spectrum = {
+        "hz": [round(float(freqs[a:b].mean()), 1) for a, b in zip(edges[:-1], edges[1:])],
+        **{axis: [round(float(psd_db[i, a:b].max()), 1) for a, b in zip(edges[:-1], edges[1:])]
+           for i, axis in enumerate(AXES)},
+    }
+    return {
+        "source": source,
+        "rows": rows,
+        "sample_rate_hz": round(sample_rate, 1),
+        "duration_s": round(rows / sample_rate, 1),
+        "segments": acc.segments,
+        "resolution_hz": round(sample_rate / nperseg, 2),
+        "noise_floor_db": round(float(np.median(combined_db[freqs >= MIN_PEAK_HZ])), 1),
+        "peaks": peaks,
+        "axis_peaks": axis_peaks,
+        "spectrum": spectrum,
+        "baseline": baseline or {},
+        "recommendation": recommend_filters(peaks, baseline),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from analyzer.drone_class import DRONE_CLASSES, detect_drone_class
+    from logic.presets import get_baseline_for_class
+
+    ap = argparse.ArgumentParser(prog="python -m analyzer.blackbox", description="blackbox CSV gyro noise analysis")
+    ap.add_argument("log", help="blackbox_decode CSV ('-' = stdin)")
+    ap.add_argument("--size", type=float, help="frame size (inch) to pick the class baseline")
+    ap.add_argument("--sample-rate", type=float, help="override when the log has no time column")
+    ap.add_argument("--nperseg", type=int, default=2048)
+    ap.add_argument("--full", action="store_true", help="include the downsampled spectrum")
+    args = ap.parse_args(argv)
+
+    baseline = None
+    if args.size:
+        # class เดียวกับ /api/analyze (น้ำหนัก default) -> baseline ของ class นั้น
+        cls_key = detect_drone_class(args.size, 1.0)[0]
+        f = get_baseline_for_class(DRONE_CLASSES[cls_key]["baseline"]).get("filter", {})
+        baseline = {
+            "class": cls_key,
+            "gyro_lpf2": f.get("gyro_cutoff"),
+            "dterm_lpf1": f.get("dterm_lowpass"),
+            "dyn_notch": f.get("notch"),
+        }
+    stream = sys.stdin.buffer if args.log == "-" else open(args.log, "rb")
+    try:
+        report = analyze_log(stream, args.sample_rate, args.nperseg, baseline)
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+    if not args.full:
+        report.pop("spectrum")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
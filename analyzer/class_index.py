@@ -0,0 +1,143 @@
+# analyzer/class_index.py
+# OBIXConfig Doctor - precompiled size-interval index for drone class detection
+# สร้างครั้งเดียวตอน import: lookup แบบ O(log n) ด้วย bisect + nearest-centre fallback
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class ClassIndex:
+    """
+    Sorted, non-overlapping size intervals with an optional weight cap.
+
+    Same result as the old "first match, else nearest centre" scan: a size
+    inside interval i (and weight <= its cap) maps to i, anything else maps
+    to the class whose centre is nearest, the lower class winning ties.
+    """
+
+    def __init__(self, rows: Sequence[Tuple[str, float, float, float]]):
+        self.keys: List[str] = [r[0] for r in rows]
+        self.lo: List[float] = [float(r[1]) for r in rows]
+        self.hi: List[float] = [float(r[2]) for r in rows]
+        self.max_weight: List[float] = [float(r[3]) for r in rows]
+        self.centers: List[float] = [(lo + hi) / 2.0 for lo, hi in zip(self.lo, self.hi)]
+
+        for i in range(1, len(rows)):
+            if self.lo[i] <= self.hi[i - 1]:
+                raise ValueError(f"class intervals must be sorted and disjoint: {self.keys[i - 1]} / {self.keys[i]}")
+
+        self._lo = np.array(self.lo)
+        self._hi = np.array(self.hi)
+        self._max_weight = np.array(self.max_weight)
+        self._centers = np.array(self.centers)
+        # confidence penalties: no weight cap -> inf (penalty 0), zero-width interval -> span 1
+        self._weight_cap = np.where(np.isfinite(self._max_weight) & (self._max_weight != 0), self._max_weight, np.inf)
+        half_span = (self._hi - self._lo) / 2.0
+        self._half_span = np.where(half_span == 0, 1.0, half_span)
+        # same per-class constants as plain floats for the single-build scores()
+        self._score_rows = tuple(zip(self._weight_cap.tolist(), self.centers, self._half_span.tolist()))
+
+    @classmethod
+    def from_bounds(cls, classes: Dict[str, Dict[str, Any]]) -> "ClassIndex":
+        """Tables shaped like analyzer.drone_class.DRONE_CLASSES (min/max_size, max_weight)."""
+        return cls([
+            (key, meta["min_size"], meta["max_size"], meta.get("max_weight", float("inf")))
+            for key, meta in classes.items()
+        ])
+
+    @classmethod
+    def from_size_ranges(cls, classes: Dict[str, Dict[str, Any]]) -> "ClassIndex":
+        """Tables shaped like logic.presets.DRONE_CLASSES (size_range only)."""
+        return cls([
+            (key, meta["size_range"][0], meta["size_range"][1], float("inf"))
+            for key, meta in classes.items()
+        ])
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    # -----------------------
+    # scalar
+    # -----------------------
+    def nearest(self, size: float) -> int:
+        centers = self.centers
+        j = bisect_left(centers, size)
+        if j == 0:
+            return 0
+        if j == len(centers):
+            return j - 1
+        return j if abs(centers[j] - size) < abs(centers[j - 1] - size) else j - 1
+
+    def lookup(self, size: float, weight: Optional[float] = None) -> int:
+        i = bisect_right(self.lo, size) - 1
+        if i >= 0 and size <= self.hi[i] and (weight is None or weight <= self.max_weight[i]):
+            return i
+        return self.nearest(size)
+
+    # -----------------------
+    # vectorized
+    # -----------------------
+    def classify(self, sizes: Any, weights: Any = None) -> np.ndarray:
+        """Class index per row for arrays of sizes (and optional weights)."""
+        s = np.asarray(sizes, dtype=np.float64)
+        n = len(self.keys)
+
+        i = np.searchsorted(self._lo, s, side="right") - 1
+        ic = np.clip(i, 0, n - 1)
+        hit = (i >= 0) & (s <= self._hi[ic])
+        if weights is not None:
+            hit &= np.asarray(weights, dtype=np.float64) <= self._max_weight[ic]
+
+        j = np.searchsorted(self._centers, s, side="left")
+        jl = np.clip(j - 1, 0, n - 1)
+        jr = np.clip(j, 0, n - 1)
+        near = np.where(np.abs(self._centers[jr] - s) < np.abs(self._centers[jl] - s), jr, jl)
+        # nan never wins a distance comparison -> first class, like the scalar scan
+        near[np.isnan(s)] = 0
+        return np.where(hit, ic, near)
+
+    # -----------------------
+    # soft classification (every class at once)
+    # -----------------------
+    def score_matrix(self, sizes: Any, weights: Any) -> np.ndarray:
+        """
+        Confidence (0-100) of each row against every class: int64 (rows, classes).
+        100 - weight/cap penalty (up to 80) - distance from the size centre (up to 60).
+        """
+        s = np.asarray(sizes, dtype=np.float64).reshape(-1, 1)
+        w = np.asarray(weights, dtype=np.float64).reshape(-1, 1)
+        score = (
+            100.0
+            - np.minimum(np.maximum(w / self._weight_cap, 0), 2.0) * 40
+            - np.minimum(np.abs(s - self._centers) / self._half_span, 2.0) * 30
+        )
+        # nan size / weight -> 0 (no match) instead of an undefined int cast
+        return np.clip(np.nan_to_num(np.trunc(score), nan=0.0), 0, 100).astype(np.int64)
+
+    def scores(self, size: float, weight: float) -> List[int]:
+        """score_matrix() for one build as a plain loop (no array setup on the per-request path)."""
+        out = []
+        for cap, center, half_span in self._score_rows:
+            w = weight / cap
+            d = abs(size - center) / half_span
+            if w != w or d != d:
+                out.append(0)
+                continue
+            w = 0.0 if w < 0.0 else (2.0 if w > 2.0 else w)
+            d = 2.0 if d > 2.0 else d
+            score = int(100.0 - w * 40 - d * 30)  # at most 100
+            out.append(score if score > 0 else 0)
+        return out
+
+    @staticmethod
+    def top(scores: Sequence[int], k: int) -> List[int]:
+        """top_k() indexes for one row of scores(): best first, lower class wins ties."""
+        return sorted(range(len(scores)), key=lambda i: -scores[i])[:k]
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(class indexes, scores) of the k best classes per row, best first; lower class wins ties."""
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        return order, np.take_along_axis(scores, order, axis=1)
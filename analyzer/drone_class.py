@@ -1,13 +1,19 @@
 # analyzer/drone_class.py
 # OBIXConfig Doctor - Drone class detection + baseline PID/filter
 # เวอร์ชันแบบ conservative (safe baselines) — ขยายเพิ่มได้เรื่อย ๆ
+# ตารางนี้คือ class เดียวของ build (size + weight); "baseline" = key ของ logic.presets.BASELINE_CTRL
 
 from typing import Tuple, Dict, Any
 
+import numpy as np
+
+from analyzer.class_index import ClassIndex
+
 DRONE_CLASSES: Dict[str, Dict[str, Any]] = {
     "micro": {
         "min_size": 2.0, "max_size": 2.9, "max_weight": 150,
         "description": "Micro / Tiny whoop (2.0–2.9\")",
+        "baseline": "micro",
         "pid": {
             "roll":  {"p": 30, "i": 30, "d": 10},
             "pitch": {"p": 30, "i": 30, "d": 10},
@@ -18,6 +24,7 @@ DRONE_CLASSES: Dict[str, Dict[str, Any]] = {
     "whoop": {
         "min_size": 3.0, "max_size": 3.4, "max_weight": 300,
         "description": "Toothpick / small cine (3.0–3.4\")",
+        "baseline": "whoop",
         "pid": {
             "roll":  {"p": 36, "i": 36, "d": 14},
             "pitch": {"p": 36, "i": 36, "d": 14},
@@ -28,6 +35,7 @@ DRONE_CLASSES: Dict[str, Dict[str, Any]] = {
     "cine": {
         "min_size": 3.5, "max_size": 4.5, "max_weight": 700,
         "description": "Cine / mini (3.5–4.5\")",
+        "baseline": "mini",
         "pid": {
             "roll":  {"p": 42, "i": 45, "d": 22},
             "pitch": {"p": 42, "i": 45, "d": 22},
@@ -38,6 +46,7 @@ DRONE_CLASSES: Dict[str, Dict[str, Any]] = {
     "freestyle_5": {
         "min_size": 4.6, "max_size": 5.4, "max_weight": 1200,
         "description": "5\" Freestyle (4.6–5.4\")",
+        "baseline": "freestyle",
         "pid": {
             "roll":  {"p": 48, "i": 52, "d": 38},
             "pitch": {"p": 48, "i": 52, "d": 38},
@@ -48,6 +57,7 @@ DRONE_CLASSES: Dict[str, Dict[str, Any]] = {
     "mid_lr": {
         "min_size": 5.5, "max_size": 7.5, "max_weight": 2000,
         "description": "Mid / Long-range (5.5–7.5\")",
+        "baseline": "mid_lr",
         "pid": {
             "roll":  {"p": 36, "i": 40, "d": 20},
             "pitch": {"p": 36, "i": 40, "d": 20},
@@ -58,6 +68,7 @@ DRONE_CLASSES: Dict[str, Dict[str, Any]] = {
     "long_range": {
         "min_size": 7.6, "max_size": 10.0, "max_weight": 3500,
         "description": "Long Range / Cinematic (7.6–10\")",
+        "baseline": "long_range",
         "pid": {
             "roll":  {"p": 30, "i": 34, "d": 14},
             "pitch": {"p": 30, "i": 34, "d": 14},
@@ -67,11 +78,15 @@ DRONE_CLASSES: Dict[str, Dict[str, Any]] = {
     }
 }
 
+# precompiled once at import (sorted boundaries + nearest-centre fallback)
+CLASS_INDEX = ClassIndex.from_bounds(DRONE_CLASSES)
+
 
 def detect_drone_class(size: float, weight: float) -> Tuple[str, Dict[str, Any]]:
     """
     Return (class_key, class_meta) if matched, else (None, None).
-    Matching uses inclusive size ranges AND weight upper bound.
+    Matching uses inclusive size ranges AND weight upper bound,
+    otherwise the class with the nearest size centre.
     """
     try:
         s = float(size)
@@ -79,18 +94,10 @@ def detect_drone_class(size: float, weight: float) -> Tuple[str, Dict[str, Any]]
     except Exception:
         return None, None
 
-    for key, meta in DRONE_CLASSES.items():
-        if meta["min_size"] <= s <= meta["max_size"] and w <= meta["max_weight"]:
-            return key, meta
+    key = CLASS_INDEX.keys[CLASS_INDEX.lookup(s, w)]
+    return key, DRONE_CLASSES[key]
 
-    # fallback: choose nearest by size center
-    best = None
-    best_dist = None
-    for key, meta in DRONE_CLASSES.items():
-        center = (meta["min_size"] + meta["max_size"]) / 2.0
-        dist = abs(center - s)
-        if best is None or dist < best_dist:
-            best = key
-            best_dist = dist
 
-    return best, DRONE_CLASSES.get(best)
\ No newline at end of file
+def detect_drone_class_batch(sizes, weights) -> np.ndarray:
+    """Vectorized detect_drone_class(): index into CLASS_INDEX.keys per row."""
+    return CLASS_INDEX.classify(sizes, weights)
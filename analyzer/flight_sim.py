@@ -0,0 +1,315 @@
+# analyzer/flight_sim.py
+# OBIXConfig Doctor - time-stepped LiPo discharge simulator for flight-time estimates
+#
+# ต่อ build: กำลังตอน hover จาก momentum theory (น้ำหนัก + ขนาดใบพัด) แล้วจำลองการคายประจุทีละวินาที
+# ตาม throttle profile (hover / cruise / freestyle / race = แรงขับเป็นเท่าของตอน hover ต่อวินาที วนซ้ำ)
+#   แรงดัน cell = OCV(SoC) - กระแส x ความต้านทานภายใน (sag), กระแสแก้จาก P = V x I
+#   จบเมื่อใช้ไป 80% ของความจุ, แรงดันขณะมีโหลดต่ำกว่า cutoff หรือกระแสเกิน C-rating
+#
+# กำลังต่อ cell ต่อ Ah (q = W / (cells x Ah)) กำหนดผลทั้งหมด (ความต้านทานคิดแบบ แปรผกผันกับความจุ)
+# จึงจำลองทุก profile x grid ของ q ครั้งเดียว (ทุกแถวพร้อมกันใน numpy array) แล้ว cache เป็นเส้นโค้งต่อ profile
+# query ทีละ build / ทั้ง column = np.interp บนเส้นของ profile นั้น
+#
+#   python -m analyzer.flight_sim weight=750 prop=5 battery=4S
+#   python -m analyzer.flight_sim weight=750 prop=5 battery=4S capacity=1300
+
+import argparse
+import math
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from logic.inputs import battery_cells
+
+# default pack per cell count (capacity mAh) when the build only names "<n>S"
+PACK_CAPACITY_MAH: Dict[int, float] = {1: 300.0, 2: 450.0, 3: 650.0, 4: 1500.0, 5: 1300.0, 6: 1500.0}
+C_RATING = 75.0            # max continuous current = C x capacity
+IR_OHM_AH = 0.012          # internal resistance per cell x capacity (Ah): 1500 mAh -> 8 mOhm
+CUTOFF_V = 3.2             # loaded volts per cell
+RESERVE = 0.2              # land with 20% left
+DT = 1.0                   # seconds per step
+MAX_SECONDS = 3600.0
+
+# LiPo open-circuit voltage per cell vs state of charge
+OCV_SOC = np.array([0.0, 0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0])
+OCV_V = np.array([3.27, 3.61, 3.69, 3.73, 3.77, 3.79, 3.82, 3.87, 3.92, 3.97, 4.06, 4.20])
+
+# hover power (momentum theory): P = T^1.5 / sqrt(2 rho A) per rotor / (figure of merit x drive efficiency)
+MOTORS = 4
+RHO = 1.225                # kg / m^3
+G = 9.80665
+FIGURE_OF_MERIT = 0.55
+DRIVE_EFFICIENCY = 0.75    # motor + ESC
+
+# thrust as a multiple of hover thrust, one value per second, repeated
+PROFILES: Dict[str, Tuple[float, ...]] = {
+    "hover": (1.0,),
+    "cruise": (1.1,) * 25 + (1.6,) * 5,
+    "freestyle": (1.0, 1.4, 2.5, 0.5, 0.7, 1.8, 3.0, 1.2, 0.6, 1.0, 2.2, 1.4, 0.8, 0.5, 2.8, 1.6, 1.0, 0.7, 1.3, 2.0),
+    "race": (2.2, 2.8, 3.2, 1.6, 2.4, 3.0, 1.2, 2.6, 3.4, 2.0),
+}
+PROFILE_NAMES: Tuple[str, ...] = tuple(PROFILES)
+
+# end of flight, per simulated row
+END_REASONS: Tuple[str, ...] = ("time_limit", "reserve", "cutoff", "current_limit")
+
+# q grid of the cached curves (W per cell-Ah): below 0.5 every profile flies MAX_SECONDS, at 3000 seconds
+CURVE_Q = np.geomspace(0.5, 3000.0, 256)
+
+
+# -----------------------
+# pack / build
+# -----------------------
+def pack_spec(battery: Any, capacity_mah: Optional[float] = None) -> Optional[Tuple[int, float]]:
+    """(cells, capacity mAh) from "4S" (+ optional capacity); None for unknown packs."""
+    cells = battery_cells(battery)
+    if cells is None:
+        return None
+    capacity = capacity_mah if capacity_mah else PACK_CAPACITY_MAH.get(cells)
+    if capacity is None:
+        return None
+    return cells, float(capacity)
+
+
+def hover_power(weight_g: Any, prop_in: Any, motors: int = MOTORS) -> Any:
+    """Electrical watts to hover (scalar or array; same numpy ops for both)."""
+    thrust_n = np.asarray(weight_g, dtype=np.float64) / 1000.0 * G / motors
+    disk = np.pi * (np.asarray(prop_in, dtype=np.float64) * 0.0254 / 2.0) ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ideal = np.power(thrust_n, 1.5) / np.sqrt(2.0 * RHO * disk)
+    return motors * ideal / (FIGURE_OF_MERIT * DRIVE_EFFICIENCY)
+
+
+def specific_power(hover_w: Any, cells: Any, capacity_mah: Any) -> Any:
+    """Hover watts per cell-Ah (q): the one number a flight depends on."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return hover_w / (np.asarray(cells, dtype=np.float64) * (np.asarray(capacity_mah, dtype=np.float64) / 1000.0))
+
+
+# -----------------------
+# simulator
+# -----------------------
+def _demand_table() -> np.ndarray:
+    """(profile, second of the common cycle) -> power as a multiple of hover power (thrust^1.5)."""
+    cycle = math.lcm(*(len(v) for v in PROFILES.values()))
+    return np.array([[v[t % len(v)] for t in range(cycle)] for v in PROFILES.values()]) ** 1.5
+
+
+DEMAND = _demand_table()
+
+
+def simulate(q_hover: Any, profile: Any, dt: float = DT, max_seconds: float = MAX_SECONDS) -> Dict[str, np.ndarray]:
+    """
+    Step every (q_hover, profile) row at once: q_hover = hover W per cell-Ah,
+    profile = name or codes into PROFILE_NAMES (broadcast). Returns seconds
+    flown, used capacity fraction, lowest loaded cell voltage and the end
+    reason (index into END_REASONS) per row.
+    """
+    codes = PROFILE_NAMES.index(profile) if isinstance(profile, str) else profile
+    q, codes = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(q_hover, dtype=np.float64)), np.atleast_1d(np.asarray(codes, dtype=np.intp)),
+    )
+    shape = q.shape
+    q, codes = q.ravel(), codes.ravel()
+    n = q.size
+    seconds = np.zeros(n)
+    used = np.zeros(n)
+    min_v = np.full(n, OCV_V[-1])
+    reason = np.full(n, END_REASONS.index("time_limit"), dtype=np.int8)
+    usable = 1.0 - RESERVE
+    step_ah = dt / 3600.0
+
+    # rows still flying, compacted: per-step cost is a fixed handful of numpy calls
+    rows = np.flatnonzero(np.isfinite(q) & (q > 0))
+    reason[np.setdiff1d(np.arange(n), rows)] = END_REASONS.index("current_limit")
+    power = q[rows, None] * DEMAND[codes[rows]]                  # W per cell-Ah per second of the cycle
+    used_a = np.zeros(rows.size)
+    min_a = np.full(rows.size, OCV_V[-1])
+
+    def land(done: np.ndarray, why: np.ndarray, flown: float) -> None:
+        nonlocal rows, power, used_a, min_a
+        ended = rows[done]
+        seconds[ended] = flown
+        used[ended] = used_a[done]
+        min_v[ended] = min_a[done]
+        reason[ended] = why
+        keep = ~done
+        rows, power, used_a, min_a = rows[keep], power[keep], used_a[keep], min_a[keep]
+
+    cycle = DEMAND.shape[1]
+    steps = int(max_seconds / dt)
+    for step in range(steps):
+        if rows.size == 0:
+            break
+        p = power[:, step % cycle]
+        ocv = np.interp(1.0 - used_a, OCV_SOC, OCV_V)
+        disc = ocv * ocv - 4.0 * IR_OHM_AH * p
+        c_rate = (ocv - np.sqrt(np.maximum(disc, 0.0))) / (2.0 * IR_OHM_AH)   # current / capacity (1/h)
+        volts = ocv - c_rate * IR_OHM_AH
+
+        over = (disc < 0) | (c_rate > C_RATING)
+        low = volts < CUTOFF_V
+        if over.any() or low.any():
+            why = np.where(over, END_REASONS.index("current_limit"), END_REASONS.index("cutoff"))
+            bad = over | low
+            land(bad, why[bad], step * dt)
+            c_rate, volts = c_rate[~bad], volts[~bad]
+        used_a += c_rate * step_ah
+        np.minimum(min_a, volts, out=min_a)
+        empty = used_a >= usable
+        if empty.any():
+            land(empty, END_REASONS.index("reserve"), (step + 1) * dt)
+    if rows.size:
+        land(np.ones(rows.size, dtype=bool), END_REASONS.index("time_limit"), steps * dt)
+    return {
+        "seconds": seconds.reshape(shape), "used": used.reshape(shape),
+        "min_cell_v": min_v.reshape(shape), "reason": reason.reshape(shape),
+    }
+
+
+class FlightCurves:
+    """
+    Simulated minutes over CURVE_Q for every profile (one simulate() call);
+    at() interpolates in log q. Below CURVE_Q[0] the flight hits MAX_SECONDS anyway.
+    """
+
+    def __init__(self) -> None:
+        t0 = time.perf_counter()
+        codes = np.arange(len(PROFILE_NAMES))
+        result = simulate(CURVE_Q[None, :], codes[:, None])
+        self.log_q = np.log(CURVE_Q)
+        self.minutes = result["seconds"] / 60.0
+        self.build_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+    def at(self, q: Any, code: int) -> Any:
+        """Minutes for q (scalar or array) on one profile's curve; nan where q is not a positive number."""
+        q = np.asarray(q, dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_q = np.log(q)
+        minutes = np.interp(log_q, self.log_q, self.minutes[code])
+        return np.where((q > 0) & (q <= CURVE_Q[-1]), minutes, np.nan)
+
+    def every_profile(self, q: float) -> List[Optional[float]]:
+        """at() for one q on every profile (PROFILE_NAMES order); None off the curves."""
+        if not (0.0 < q <= CURVE_Q[-1]):
+            return [None] * len(PROFILE_NAMES)
+        log_q = np.log(q)
+        return [float(np.interp(log_q, self.log_q, row)) for row in self.minutes]
+
+
+_CURVES: List[FlightCurves] = []
+
+
+def flight_curves() -> FlightCurves:
+    """Built once per process on first use (warm_start() builds it in the gunicorn master)."""
+    if not _CURVES:
+        _CURVES.append(FlightCurves())
+    return _CURVES[0]
+
+
+# -----------------------
+# queries
+# -----------------------
+def flight_minutes(weight: float, prop_size: float, battery: Any, profile: str,
+                   capacity_mah: Optional[float] = None) -> Optional[float]:
+    """Unrounded minutes for one build; None for unknown packs / off-curve builds."""
+    pack = pack_spec(battery, capacity_mah)
+    if pack is None:
+        return None
+    q = specific_power(hover_power(weight, prop_size), *pack)
+    minutes = float(flight_curves().at(q, PROFILE_NAMES.index(profile)))
+    return None if minutes != minutes else minutes
+
+
+def flight_minutes_batch(weight: np.ndarray, prop_size: np.ndarray, cells: np.ndarray,
+                         profile_codes: np.ndarray, capacity_mah: Optional[np.ndarray] = None) -> np.ndarray:
+    """Unrounded minutes per row (profile_codes index PROFILE_NAMES); nan for unknown packs."""
+    cells = np.asarray(cells, dtype=np.float64)
+    if capacity_mah is None:
+        capacity_mah = default_capacity(cells)
+    q = specific_power(hover_power(weight, prop_size), cells, capacity_mah)
+    curves = flight_curves()
+    out = np.full(q.shape, np.nan)
+    for code in np.unique(profile_codes).tolist():
+        rows = profile_codes == code
+        out[rows] = curves.at(q[rows], code)
+    return out
+
+
+def default_capacity(cells: np.ndarray) -> np.ndarray:
+    """PACK_CAPACITY_MAH per row; nan for cell counts without a default."""
+    table = np.full(max(PACK_CAPACITY_MAH) + 2, np.nan)
+    for count, capacity in PACK_CAPACITY_MAH.items():
+        table[count] = capacity
+    cells = np.asarray(cells, dtype=np.float64)
+    known = np.isfinite(cells) & (cells >= 0) & (cells < table.size) & (cells == np.trunc(cells))
+    out = np.full(cells.shape, np.nan)
+    out[known] = table[cells[known].astype(np.intp)]
+    return out
+
+
+def flight_time(weight: float, prop_size: float, battery: Any, profile: str) -> Optional[Dict[str, Any]]:
+    """analysis["flight_time"]: minutes for the build's profile + every profile; None for unknown packs."""
+    pack = pack_spec(battery)
+    if pack is None:
+        return None
+    hover_w = float(hover_power(weight, prop_size))
+    q = float(specific_power(hover_w, *pack))
+    by_profile = {
+        name: None if minutes is None else round(minutes, 1)
+        for name, minutes in zip(PROFILE_NAMES, flight_curves().every_profile(q))
+    }
+    return {
+        "profile": profile,
+        "minutes": by_profile[profile],
+        "by_profile": by_profile,
+        "cells": pack[0],
+        "capacity_mah": pack[1],
+        "hover_w": round(hover_w, 1) if math.isfinite(hover_w) else None,
+    }
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "profiles": list(PROFILE_NAMES),
+        "curves_ms": _CURVES[0].build_ms if _CURVES else None,
+        "pack_capacity_mah": {f"{cells}S": mah for cells, mah in PACK_CAPACITY_MAH.items()},
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m analyzer.flight_sim", description="simulate flight time per throttle profile")
+    ap.add_argument("build", nargs="*", help="weight=750 prop=5 battery=4S [capacity=1300]")
+    args = ap.parse_args(argv)
+    b = dict(item.split("=", 1) for item in args.build)
+    weight = float(b.get("weight", 750))
+    prop = float(b.get("prop", 5))
+    battery = b.get("battery", "4S")
+    capacity = float(b["capacity"]) if "capacity" in b else None
+
+    pack = pack_spec(battery, capacity)
+    if pack is None:
+        print(f"unknown pack {battery!r}", file=sys.stderr)
+        return 1
+    hover_w = float(hover_power(weight, prop))
+    q = float(specific_power(hover_w, *pack))
+    print(f"{pack[0]}S {pack[1]:.0f} mAh, hover {hover_w:.1f} W ({q:.1f} W per cell-Ah)")
+    for name in PROFILE_NAMES:
+        sim = simulate(q, name)  # full time-stepped run (the cached curve interpolates this)
+        curve = flight_minutes(weight, prop, battery, name, capacity)
+        print(f"  {name:<10} {sim['seconds'][0] / 60:6.2f} min  (curve {curve if curve is None else round(curve, 2)})"
+              f"  used {sim['used'][0]:.0%}  min {sim['min_cell_v'][0]:.2f} V/cell  end {END_REASONS[sim['reason'][0]]}")
+
+    rng = np.random.default_rng(0)
+    n = 10_000
+    t0 = time.perf_counter()
+    simulate(rng.uniform(5, 80, n), rng.integers(0, len(PROFILE_NAMES), n))
+    print(f"simulate: {n} (build, pack, profile) rows in {(time.perf_counter() - t0) * 1000:.0f} ms,"
+          f" cached curves built in {flight_curves().build_ms} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
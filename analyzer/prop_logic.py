@@ -1,45 +1,22 @@
-def analyze_propeller(prop_size, prop_pitch, blade_count, style):
-    result = {}
+from logic.rules import RULES
 
-    noise_score = 0
-    motor_load = 0
-    efficiency = "กลาง"
+PITCH_RULE = RULES["pitch"]
+BLADES_RULE = RULES["blades"]
+RECOMMEND_RULE = RULES["recommend"]
 
-    # วิเคราะห์ Pitch
-    if prop_pitch >= 4.5:
-        noise_score += 3
-        motor_load += 3
-        efficiency = "แรงจัด กินไฟ"
-    elif prop_pitch >= 4.0:
-        noise_score += 2
-        motor_load += 2
-        efficiency = "สมดุล"
-    else:
-        noise_score += 1
-        motor_load += 1
-        efficiency = "ประหยัด นุ่ม"
 
-    # วิเคราะห์จำนวนใบ
-    if blade_count == 4:
-        noise_score += 3
-        motor_load += 3
-        grip = "หนึบมาก"
-    elif blade_count == 3:
-        noise_score += 2
-        motor_load += 2
-        grip = "หนึบดี"
-    else:
-        noise_score += 1
-        motor_load += 1
-        grip = "นุ่ม ลอย"
+def analyze_propeller(prop_size, prop_pitch, blade_count, style):
+    result = {}
+    build = {"pitch": prop_pitch, "blades": blade_count, "style": style}
 
-    # วิเคราะห์ตามสไตล์
-    if style == "racing":
-        recommend = "เหมาะกับ Racing ตอบสนองไว"
-    elif style == "longrange":
-        recommend = "เหมาะกับ Long Range, Smooth"
-    else:
-        recommend = "เหมาะกับ Freestyle, สมดุล"
+    # วิเคราะห์ Pitch / จำนวนใบ / สไตล์ (tier + คะแนนจาก data/rules.json)
+    pitch = PITCH_RULE.outcome(build)
+    blades = BLADES_RULE.outcome(build)
+    efficiency = pitch["efficiency"]
+    grip = blades["grip"]
+    noise_score = pitch["noise"] + blades["noise"]
+    motor_load = pitch["load"] + blades["load"]
+    recommend = RECOMMEND_RULE.outcome(build)["recommendation"]
 
     # สรุปผล
     result["summary"] = (
@@ -0,0 +1,187 @@
+# analyzer/sweep.py
+# OBIXConfig Doctor - design-space sweep (prop_size x pitch x blades x weight x battery)
+# คำนวณทุกจุดของ Cartesian product ด้วย broadcasting (ไม่วน loop ต่อจุด)
+
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from analyzer.batch import (
+    BATTERIES,
+    analyze_propeller_batch,
+    battery_cells_column,
+    category_codes,
+    estimate_battery_runtime_batch,
+    round_like_python,
+    thrust_ratio_batch,
+)
+from logic.inputs import BUILD_DEFAULTS
+
+# axis order = order of the flattened output columns (row-major, last axis fastest)
+SWEEP_AXES: Tuple[str, ...] = ("prop_size", "pitch", "blades", "weight", "battery")
+
+# guard for /api/sweep (JSON size); sweep() itself only checks max_points
+MAX_SWEEP_POINTS = 1_000_000
+# /api/sweep: grids at least this big go through a ParallelExecutor when one is given
+PARALLEL_SWEEP_POINTS = 250_000
+
+
+def _range(spec: Dict[str, Any], name: str) -> Tuple[float, float, int]:
+    """(start, step, count) of a {"start", "stop", "step"} axis; count is a plain int (nothing allocated)."""
+    try:
+        start = float(spec["start"])
+        stop = float(spec["stop"])
+        step = float(spec.get("step", 1.0))
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"{name}: range needs numeric start/stop/step")
+    if not (math.isfinite(start) and math.isfinite(stop) and math.isfinite(step)):
+        raise ValueError(f"{name}: start/stop/step must be finite")
+    if step <= 0 or stop < start:
+        raise ValueError(f"{name}: need step > 0 and stop >= start")
+    span = (stop - start) / step
+    if not math.isfinite(span):
+        raise ValueError(f"{name}: range has too many points")
+    return start, step, math.floor(span + 1e-9) + 1
+
+
+def axis_count(spec: Any, name: str) -> int:
+    """len(axis_values(spec, name)) without building the axis."""
+    if isinstance(spec, dict):
+        return _range(spec, name)[2]
+    if isinstance(spec, (list, tuple)):
+        return len(spec)
+    return 1
+
+
+def sweep_points(spec: Dict[str, Any]) -> int:
+    """Grid size of a sweep spec (exact int product of the axis lengths)."""
+    return math.prod(axis_count(spec.get(name), name) for name in SWEEP_AXES)
+
+
+def axis_values(spec: Any, name: str) -> np.ndarray:
+    """
+    Axis spec: a scalar, a list of values, or {"start", "stop", "step"}
+    (stop inclusive).
+    """
+    if spec is None:
+        spec = BUILD_DEFAULTS[name]
+    if isinstance(spec, dict):
+        start, step, count = _range(spec, name)
+        values = np.round(start + step * np.arange(count), 6)
+    elif isinstance(spec, (list, tuple)):
+        values = np.asarray(spec)
+    else:
+        values = np.asarray([spec])
+
+    if values.size == 0:
+        raise ValueError(f"{name}: empty axis")
+    if name == "battery":
+        return values.astype(object)
+    try:
+        return values.astype(np.int64 if name == "blades" else np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name}: values must be numeric")
+
+
+def _along(values: np.ndarray, axis: int) -> np.ndarray:
+    shape = [1] * len(SWEEP_AXES)
+    shape[axis] = values.shape[0]
+    return values.reshape(shape)
+
+
+def check_points(spec: Dict[str, Any], max_points: int) -> int:
+    """sweep_points(), raising ValueError above max_points (before any axis is built)."""
+    points = sweep_points(spec)
+    if points > max_points:
+        raise ValueError(f"sweep has {points} points (max {max_points})")
+    return points
+
+
+def sweep_metrics(
+    spec: Dict[str, Any], max_points: Optional[int] = None
+) -> Tuple[Dict[str, np.ndarray], Tuple[int, ...], Dict[str, np.ndarray]]:
+    """
+    Per-axis metric tables before broadcasting: (axes, full shape, metrics),
+    each metric shaped with length-1 dims on the axes it does not depend on.
+    """
+    if max_points is not None:
+        check_points(spec, max_points)
+    axes = {name: axis_values(spec.get(name), name) for name in SWEEP_AXES}
+    shape = tuple(len(axes[name]) for name in SWEEP_AXES)
+
+    prop_size = _along(axes["prop_size"], 0)
+    pitch = _along(axes["pitch"], 1)
+    blades = _along(axes["blades"], 2)
+    weight = _along(axes["weight"], 3)
+    battery_code = _along(
+        category_codes(list(axes["battery"]), len(axes["battery"]), BATTERIES, BUILD_DEFAULTS["battery"]), 4
+    )
+
+    cells = _along(battery_cells_column(axes["battery"]), 4)
+
+    prop = analyze_propeller_batch(pitch, blades)
+    metrics = {
+        "thrust_ratio": round_like_python(
+            thrust_ratio_batch(prop["motor_load"], weight, prop_size, pitch, blades, cells), 2
+        ),
+        "battery_est": round_like_python(estimate_battery_runtime_batch(weight, battery_code), 1),
+        "noise": prop["noise"],
+        "motor_load": prop["motor_load"],
+    }
+    return axes, shape, metrics
+
+
+def sweep(spec: Dict[str, Any], max_points: int = 50_000_000) -> Dict[str, Any]:
+    """
+    Evaluate thrust ratio, runtime, noise and motor load over the full grid.
+    Each metric is computed on the axes it depends on and broadcast once at
+    the end, so cost is dominated by writing the output columns.
+    """
+    axes, shape, metrics = sweep_metrics(spec, max_points)
+    points = int(np.prod(shape))
+    columns = {
+        name: np.broadcast_to(values, shape).ravel()
+        for name, values in metrics.items()
+    }
+    return {"axes": axes, "shape": shape, "points": points, "columns": columns}
+
+
+def gather_flat(metrics: Dict[str, np.ndarray], shape: Tuple[int, ...], start: int, stop: int) -> Dict[str, np.ndarray]:
+    """Flattened grid values for points [start, stop) without building the whole grid."""
+    idx = np.unravel_index(np.arange(start, stop), shape)
+    return {
+        name: values[tuple(i if dim > 1 else 0 for i, dim in zip(idx, values.shape))]
+        for name, values in metrics.items()
+    }
+
+
+def sweep_json(
+    spec: Dict[str, Any],
+    get_executor: Optional[Callable[[], Any]] = None,
+    parallel_points: int = PARALLEL_SWEEP_POINTS,
+) -> Dict[str, Any]:
+    """
+    sweep() as plain lists for the JSON API (Chart.js heatmap friendly).
+    get_executor() -> logic.parallel.ParallelExecutor (or None), only called
+    for grids of at least parallel_points.
+    """
+    points = check_points(spec, MAX_SWEEP_POINTS)
+    executor = get_executor() if get_executor is not None and points >= parallel_points else None
+    if executor is not None:
+        res = executor.sweep(spec, max_points=MAX_SWEEP_POINTS)
+    else:
+        res = sweep(spec, max_points=MAX_SWEEP_POINTS)
+    return {
+        "axes": {name: values.tolist() for name, values in res["axes"].items()},
+        "axis_order": list(SWEEP_AXES),
+        "shape": list(res["shape"]),
+        "points": res["points"],
+        "columns": {name: _column_list(values) for name, values in res["columns"].items()},
+    }
+
+
+def _column_list(values: np.ndarray) -> List[Any]:
+    if values.dtype.kind == "f" and np.isnan(values).any():
+        return [None if v != v else v for v in values.tolist()]
+    return values.tolist()
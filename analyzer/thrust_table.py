@@ -0,0 +1,316 @@
+# analyzer/thrust_table.py
+# OBIXConfig Doctor - measured motor / prop thrust tables + multilinear interpolation
+#
+# ข้อมูลจาก thrust stand (CSV) ใน OBIX_THRUST_DIR (default data/thrust, "off" = ปิด) หนึ่งแถว = หนึ่งจุดวัด:
+#   kv,prop_in,pitch_in,blades,cells,throttle_pct,thrust_g[,current_a]
+# ทุกไฟล์รวมเป็น grid เดียว (แกน = ค่าที่วัดจริงของแต่ละคอลัมน์) เก็บเป็น float64 array ต่อเนื่อง
+# จุดที่ไม่มีข้อมูลเป็น nan -> query ที่ต้องใช้จุดนั้นได้ nan แล้วผู้เรียกใช้สูตร motor_load เดิมแทน
+# build ไม่มี KV จึงใช้ KV กลาง (median ที่วัดจริง) ของ prop_in x cells นั้น (interpolate ตาม prop_in)
+#
+# query ทีละ build ใช้ bisect, query ทั้ง column / sweep ใช้ np.searchsorted (broadcast ได้)
+# ทั้งสองแบบบวกมุมของ cell ตามลำดับเดียวกัน ผลจึงตรงกันทุก bit
+#
+#   python -m analyzer.thrust_table                         # coverage + ความเร็ว batch query
+#   python -m analyzer.thrust_table prop=5 pitch=4.3 blades=3 cells=6 weight=650
+
+import argparse
+import csv
+import hashlib
+import os
+import sys
+import time
+from bisect import bisect_right
+from itertools import product
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "thrust")
+
+AXES: Tuple[str, ...] = ("kv", "prop_in", "pitch_in", "blades", "cells", "throttle_pct")
+VALUES: Tuple[str, ...] = ("thrust_g", "current_a")   # current_a is optional per file
+REQUIRED = AXES + ("thrust_g",)
+
+# thrust-to-weight = MOTORS x thrust per motor at full throttle / all-up weight
+MOTORS = 4
+FULL_THROTTLE = 100.0
+
+
+# -----------------------
+# N-d grid
+# -----------------------
+class Grid:
+    """Values on the product of sorted axes (nan = not measured), interpolated multilinearly."""
+
+    def __init__(self, axes: Sequence[np.ndarray], values: np.ndarray):
+        self.axes = tuple(np.asarray(a, dtype=np.float64) for a in axes)
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        if self.values.shape != tuple(len(a) for a in self.axes):
+            raise ValueError("grid values do not match the axes")
+        self.flat = self.values.ravel()
+        self.strides = tuple(int(np.prod(self.values.shape[d + 1:])) for d in range(len(self.axes)))
+        self._lists = tuple(a.tolist() for a in self.axes)
+        # query(): gathers from a nan-free copy + a "not measured" mask instead of np.where per corner
+        self._missing = np.isnan(self.flat)
+        self._filled = np.where(self._missing, 0.0, self.flat)
+
+    @property
+    def coverage(self) -> float:
+        """Share of grid points that were measured."""
+        return float(np.count_nonzero(~self._missing) / max(self.flat.size, 1))
+
+    def at(self, *point: float) -> float:
+        """One point (bisect per axis); nan off the grid or next to a missing point."""
+        corners: List[Tuple[int, float]] = [(0, 1.0)]
+        for axis, stride, x in zip(self._lists, self.strides, point):
+            x = float(x)
+            if len(axis) == 1:
+                if x != axis[0]:
+                    return float("nan")
+                continue
+            if not axis[0] <= x <= axis[-1]:  # also rejects nan
+                return float("nan")
+            # x == last point -> (last, t=0): on-grid values never need the next point
+            i = bisect_right(axis, x) - 1
+            t = (x - axis[i]) / (axis[i + 1] - axis[i]) if i < len(axis) - 1 else 0.0
+            ends = [(j * stride, wd) for j, wd in ((i, 1.0 - t), (i + 1, t)) if wd != 0.0]
+            corners = [(index + offset, w * wd) for index, w in corners for offset, wd in ends]
+
+        flat = self.flat
+        acc = 0.0
+        for index, w in corners:  # same order as query() -> identical sums
+            acc += w * flat[index]
+        return float(acc)
+
+    def query(self, *columns: Any) -> np.ndarray:
+        """Broadcast columns (np.searchsorted per axis) -> values; nan where at() would be nan."""
+        cols = np.broadcast_arrays(*(np.asarray(c, dtype=np.float64) for c in columns))
+        shape = cols[0].shape
+        valid = np.ones(shape, dtype=bool)
+        corners: List[Tuple[Any, Any]] = [(0, 1.0)]
+        for axis, stride, x in zip(self.axes, self.strides, cols):
+            if len(axis) == 1:
+                valid &= x == axis[0]
+                continue
+            valid &= (x >= axis[0]) & (x <= axis[-1])
+            i = np.clip(np.searchsorted(axis, x, side="right") - 1, 0, len(axis) - 1)
+            nxt = np.minimum(i + 1, len(axis) - 1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                t = np.where(i < len(axis) - 1, (x - axis[i]) / (axis[nxt] - axis[i]), 0.0)
+            # on-grid blades / cells / full throttle -> t == 0 (see at()); only axes that
+            # actually fall between points double the number of corners
+            if not t.any():
+                # every row on a grid point: one corner, weight exactly 1.0
+                corners = [(index + i * stride, w) for index, w in corners]
+                continue
+            corners = [
+                (index + j * stride, w * wd) for index, w in corners for j, wd in ((i, 1.0 - t), (nxt, t))
+            ]
+
+        acc = np.zeros(shape, dtype=np.float64)
+        missing = np.zeros(shape, dtype=bool)
+        for index, w in corners:
+            acc += w * self._filled.take(index)
+            missing |= self._missing.take(index) & (w != 0.0)
+        acc[~valid | missing] = np.nan
+        return acc
+
+
+# -----------------------
+# loading
+# -----------------------
+def read_rows(path: str) -> List[Dict[str, float]]:
+    """One thrust stand CSV -> rows of floats (ValueError names file:line)."""
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in REQUIRED if c not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f"{path}: missing columns {', '.join(missing)}")
+        for row in reader:
+            try:
+                rows.append({
+                    c: float(row[c]) for c in AXES + VALUES if c in row and row[c] not in (None, "")
+                })
+            except ValueError:
+                raise ValueError(f"{path}:{reader.line_num}: not a number") from None
+    return rows
+
+
+def _grid(rows: Sequence[Dict[str, float]], axes: Tuple[str, ...], value: str) -> Optional[Grid]:
+    """Rows -> grid over the measured values of `axes`; repeated points are averaged."""
+    rows = [r for r in rows if value in r]
+    if not rows:
+        return None
+    points = np.array([[r[a] for a in axes] for r in rows], dtype=np.float64)
+    axis_values = [np.unique(points[:, d]) for d in range(len(axes))]
+    index = tuple(np.searchsorted(axis_values[d], points[:, d]) for d in range(len(axes)))
+    shape = tuple(len(a) for a in axis_values)
+    total = np.zeros(shape)
+    count = np.zeros(shape)
+    np.add.at(total, index, [r[value] for r in rows])
+    np.add.at(count, index, 1)
+    with np.errstate(invalid="ignore"):
+        return Grid(axis_values, total / count)
+
+
+def _kv_grid(rows: Sequence[Dict[str, float]]) -> Optional[Grid]:
+    """prop_in x cells -> median KV tested with that prop / pack (lower median: a KV that was measured)."""
+    tested: Dict[Tuple[float, float], set] = {}
+    for r in rows:
+        tested.setdefault((r["prop_in"], r["cells"]), set()).add(r["kv"])
+    if not tested:
+        return None
+    return _grid(
+        [{"prop_in": p, "cells": c, "kv": sorted(kvs)[(len(kvs) - 1) // 2]} for (p, c), kvs in tested.items()],
+        ("prop_in", "cells"), "kv",
+    )
+
+
+# -----------------------
+# model
+# -----------------------
+class ThrustTable:
+    """Measured thrust (and current) per motor over AXES + the typical KV per prop / pack."""
+
+    def __init__(self, rows: Sequence[Dict[str, float]], sources: Sequence[str] = (), fingerprint: str = ""):
+        if not rows:
+            raise ValueError("thrust table: no rows")
+        self.sources = tuple(sources)
+        self.fingerprint = fingerprint
+        self.rows = len(rows)
+        self.grids: Dict[str, Grid] = {}
+        for value in VALUES:
+            grid = _grid(rows, AXES, value)
+            if grid is not None:
+                self.grids[value] = grid
+        self.kv = _kv_grid(rows)
+
+    @classmethod
+    def from_dir(cls, directory: str) -> Optional["ThrustTable"]:
+        """Every *.csv in `directory` (sorted); None when there is none."""
+        try:
+            names = sorted(n for n in os.listdir(directory) if n.endswith(".csv") and not n.startswith("."))
+        except OSError:
+            return None
+        rows: List[Dict[str, float]] = []
+        digest = hashlib.sha1()
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, "rb") as f:
+                digest.update(name.encode("utf-8") + b"\0" + f.read())
+            rows.extend(read_rows(path))
+        if not rows:
+            return None
+        return cls(rows, names, digest.hexdigest())
+
+    @classmethod
+    def from_env(cls) -> Optional["ThrustTable"]:
+        """OBIX_THRUST_DIR (default data/thrust; "off" disables) -> table or None."""
+        directory = os.environ.get("OBIX_THRUST_DIR", DEFAULT_DIR)
+        if not directory or directory.lower() == "off":
+            return None
+        return cls.from_dir(directory)
+
+    # -----------------------
+    # one build
+    # -----------------------
+    def typical_kv(self, prop_size: float, cells: float) -> float:
+        return self.kv.at(prop_size, cells) if self.kv is not None else float("nan")
+
+    def thrust(self, prop_size: float, pitch: float, blades: float, cells: float,
+               kv: Optional[float] = None, throttle: float = FULL_THROTTLE) -> float:
+        """Grams per motor (nan when not covered by the measurements)."""
+        if kv is None:
+            kv = self.typical_kv(prop_size, cells)
+        return self.grids["thrust_g"].at(kv, prop_size, pitch, blades, cells, throttle)
+
+    def thrust_ratio(self, prop_size: float, pitch: float, blades: float, cells: Optional[float],
+                     weight: float, kv: Optional[float] = None, motors: int = MOTORS) -> Optional[float]:
+        """Unrounded thrust-to-weight at full throttle; None = not covered (use the heuristic)."""
+        if cells is None or not weight:
+            return None
+        thrust = self.thrust(prop_size, pitch, blades, cells, kv)
+        if thrust != thrust:  # nan
+            return None
+        return motors * thrust / weight
+
+    # -----------------------
+    # columns / sweeps (broadcast)
+    # -----------------------
+    def typical_kv_batch(self, prop_size: Any, cells: Any) -> np.ndarray:
+        if self.kv is None:
+            return np.full(np.broadcast(prop_size, cells).shape, np.nan)
+        return self.kv.query(prop_size, cells)
+
+    def thrust_batch(self, prop_size: Any, pitch: Any, blades: Any, cells: Any,
+                     kv: Any = None, throttle: Any = FULL_THROTTLE) -> np.ndarray:
+        if kv is None:
+            kv = self.typical_kv_batch(prop_size, cells)
+        return self.grids["thrust_g"].query(kv, prop_size, pitch, blades, cells, throttle)
+
+    def thrust_ratio_batch(self, prop_size: Any, pitch: Any, blades: Any, cells: Any, weight: Any,
+                           kv: Any = None, motors: int = MOTORS) -> np.ndarray:
+        """Unrounded thrust-to-weight; nan where not covered or weight == 0."""
+        thrust = self.thrust_batch(prop_size, pitch, blades, cells, kv)
+        weight = np.asarray(weight, dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = motors * thrust / weight
+        return np.where(weight == 0, np.nan, ratio)
+
+    def stats(self) -> Dict[str, Any]:
+        thrust = self.grids["thrust_g"]
+        return {
+            "sources": list(self.sources),
+            "rows": self.rows,
+            "axes": {name: axis.tolist() for name, axis in zip(AXES, thrust.axes)},
+            "coverage": round(thrust.coverage, 4),
+            "current": "current_a" in self.grids,
+        }
+
+
+THRUST_TABLE = ThrustTable.from_env()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m analyzer.thrust_table", description="query the measured thrust tables")
+    ap.add_argument("query", nargs="*", help="prop=5 pitch=4.3 blades=3 cells=6 weight=650 [kv=1950]")
+    ap.add_argument("--dir", default=None, help="thrust CSV directory (default OBIX_THRUST_DIR / data/thrust)")
+    args = ap.parse_args(argv)
+
+    table = ThrustTable.from_dir(args.dir) if args.dir else THRUST_TABLE
+    if table is None:
+        print(f"no thrust tables in {args.dir or os.environ.get('OBIX_THRUST_DIR', DEFAULT_DIR)}", file=sys.stderr)
+        return 1
+
+    if args.query:
+        q = {k: float(v) for k, v in (item.split("=", 1) for item in args.query)}
+        kv = q.get("kv")
+        cells = q.get("cells", 4.0)
+        thrust = table.thrust(q.get("prop", 5.0), q.get("pitch", 4.0), q.get("blades", 3.0), cells, kv)
+        print(f"kv      {kv if kv is not None else table.typical_kv(q.get('prop', 5.0), cells):g}")
+        print(f"thrust  {thrust:.1f} g / motor")
+        if "weight" in q:
+            ratio = table.thrust_ratio(q.get("prop", 5.0), q.get("pitch", 4.0), q.get("blades", 3.0), cells, q["weight"], kv)
+            print(f"ratio   {'-' if ratio is None else round(ratio, 2)}")
+        return 0
+
+    stats = table.stats()
+    print(f"{stats['rows']} rows from {', '.join(stats['sources'])} (grid coverage {stats['coverage']:.1%})")
+    for name, axis in stats["axes"].items():
+        print(f"  {name:<13} {len(axis):>3} values  {axis[0]:g} .. {axis[-1]:g}")
+    # batch speed over random in-range builds (prop / pitch anywhere, blades / cells as measured)
+    rng = np.random.default_rng(0)
+    n = 100_000
+    axes = dict(zip(AXES, table.grids["thrust_g"].axes))
+    cols = [rng.uniform(axes[a][0], axes[a][-1], n) for a in ("prop_in", "pitch_in")]
+    cols += [rng.choice(axes[a], n) for a in ("blades", "cells")]
+    t0 = time.perf_counter()
+    ratio = table.thrust_ratio_batch(*cols, np.full(n, 500.0))
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"batch: {n} builds in {ms:.1f} ms ({n / ms:.0f} / ms), {np.count_nonzero(~np.isnan(ratio))} covered")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
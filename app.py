@@ -1,12 +1,84 @@
-from flask import Flask, render_template, request
+from flask import Flask, Response, g, jsonify, render_template, request, send_file, session, stream_with_context, url_for
+from flask.json.provider import DefaultJSONProvider
 from analyzer.prop_logic import analyze_propeller
 from analyzer.thrust_logic import calculate_thrust_weight, estimate_battery_runtime
+from analyzer.thrust_table import THRUST_TABLE
+from analyzer import flight_sim
 from analyzer.battery_logic import analyze_battery
-from logic.presets import PRESETS, detect_class_from_size, get_baseline_for_class
-from analyzer.drone_class import detect_drone_class
+from logic.presets import PRESETS
+from analyzer.drone_class import CLASS_INDEX, DRONE_CLASSES, detect_drone_class
+from analyzer.batch import CLASS_TOP_K, analyze_batch
+from analyzer.sweep import PARALLEL_SWEEP_POINTS, sweep_json
+from analyzer.blackbox import analyze_log
+from analyzer.bf_dump import COMPARE_SETTINGS, DEFAULT_TOLERANCE, compare_many, resolve_class, scan_dump
+from logic.inputs import BUILD_DEFAULTS, BUILD_FIELDS, battery_cells, normalize_build, parse_build, safe_float, safe_int
+from logic.schema import InputError
+from logic.cache import AnalysisCache
+from logic.atlas import Atlas
+from logic.history import HistoryStore
+from logic.similar import BuildIndex
+from logic.metrics import Metrics
+from logic.parallel import ParallelExecutor, default_workers
+from logic.stages import Stage, StageGraph, merge_fragments
+from logic.rules import RULES
+from logic.profiler import FORMATS as PROFILE_FORMATS
+from logic.profiler import HEADER as PROFILE_HEADER
+from logic.profiler import RequestProfiler
+from logic.assets import AssetStore
+from logic.startup import BootTimer, bytecode_cache_from_env, precompile_templates
+from logic.results import (
+    ANALYZER_BASELINES, CLASS_BASELINES, STYLE_FRAGMENTS, UNKNOWN_BASELINE,
+    AnalysisResult, dumps, dumps_str, to_builtin,
+)
+from logic.bulk import BulkStats, analyze_stream, iter_output, iter_records
+import hashlib
+import io
+import json
+import logging
+import math
+import threading
+import time
 import traceback
+import uuid
+from types import MappingProxyType
+from typing import NamedTuple
+
+# ===============================
+# JSON: analysis results / read-only tables, orjson when installed
+# ===============================
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through logic.results.dumps (orjson when installed; AnalysisResult / read-only tables aware)."""
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.get("indent"):
+            kwargs.setdefault("default", to_builtin)
+            return super().dumps(obj, **kwargs)
+        return dumps_str(obj, sort_keys=kwargs.get("sort_keys", self.sort_keys))
+
+
+# boot phases (seconds since OBIX_BOOT_T0 / process start) -> /api/cache/stats, obix_startup_seconds
+BOOT = BootTimer()
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+# under gunicorn: app.logger writes through gunicorn's error log (same handlers / --log-level)
+_gunicorn_log = logging.getLogger("gunicorn.error")
+if _gunicorn_log.handlers:
+    app.logger.handlers = _gunicorn_log.handlers
+    app.logger.setLevel(_gunicorn_log.level)
+# compiled templates persist across boots (OBIX_JINJA_CACHE, default .cache/jinja)
+app.jinja_env.bytecode_cache = bytecode_cache_from_env()
+
+# static/ -> content-hashed + precompressed (/assets/<hashed>); variants reused from OBIX_ASSETS_DIR
+ASSETS = AssetStore.from_env()
+
+
+def asset_url(name):
+    # unknown files keep the plain /static URL
+    return ASSETS.url(name) or url_for("static", filename=name)
+
+
+app.jinja_env.globals["asset_url"] = asset_url
 
 # ===============================
 # SECURITY / CONFIG
@@ -22,151 +94,152 @@ app.config["SECRET_KEY"] = os.environ.get(
 # ปลอดภัยขึ้น เวลามี session / cookie
 app.config["SESSION_COOKIE_HTTPONLY"] = True
 app.config["SESSION_COOKIE_SAMESITE"] = "Lax"
+
+# result cache: OBIX_CACHE_SIZE / OBIX_CACHE_TTL, shared tier via OBIX_CACHE_DB (sqlite path)
+ANALYSIS_CACHE = AnalysisCache.from_env()
+
+# precomputed atlas (python -m logic.atlas build) -> OBIX_ATLAS; None = คำนวณสดทุกครั้ง
+ATLAS = Atlas.from_env()
+
+# catalog ของ build ที่จูนแล้ว (OBIX_BUILD_CATALOG / data/tuned_builds.csv, ไม่มีไฟล์ = presets)
+BUILD_INDEX = BuildIndex.from_env()
+SIMILAR_K = int(os.environ.get("OBIX_SIMILAR_K", 3))
+
+# analysis history: OBIX_HISTORY_DB (sqlite path); ไม่ตั้ง = ไม่เก็บ
+HISTORY = HistoryStore.from_env()
+
+# on-demand profiler: OBIX_PROFILE_DIR + OBIX_PROFILE_SECRET (header) / OBIX_PROFILE_SAMPLE
+# ไม่ตั้ง = None และ wsgi_app ไม่ถูกครอบเลย
+PROFILER = RequestProfiler.from_env()
+if PROFILER is not None:
+    app.wsgi_app = PROFILER.wrap(app.wsgi_app)
+
+# per-stage latency metrics (/metrics); multi-worker aggregation via OBIX_METRICS_DIR
+METRICS = Metrics.from_env()
+METRICS.add_collector(lambda: {
+    "obix_cache_hits_total": ANALYSIS_CACHE.hits + ANALYSIS_CACHE.shared_hits,
+    "obix_cache_misses_total": ANALYSIS_CACHE.misses,
+    "obix_cache_evictions_total": ANALYSIS_CACHE.evictions,
+    "obix_history_enqueued_total": HISTORY.enqueued,
+    "obix_history_written_total": HISTORY.written,
+    "obix_history_dropped_total": HISTORY.dropped,
+})
 # ===============================
 # VALIDATE INPUT
 # ===============================
 def validate_input(size, weight, prop_size, pitch, blades):
-    warnings = []
-
-    if not (1 <= size <= 10):
-        warnings.append("ขนาดโดรนควรอยู่ระหว่าง 1–10 นิ้ว")
-
-    if weight <= 0 or weight > 3000:
-        warnings.append("น้ำหนักโดรนควรอยู่ระหว่าง 1–3000 กรัม")
-
-    if prop_size > size:
-        warnings.append("ขนาดใบพัดใหญ่กว่าขนาดโดรน อาจติดเฟรม")
-
-    if not (2.0 <= pitch <= 6.5):
-        warnings.append("Pitch ใบพัดอยู่นอกช่วงที่ใช้ทั่วไป")
-
-    if blades not in [2, 3, 4]:
-        warnings.append("จำนวนใบพัดผิดปกติ")
-
-    return warnings
+    # กฎ group "validate" ใน data/rules.json (ลำดับเดียวกับข้อความที่แสดง)
+    build = {"size": size, "weight": weight, "prop_size": prop_size, "pitch": pitch, "blades": blades}
+    return RULES.collect("validate", build, "warn")
 
 # ===============================
 # CLASSIFY WEIGHT
 # ===============================
 def classify_weight(size, weight):
-    if size >= 5:
-        if weight < 650:
-            return "เบา"
-        elif weight <= 900:
-            return "กลาง"
-        else:
-            return "หนัก"
-    return "ไม่ระบุ"
+    return RULES["weight_class"].outcome({"size": size, "weight": weight})["label"]
 
 # ===============================
-# LOGIC วิเคราะห์โดรน
+# STAGES: แต่ละส่วนของการวิเคราะห์ (input ชัดเจน, คืน fragment ของ analysis)
 # ===============================
-def analyze_drone(size, battery, style, prop_result, weight):
-    analysis = {}
+BASIC_TIPS = (
+    "ตรวจสอบใบพัดไม่บิดงอ",
+    "ขันน็อตมอเตอร์ให้แน่น",
+    "เช็คจุดบัดกรี ESC และแบตเตอรี่"
+)
 
-    analysis["overview"] = (
-        f'โดรน {size}" แบต {battery}, สไตล์ {style}, ใบพัด: {prop_result["summary"]}'
-    )
 
-    analysis["summary"] = analysis["overview"]
-    analysis["weight_class"] = classify_weight(size, weight)
-
-    analysis["basic_tips"] = [
-        "ตรวจสอบใบพัดไม่บิดงอ",
-        "ขันน็อตมอเตอร์ให้แน่น",
-        "เช็คจุดบัดกรี ESC และแบตเตอรี่"
-    ]
-
-    # PID + Filter
-    if style == "freestyle":
-        pid = {
-            "roll": {"p":48,"i":52,"d":38},
-            "pitch":{"p":48,"i":52,"d":38},
-            "yaw":{"p":40,"i":45,"d":0}
-        }
-        filter_desc = {"gyro_lpf2":90,"dterm_lpf1":120,"dyn_notch":2}
-        extra_tips = ["Freestyle, สมดุล แรงพอดี"]
-
-    elif style == "racing":
-        pid = {
-            "roll": {"p":55,"i":45,"d":42},
-            "pitch":{"p":55,"i":45,"d":42},
-            "yaw":{"p":50,"i":40,"d":0}
-        }
-        filter_desc = {"gyro_lpf2":120,"dterm_lpf1":150,"dyn_notch":3}
-        extra_tips = ["Racing, ตอบสนองไว"]
-
-    else:
-        pid = {
-            "roll": {"p":42,"i":50,"d":32},
-            "pitch":{"p":42,"i":50,"d":32},
-            "yaw":{"p":35,"i":45,"d":0}
-        }
-        filter_desc = {"gyro_lpf2":70,"dterm_lpf1":90,"dyn_notch":1}
-        extra_tips = ["Long Range, Smooth, ประหยัดแบต"]
-
-    analysis["pid"] = pid
-    analysis["filter"] = filter_desc
-    analysis["extra_tips"] = extra_tips
-    analysis["thrust_ratio"] = calculate_thrust_weight(
-        prop_result["effect"]["motor_load"], weight
-    )
-    analysis["battery_est"] = estimate_battery_runtime(weight, battery)
+def validate_stage(size, weight, prop_size, pitch, blades):
+    return {"warnings": validate_input(size, weight, prop_size, pitch, blades)}
+
+
+def propeller_stage(prop_size, pitch, blades, style):
+    # prop analysis (ป้องกัน exception)
+    try:
+        prop_result = analyze_propeller(prop_size, pitch, blades, style)
+    except Exception:
+        prop_result = {"summary": "prop analysis not available", "effect": {"motor_load": 0, "noise": 0}, "recommendation": ""}
+    return {"prop_result": prop_result}
+
+
+def overview_stage(size, battery, style, prop):
+    overview = f'โดรน {size}" แบต {battery}, สไตล์ {style}, ใบพัด: {prop["prop_result"]["summary"]}'
+    return {"overview": overview, "summary": overview, "basic_tips": BASIC_TIPS}
+
+
+def style_profile_stage(style):
+    # PID + Filter (shared read-only profile, built once at import; style -> profile from the rules)
+    return STYLE_FRAGMENTS[RULES["style_profile"].outcome({"style": style})["profile"]]
+
+
+def thrust_stage(prop, weight, prop_size=None, pitch=None, blades=None, battery=None):
+    motor_load = prop["prop_result"]["effect"]["motor_load"]
+    # measured thrust tables (data/thrust) first; off-table builds -> atlas / motor_load formula
+    ratio = None
+    if THRUST_TABLE is not None and prop_size is not None:
+        measured = THRUST_TABLE.thrust_ratio(prop_size, pitch, blades, battery_cells(battery), weight)
+        if measured is not None:
+            ratio = round(measured, 2)
+    if ratio is None and ATLAS is not None:
+        ratio = ATLAS.lookup_thrust(weight, motor_load)
+    if ratio is None:
+        ratio = calculate_thrust_weight(motor_load, weight)
+    return {"thrust_ratio": ratio}
+
+
+def runtime_stage(weight, battery):
+    est = ATLAS.lookup_runtime(weight, battery) if ATLAS is not None else None
+    if est is None:
+        est = estimate_battery_runtime(weight, battery)
+    return {"battery_est": est}
+
+
+def flight_stage(weight, prop_size, battery, style):
+    # simulated discharge per throttle profile (cached curves); style -> profile from the rules
+    profile = RULES["flight_profile"].outcome({"style": style})["profile"]
+    return {"flight_time": flight_sim.flight_time(weight, prop_size, battery, profile)}
+
+
+def drone_class_stage(size, weight):
+    # on-grid (size, weight) -> O(1) atlas record; off-grid / out of range -> live path
+    record = ATLAS.lookup_size_weight(size, weight) if ATLAS is not None else None
+    analysis = {"weight_class": record.weight_class if record else classify_weight(size, weight)}
 
 # --- Detect drone class and attach baseline (safe, non-destructive) ---
     try:
-        cls_key, cls_meta = detect_drone_class(size, weight)
+        if record:
+            cls_key, cls_meta = record.drone_class, DRONE_CLASSES[record.drone_class]
+        else:
+            cls_key, cls_meta = detect_drone_class(size, weight)
         if cls_key and cls_meta:
-            # attach a readable class and meta
-            analysis["detected_class"] = cls_key
-            analysis["class_meta"] = {"description": cls_meta.get("description", "")}
-
-            # attach baseline PID/filter separately (do not overwrite analysis['pid'])
-            analysis["pid_baseline"] = cls_meta.get("pid", {})
-            analysis["filter_baseline"] = cls_meta.get("filter", {})
-
-            # small note for template / UI
-            analysis.setdefault("extra_tips", []).append(
-                f"System detected class '{cls_key}' — baseline PID/filter suggested."
-            )
+            # readable class + meta, baseline PID/filter kept apart from analysis['pid'],
+            # and a small note for template / UI (shared read-only fragment per class)
+            analysis.update(ANALYZER_BASELINES[cls_key])
     except Exception:
         # be tolerant: do not raise, just skip class detection
         pass
 
- # ----------------------------
+    # ----------------------------
     # Confidence score (0-100) + description
     # ----------------------------
+    # ทุก class ถูกให้คะแนน (น้ำหนัก / ระยะจากกลางช่วง size ของแต่ละ class) ด้วย loop ธรรมดา
+    # (ค่าเดียวกับ score_matrix ของ batch แต่ไม่ต้องสร้าง array ต่อ request)
+    # คะแนนหลัก = คะแนนของ class ที่ตรวจเจอ, class_scores = top-k พร้อมสัดส่วนต่อคะแนนรวม
     try:
-        # try to read class meta or baseline data
-        cls_meta = analysis.get("class_meta", {}) or {}
-        baseline = analysis.get("baseline_control", {}) or {}
-
-        max_w = baseline.get("max_weight") or cls_meta.get("max_weight")
-        min_s = baseline.get("min_size") or cls_meta.get("min_size")
-        max_s = baseline.get("max_size") or cls_meta.get("max_size")
-
-        score = 100
-        # weight penalty
-        if max_w:
-            try:
-                w_ratio = float(weight) / float(max_w)
-                w_penalty = min(max(w_ratio, 0), 2.0) * 40  # up to 80 penalty
-                score -= w_penalty
-            except Exception:
-                pass
-
-        # size distance penalty
-        if min_s is not None and max_s is not None:
-            try:
-                center = (float(min_s) + float(max_s)) / 2.0
-                span = (float(max_s) - float(min_s)) / 2.0 or 1.0
-                dist = abs(size - center) / span
-                dist_penalty = min(dist, 2.0) * 30  # up to 60 penalty
-                score -= dist_penalty
-            except Exception:
-                pass
-
-        score = max(0, min(100, int(score)))
+        scores = CLASS_INDEX.scores(float(size), float(weight))
+        total = sum(scores)
+        analysis["class_scores"] = [
+            {
+                "class": CLASS_INDEX.keys[i],
+                "description": DRONE_CLASSES[CLASS_INDEX.keys[i]]["description"],
+                "score": scores[i],
+                "share": round(scores[i] / total, 3) if total > 0 else 0.0,
+            }
+            for i in CLASS_INDEX.top(scores, CLASS_TOP_K)
+        ]
+        if record:
+            score = record.confidence_score
+        else:
+            score = scores[CLASS_INDEX.keys.index(analysis["detected_class"])]
 
         if score >= 70:
             level = "HIGH"
@@ -186,9 +259,134 @@ def analyze_drone(size, battery, style, prop_result, weight):
         analysis["confidence_level"] = "UNKNOWN"
         analysis["confidence_desc"] = "ไม่สามารถคำนวณความเชื่อมั่นได้"
 
-    # <-- make sure return is OUTSIDE the except (same indent as start of function body)
     return analysis
 
+
+def baseline_stage(drone_class):
+    # baseline ของ class ที่ drone_class_stage ตรวจเจอ (ไม่จัด class ซ้ำจาก size อีกตาราง)
+    # baseline_control / pid_baseline / filter_baseline, built once per class
+    return CLASS_BASELINES.get(drone_class.get("detected_class"), UNKNOWN_BASELINE)
+
+
+def similar_stage(size, weight, prop_size, pitch, blades, battery):
+    # PID / filter ของ build ที่จูนแล้วซึ่งใกล้ที่สุด (แนบคู่กับ pid_baseline)
+    return {"similar_builds": BUILD_INDEX.similar(size, weight, prop_size, pitch, blades, battery, SIMILAR_K)}
+
+
+def preset_stage(preset):
+    return {"preset_used": preset or "custom"}
+
+# ===============================
+# PIPELINE: stage graph (ลำดับ = ลำดับ merge ลง analysis)
+# ===============================
+# stages ที่ประกอบเป็น analyze_drone() (ไม่รวม validate / baseline ของ build_analysis)
+DRONE_STAGES = ("overview", "style_profile", "thrust", "runtime", "flight", "drone_class")
+# the prop / pack fields only matter to thrust when measured tables are loaded
+THRUST_INPUTS = ("propeller", "weight") + (("prop_size", "pitch", "blades", "battery") if THRUST_TABLE is not None else ())
+
+PIPELINE = StageGraph(BUILD_FIELDS, [
+    Stage("validate", ("size", "weight", "prop_size", "pitch", "blades"), ("warnings",), validate_stage),
+    Stage("propeller", ("prop_size", "pitch", "blades", "style"), ("prop_result",), propeller_stage),
+    Stage("overview", ("size", "battery", "style", "propeller"), ("overview", "summary", "basic_tips"), overview_stage),
+    Stage("style_profile", ("style",), ("pid", "filter", "extra_tips"), style_profile_stage),
+    Stage("thrust", THRUST_INPUTS, ("thrust_ratio",), thrust_stage),
+    Stage("runtime", ("weight", "battery"), ("battery_est",), runtime_stage),
+    Stage("flight", ("weight", "prop_size", "battery", "style"), ("flight_time",), flight_stage),
+    Stage("drone_class", ("size", "weight"), (
+        "weight_class", "detected_class", "class_meta", "pid_baseline", "filter_baseline", "extra_tips",
+        "confidence_score", "confidence_level", "confidence_desc", "class_scores",
+    ), drone_class_stage),
+    Stage("preset_used", ("preset",), ("preset_used",), preset_stage),
+    Stage("baseline", ("drone_class",), (
+        "detected_class", "class_meta", "baseline_control", "pid_baseline", "filter_baseline",
+    ), baseline_stage),
+    Stage("similar", ("size", "weight", "prop_size", "pitch", "blades", "battery"), ("similar_builds",), similar_stage),
+], memo_size=int(os.environ.get("OBIX_STAGE_MEMO", 512)), observe=METRICS.stage_since)
+
+
+def _build(*values):
+    # normalize_build() tuple -> {field: value} for the stage graph
+    return dict(zip(BUILD_FIELDS, values))
+
+# ===============================
+# LOGIC วิเคราะห์โดรน
+# ===============================
+def analyze_drone(size, battery, style, prop_result, weight, prop_size=None, pitch=None, blades=None):
+    prop = {"prop_result": prop_result}
+    return merge_fragments([
+        overview_stage(size, battery, style, prop),
+        style_profile_stage(style),
+        thrust_stage(prop, weight, prop_size, pitch, blades, battery),
+        runtime_stage(weight, battery),
+        flight_stage(weight, size if prop_size is None else prop_size, battery, style),
+        drone_class_stage(size, weight),
+    ])
+
+# ===============================
+# PIPELINE: normalized inputs -> analysis dict
+# ===============================
+def build_analysis(size, battery, style, weight, prop_size, prop_pitch, blade_count, preset_key=""):
+    fragments = PIPELINE.run(_build(size, battery, style, weight, prop_size, prop_pitch, blade_count, preset_key))
+    # same key order as before: drone analysis, then build-level keys
+    order = DRONE_STAGES + ("preset_used", "baseline", "similar", "validate", "propeller")
+    return AnalysisResult.from_fragments(fragments[name] for name in order)
+
+# ===============================
+# PRESETS: precomputed at startup (immutable JSON + content hash)
+# ===============================
+class PresetResult(NamedTuple):
+    analysis: dict
+    body: bytes
+    etag: str
+
+
+def precompute_presets():
+    results = {}
+    for key in PRESETS:
+        analysis = build_analysis(*normalize_build(preset=key))
+        body = dumps(analysis, sort_keys=True)
+        results[key] = PresetResult(analysis, body, hashlib.sha256(body).hexdigest())
+    return MappingProxyType(results)
+
+
+PRESET_RESULTS = precompute_presets()
+
+# ===============================
+# METRICS: request counters / latency
+# ===============================
+@app.before_request
+def _metrics_start():
+    g.metrics_t0 = time.perf_counter()
+
+
+@app.after_request
+def _metrics_end(response):
+    t0 = g.pop("metrics_t0", None)
+    if t0 is not None:
+        endpoint = request.endpoint or "unknown"
+        METRICS.observe("obix_request_seconds", time.perf_counter() - t0, (("endpoint", endpoint),))
+        METRICS.inc("obix_requests_total", (
+            ("endpoint", endpoint), ("method", request.method), ("status", str(response.status_code)),
+        ))
+        METRICS.maybe_flush()
+        if not BOOT.responded:
+            _first_response()
+    return response
+
+
+def _first_response():
+    elapsed = BOOT.first_response()
+    if elapsed is not None:
+        METRICS.observe("obix_startup_seconds", elapsed, (("phase", "first_response"),))
+        app.logger.info("obix boot: pid %d %s", os.getpid(), BOOT.format())
+
+def _session_uid():
+    # anonymous per-browser id (signed session cookie) for /api/history/recent
+    uid = session.get("uid")
+    if uid is None:
+        uid = session["uid"] = uuid.uuid4().hex
+    return uid
+
 # ===============================
 # ROUTE: Landing Page
 # ===============================
@@ -206,118 +404,33 @@ def index():
     if request.method == "POST":
         try:
             # ----------------------------
-            # อ่านค่า input แบบปลอดภัย
+            # อ่านค่า input ผ่าน BUILD_SCHEMA (+ preset override); ค่าเสีย = ตอบกลับพร้อม error ต่อ field
             # ----------------------------
-            preset_key = request.form.get("preset", "").strip()
-
-            def safe_float(x, default=0.0):
-                try:
-                    return float(x)
-                except Exception:
-                    return default
-
-            def safe_int(x, default=0):
-                try:
-                    return int(x)
-                except Exception:
-                    return default
-
-            size = safe_float(request.form.get("size"), 5.0)
-            battery = request.form.get("battery", "4S")
-            style = request.form.get("style", "freestyle")
-            weight = safe_float(request.form.get("weight"), 1.0)
-            prop_size = safe_float(request.form.get("prop_size"), 5.0)
-            blade_count = safe_int(request.form.get("blades"), 3)
-            prop_pitch = safe_float(request.form.get("pitch"), 4.0)
-
-            # override with preset if selected
-            if preset_key:
-                p = PRESETS.get(preset_key)
-                if p:
-                    size = safe_float(p.get("size", size))
-                    battery = p.get("battery", battery)
-                    style = p.get("style", style)
-                    weight = safe_float(p.get("weight", weight))
-                    prop_size = safe_float(p.get("prop_size", prop_size))
-                    prop_pitch = safe_float(p.get("pitch", prop_pitch))
-                    blade_count = safe_int(p.get("blades", blade_count))
-
-            # validation
-            warnings = validate_input(size, weight, prop_size, prop_pitch, blade_count)
-
-            # prop analysis (ป้องกัน exception)
-            try:
-                prop_result = analyze_propeller(prop_size, prop_pitch, blade_count, style)
-            except Exception:
-                prop_result = {"summary": "prop analysis not available", "effect": {"motor_load": 0, "noise": 0}, "recommendation": ""}
-
-            # main analysis (robust)
-            try:
-                analysis = analyze_drone(size, battery, style, prop_result, weight)
-                if not isinstance(analysis, dict):
-                    app.logger.error("analyze_drone returned non-dict: %r", analysis)
-                    analysis = {
-                        "style": style,
-                        "weight_class": "unknown",
-                        "thrust_ratio": 0,
-                        "flight_time": 0,
-                        "summary": "analysis fallback (invalid return)",
-                        "basic_tips": []
-                    }
-            except Exception:
-                raise  # re-raise so outer except จะจับ
-
-            # detect class (some versions return tuple)
-            try:
-                cls_det = detect_class_from_size(size)
-                if isinstance(cls_det, (tuple, list)):
-                    detected_class, class_meta = cls_det[0], cls_det[1]
-                else:
-                    detected_class = cls_det
-                    class_meta = {}
-            except Exception:
-                detected_class = "unknown"
-                class_meta = {}
-
-            baseline_ctrl = get_baseline_for_class(detected_class) or {}
-            pid_baseline = baseline_ctrl.get("pid", {})
-            filter_baseline = baseline_ctrl.get("filter", {})
-
-            P = pid_baseline.get("P", pid_baseline.get("p", 0))
-            I = pid_baseline.get("I", pid_baseline.get("i", 0))
-            D = pid_baseline.get("D", pid_baseline.get("d", 0))
-
-            # ensure analysis is a dict before assigning
-            if analysis is None:
-                analysis = {}
-            if not isinstance(analysis, dict):
-                analysis = {"summary":"invalid analysis type"}
-
-            analysis["preset_used"] = preset_key or "custom"
-            analysis["detected_class"] = detected_class
-            analysis["class_meta"] = class_meta
-            analysis["baseline_control"] = baseline_ctrl
-            analysis["pid_baseline"] = {
-                "roll": {"p": P, "i": I, "d": D},
-                "pitch": {"p": P, "i": I, "d": D},
-                "yaw": {"p": int(P * 0.6) if P else 0, "i": int(I * 0.6) if I else 0, "d": 0}
-            }
-            analysis["filter_baseline"] = {
-                "gyro_lpf2": filter_baseline.get("gyro_cutoff", filter_baseline.get("gyro_lpf2")),
-                "dterm_lpf1": filter_baseline.get("dterm_lowpass", filter_baseline.get("dterm_lpf1")),
-                "dyn_notch": filter_baseline.get("notch", filter_baseline.get("dyn_notch"))
-            }
-
-            # keep warnings and prop_result
-            analysis["warnings"] = warnings
-            analysis["prop_result"] = prop_result
+            with METRICS.time("parse"):
+                build_key, input_errors = parse_build(request.form)
+            if input_errors:
+                METRICS.inc("obix_input_rejected_total", (("endpoint", "index"),))
+                return render_template("index.html", analysis=None, input_errors=list(input_errors.values())), 400
+            size, battery, style, weight, prop_size, prop_pitch, blade_count, preset_key = build_key
+
+            if preset_key in PRESET_RESULTS:
+                # preset override ignores the other fields: use the startup result
+                analysis = PRESET_RESULTS[preset_key].analysis
+            else:
+                analysis = ANALYSIS_CACHE.get_or_compute(build_key, lambda: build_analysis(*build_key))
+
+            if HISTORY.enabled:
+                # queue only; the writer thread commits in batches
+                HISTORY.record(_session_uid(), _build(*build_key), analysis)
 
             # สรุป: render ปกติ
-            return render_template("index.html", analysis=analysis)
+            with METRICS.time("render"):
+                return render_template("index.html", analysis=analysis)
 
         except Exception:
             # ถ้ามีข้อผิดพลาด ให้ log และแสดง traceback แบบชั่วคราว (dev only)
             tb = traceback.format_exc()
+            METRICS.inc("obix_errors_total", (("endpoint", "index"),))
             app.logger.error("Exception handling /app POST:\n%s", tb)
             # แสดง traceback บนหน้า (ชั่วคราว)
             return "<h3>Internal error (debug)</h3><pre style='white-space:pre-wrap;'>" + tb + "</pre>", 500
@@ -325,6 +438,288 @@ def index():
     # GET: render หน้าเปล่า
     return render_template("index.html", analysis=analysis)
 
+# ===============================
+# API: Batch analysis (JSON, columnar)
+# ===============================
+@app.route("/api/analyze/batch", methods=["POST"])
+def api_analyze_batch():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "expected a JSON object of columns"}), 400
+    try:
+        result = analyze_batch(data)
+    except InputError as e:
+        return _input_error(e)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
+def _input_error(e):
+    # structured per-field errors (BUILD_SCHEMA); nothing was analyzed
+    METRICS.inc("obix_input_rejected_total", (("endpoint", request.endpoint or "unknown"),))
+    return jsonify({"error": str(e), "error_count": e.total, "errors": e.errors}), 400
+
+# ===============================
+# API: Incremental re-analysis (live form updates)
+# ===============================
+@app.route("/api/analyze/delta", methods=["POST"])
+def api_analyze_delta():
+    """
+    {"inputs": {...ทุก field ของฟอร์ม...}, "changed": ["pitch"]}
+    -> {"stages": [...], "patch": {analysis keys ที่เปลี่ยนได้}}; ไม่ส่ง changed = คำนวณทั้งหมด
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("inputs", {}), dict):
+        return jsonify({"error": "expected {\"inputs\": {...}, \"changed\": [...]}"}), 400
+    inputs = {k: v for k, v in data.get("inputs", {}).items() if k in BUILD_FIELDS}
+    changed = data.get("changed") or []
+    if not isinstance(changed, list) or not all(isinstance(f, str) for f in changed):
+        return jsonify({"error": "changed must be a list of field names"}), 400
+    if "preset" in changed:
+        # preset override rewrites the other fields too
+        changed = list(BUILD_FIELDS)
+    build_key, input_errors = parse_build(inputs)
+    if input_errors:
+        return _input_error(InputError(list(input_errors.values())))
+    try:
+        result = PIPELINE.delta(_build(*build_key), changed)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+# ===============================
+# API: Streaming bulk analysis (CSV / NDJSON in, streamed out)
+# ===============================
+@app.route("/api/analyze/stream", methods=["POST"])
+def api_analyze_stream():
+    in_fmt = request.args.get("format") or ("csv" if request.mimetype == "text/csv" else "ndjson")
+    out_fmt = request.args.get("output", "ndjson")
+    if in_fmt not in ("csv", "ndjson") or out_fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "format / output must be csv or ndjson"}), 400
+
+    # read the upload lazily, line by line (works with chunked uploads)
+    src = io.TextIOWrapper(io.BufferedReader(request.stream), encoding="utf-8", newline="")
+    stats = BulkStats()
+    body = iter_output(analyze_stream(iter_records(src, in_fmt), stats), out_fmt, stats)
+    mimetype = "text/csv" if out_fmt == "csv" else "application/x-ndjson"
+    return Response(stream_with_context(body), mimetype=mimetype)
+
+# ===============================
+# API: Blackbox log -> gyro noise spectrum + filter recommendation
+# ===============================
+@app.route("/api/blackbox", methods=["POST"])
+def api_blackbox():
+    """
+    multipart field "log" (werkzeug spools big uploads to disk) หรือ raw CSV body
+    ?size=5&style=freestyle เลือก baseline ที่ใช้เทียบ
+    """
+    size = safe_float(request.args.get("size"), BUILD_DEFAULTS["size"])
+    style = request.args.get("style", BUILD_DEFAULTS["style"])
+    baseline = dict(style_profile_stage(style)["filter"])
+    cls = drone_class_stage(size, BUILD_DEFAULTS["weight"])
+    baseline.update({k: v for k, v in baseline_stage(cls)["filter_baseline"].items() if v is not None})
+    # ไม่ส่ง = อ่านจาก time column; ส่งมาแต่ไม่ใช่ Hz ที่ใช้ได้ (0 / ติดลบ / nan / ข้อความ) = 400
+    raw_rate = request.args.get("sample_rate")
+    sample_rate = safe_float(raw_rate, math.nan) if raw_rate else None
+    if sample_rate is not None and not (math.isfinite(sample_rate) and sample_rate > 0):
+        return jsonify({"error": "sample_rate must be a positive number (Hz)"}), 400
+
+    upload = request.files.get("log")
+    stream = upload.stream if upload is not None else request.stream
+    try:
+        with METRICS.time("blackbox"):
+            report = analyze_log(stream, sample_rate=sample_rate, baseline=baseline)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(report)
+
+# ===============================
+# API: Betaflight diff / dump -> compare against class baseline
+# ===============================
+@app.route("/api/dump/compare", methods=["POST"])
+def api_dump_compare():
+    """
+    multipart field "dump" (ได้หลายไฟล์) หรือ raw text body
+    ?class=freestyle_5 หรือ ?size=5[&weight=750], &tolerance=0.2
+    """
+    args = request.values
+    try:
+        cls_key = resolve_class(
+            args.get("class"),
+            safe_float(args.get("size"), 0.0) or None,
+            safe_float(args.get("weight"), 0.0) or None,
+        )
+        tolerance = safe_float(args.get("tolerance"), DEFAULT_TOLERANCE)
+        uploads = request.files.getlist("dump")
+        if uploads:
+            dumps = [
+                scan_dump(f.read().decode("utf-8", "replace"), COMPARE_SETTINGS, f.filename or f"dump{i}")
+                for i, f in enumerate(uploads)
+            ]
+        else:
+            dumps = [scan_dump(request.get_data(as_text=True), COMPARE_SETTINGS, "body")]
+        with METRICS.time("dump_compare"):
+            report = compare_many(dumps, cls_key, tolerance)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(report)
+
+# ===============================
+# API: Design-space sweep
+# ===============================
+# grid ใหญ่ (>= OBIX_SWEEP_PARALLEL จุด) แบ่งคำนวณหลาย process; pool สร้างครั้งแรกที่ต้องใช้ ต่อ worker
+# OBIX_SWEEP_WORKERS: 0 = OBIX_WORKERS / ทุก core, 1 = ปิด
+SWEEP_WORKERS = int(os.environ.get("OBIX_SWEEP_WORKERS", 0)) or default_workers()
+SWEEP_PARALLEL_POINTS = int(os.environ.get("OBIX_SWEEP_PARALLEL", PARALLEL_SWEEP_POINTS))
+_sweep_pool = None
+_sweep_pool_lock = threading.Lock()
+
+
+def _sweep_executor():
+    global _sweep_pool
+    if SWEEP_WORKERS <= 1:
+        return None
+    with _sweep_pool_lock:
+        if _sweep_pool is None:
+            _sweep_pool = ParallelExecutor(SWEEP_WORKERS)
+        return _sweep_pool
+
+
+@app.route("/api/sweep", methods=["POST"])
+def api_sweep():
+    spec = request.get_json(silent=True)
+    if not isinstance(spec, dict):
+        return jsonify({"error": "expected a JSON object of axis specs"}), 400
+    try:
+        result = sweep_json(spec, _sweep_executor, SWEEP_PARALLEL_POINTS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+# ===============================
+# API: Preset result (static, ETag / 304)
+# ===============================
+@app.route("/api/preset/<key>")
+def api_preset(key):
+    res = PRESET_RESULTS.get(key)
+    if res is None:
+        return jsonify({"error": "unknown preset"}), 404
+    resp = Response(res.body, mimetype="application/json")
+    resp.set_etag(res.etag)
+    resp.headers["Cache-Control"] = "public, max-age=3600, stale-while-revalidate=86400"
+    return resp.make_conditional(request)
+
+# ===============================
+# STATIC: hashed assets (immutable, precompressed br / gzip)
+# ===============================
+@app.route("/assets/<path:filename>")
+def assets(filename):
+    asset = ASSETS.get(filename)
+    if asset is None:
+        return Response("not found", status=404, mimetype="text/plain")
+    encoding = request.accept_encodings.best_match(asset.encodings, default="identity")
+    resp = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+    if encoding != "identity":
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    # one strong ETag per representation
+    resp.set_etag(f"{asset.digest[:16]}-{encoding}")
+    return resp.make_conditional(request)
+
+# ===============================
+# API: Analysis history
+# ===============================
+@app.route("/api/history/recent")
+def api_history_recent():
+    uid = session.get("uid")
+    if not uid or not HISTORY.enabled:
+        return jsonify({"items": []})
+    limit = safe_int(request.args.get("limit"), 20)
+    return jsonify({"items": HISTORY.recent(uid, limit)})
+
+
+@app.route("/api/history")
+def api_history():
+    """?class=freestyle&preset=5_freestyle&since=<epoch>&until=<epoch>&limit=50"""
+    if not HISTORY.enabled:
+        return jsonify({"error": "history disabled (set OBIX_HISTORY_DB)"}), 404
+    args = request.args
+    items = HISTORY.query(
+        cls=args.get("class"),
+        preset=args.get("preset"),
+        since=safe_float(args.get("since"), 0.0) or None,
+        until=safe_float(args.get("until"), 0.0) or None,
+        limit=safe_int(args.get("limit"), 50),
+    )
+    return jsonify({"items": items, "stats": HISTORY.stats()})
+
+# ===============================
+# API: Cache stats (per worker)
+# ===============================
+@app.route("/api/cache/stats")
+def api_cache_stats():
+    stats = ANALYSIS_CACHE.stats()
+    stats["stages"] = PIPELINE.stats()
+    stats["similar"] = BUILD_INDEX.stats()
+    stats["startup"] = BOOT.report()
+    stats["assets"] = ASSETS.stats()
+    stats["thrust_table"] = THRUST_TABLE.stats() if THRUST_TABLE is not None else None
+    stats["flight"] = flight_sim.stats()
+    return jsonify(stats)
+
+# ===============================
+# API: Request profiles (OBIX_PROFILE_*; ต้องส่ง header X-Obix-Profile: <secret>)
+# ===============================
+def _profiles_allowed():
+    return PROFILER is not None and PROFILER.authorized(request.headers.get(PROFILE_HEADER))
+
+
+@app.route("/api/profiles")
+def api_profiles():
+    if not _profiles_allowed():
+        return jsonify({"error": "not found"}), 404
+    return jsonify({"profiler": PROFILER.stats(), "profiles": PROFILER.list()})
+
+
+@app.route("/api/profiles/<profile_id>.<fmt>")
+def api_profile_file(profile_id, fmt):
+    path = PROFILER.file(profile_id, fmt) if _profiles_allowed() else None
+    if path is None:
+        return jsonify({"error": "not found"}), 404
+    return send_file(path, mimetype=PROFILE_FORMATS[fmt], as_attachment=True, download_name=f"{profile_id}.{fmt}")
+
+# ===============================
+# METRICS: Prometheus text format
+# ===============================
+@app.route("/metrics")
+def metrics():
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+# ===============================
+# WARM START: ทำงานตอน import -> ด้วย --preload ทำครั้งเดียวใน master แล้ว worker แชร์ (copy-on-write)
+# ===============================
+def warm_start():
+    # (preset results + the stage memos they filled were computed above by precompute_presets,
+    #  which also built the flight-time curves)
+    # templates: compile (or load bytecode) now instead of on the first request
+    BOOT.templates = precompile_templates(app.jinja_env)
+    # one real render: Jinja globals, url_for / url map, AnalysisResult attribute paths
+    with app.test_request_context("/app", method="POST"):
+        render_template("index.html", analysis=next(iter(PRESET_RESULTS.values())).analysis)
+    # numpy kernels / rule tables behind the batch + bulk APIs
+    analyze_batch({"size": [BUILD_DEFAULTS["size"]], "weight": [BUILD_DEFAULTS["weight"]]})
+
+
+BOOT.mark("import")
+if os.environ.get("OBIX_WARM", "1") != "0":
+    warm_start()
+    BOOT.mark("warm")
+# stage timings of precompute / warm-up are boot work, not traffic (and with --preload
+# every forked worker would re-export the master's copy)
+METRICS.reset()
+
 # ===============================
 # RUN
 # ===============================
@@ -0,0 +1,268 @@
+# benchmarks/hotpaths.py
+# OBIXConfig Doctor - microbenchmarks for every analyzer hot path + regression gate
+#
+# usage:
+#   python -m benchmarks.hotpaths run -o bench.json
+#   python -m benchmarks.hotpaths compare bench_baseline.json --threshold 0.25
+#   python -m benchmarks.hotpaths compare bench_baseline.json --current bench.json
+#
+# compare mode exits 1 if any case's p50 got slower than baseline * (1 + threshold)
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analyzer.drone_class import detect_drone_class
+from analyzer.prop_logic import analyze_propeller
+from analyzer.thrust_logic import calculate_thrust_weight, estimate_battery_runtime
+from logic.cache import AnalysisCache
+from logic.presets import PRESETS, detect_class_from_size, get_baseline_for_class
+
+Build = Dict[str, Any]
+
+
+# -----------------------
+# Input distributions
+# -----------------------
+def preset_builds() -> List[Build]:
+    return [
+        {k: p[k] for k in ("size", "weight", "battery", "style", "prop_size", "pitch", "blades")}
+        for p in PRESETS.values()
+    ]
+
+
+def random_builds(n: int, seed: int = 1) -> List[Build]:
+    rng = random.Random(seed)
+    return [
+        {
+            "size": round(rng.uniform(2.0, 10.0), 1),
+            "weight": float(rng.randint(60, 2500)),
+            "battery": rng.choice(("4S", "6S", "2S")),
+            "style": rng.choice(("freestyle", "racing", "longrange")),
+            "prop_size": round(rng.uniform(2.0, 10.0), 1),
+            "pitch": round(rng.uniform(2.0, 6.5), 1),
+            "blades": rng.choice((2, 3, 4)),
+        }
+        for _ in range(n)
+    ]
+
+
+def out_of_range_builds(n: int, seed: int = 2) -> List[Build]:
+    """Sizes outside / between class intervals (nearest-centre fallback) and overweight builds."""
+    rng = random.Random(seed)
+    sizes = (0.5, 1.2, 1.9, 2.55, 2.95, 3.05, 4.55, 5.45, 10.5, 14.0)
+    return [
+        {
+            "size": rng.choice(sizes),
+            "weight": float(rng.choice((0.5, 4000, 6000, rng.randint(100, 900)))),
+            "battery": rng.choice(("4S", "6S", "8S")),
+            "style": rng.choice(("freestyle", "cine")),
+            "prop_size": round(rng.uniform(0.5, 15.0), 1),
+            "pitch": round(rng.uniform(1.0, 8.0), 1),
+            "blades": rng.choice((1, 2, 3, 4, 6)),
+        }
+        for _ in range(n)
+    ]
+
+
+def distributions(n: int) -> Dict[str, List[Build]]:
+    return {
+        "presets": preset_builds(),
+        "random": random_builds(n),
+        "out_of_range": out_of_range_builds(n),
+    }
+
+
+# -----------------------
+# Cases: name -> (setup(builds) -> list of zero-arg callables)
+# -----------------------
+def _cases() -> Dict[str, Callable[[List[Build]], List[Callable[[], Any]]]]:
+    # app is imported lazily so the analyzer-only cases don't pay for Flask
+    import app as webapp
+
+    def prop(b):
+        return analyze_propeller(b["prop_size"], b["pitch"], b["blades"], b["style"])
+
+    def form(b):
+        return {k: str(v) for k, v in b.items()}
+
+    # measure the full pipeline, not cache hits
+    webapp.ANALYSIS_CACHE = AnalysisCache(maxsize=0)
+    webapp.PIPELINE.memo_size = 0
+    client = webapp.app.test_client()
+
+    return {
+        "analyze_propeller": lambda bs: [
+            (lambda b=b: analyze_propeller(b["prop_size"], b["pitch"], b["blades"], b["style"])) for b in bs
+        ],
+        "calculate_thrust_weight": lambda bs: [
+            (lambda b=b, ml=prop(b)["effect"]["motor_load"]: calculate_thrust_weight(ml, b["weight"])) for b in bs
+        ],
+        "thrust_stage": lambda bs: [
+            (lambda b=b, p={"prop_result": prop(b)}: webapp.thrust_stage(
+                p, b["weight"], b["prop_size"], b["pitch"], b["blades"], b["battery"],
+            )) for b in bs
+        ],
+        "estimate_battery_runtime": lambda bs: [
+            (lambda b=b: estimate_battery_runtime(b["weight"], b["battery"])) for b in bs
+        ],
+        "flight_stage": lambda bs: [
+            (lambda b=b: webapp.flight_stage(b["weight"], b["prop_size"], b["battery"], b["style"])) for b in bs
+        ],
+        "detect_drone_class": lambda bs: [
+            (lambda b=b: detect_drone_class(b["size"], b["weight"])) for b in bs
+        ],
+        "detect_class_from_size": lambda bs: [
+            (lambda b=b: detect_class_from_size(b["size"])) for b in bs
+        ],
+        "get_baseline_for_class": lambda bs: [
+            (lambda k=detect_class_from_size(b["size"])[0]: get_baseline_for_class(k)) for b in bs
+        ],
+        "validate_input": lambda bs: [
+            (lambda b=b: webapp.validate_input(b["size"], b["weight"], b["prop_size"], b["pitch"], b["blades"]))
+            for b in bs
+        ],
+        "analyze_drone": lambda bs: [
+            (lambda b=b, p=prop(b): webapp.analyze_drone(
+                b["size"], b["battery"], b["style"], p, b["weight"], b["prop_size"], b["pitch"], b["blades"],
+            )) for b in bs
+        ],
+        "app_post": lambda bs: [
+            (lambda f=form(b): client.post("/app", data=f)) for b in bs
+        ],
+    }
+
+
+# -----------------------
+# Timing
+# -----------------------
+def _time_case(calls: Sequence[Callable[[], Any]], samples: int, per_sample: int) -> Dict[str, Any]:
+    n = len(calls)
+    perf = time.perf_counter_ns
+    # warm-up: every input at least once and ~50 ms of steady calls
+    deadline = perf() + 50_000_000
+    while True:
+        for fn in calls:
+            fn()
+        if perf() >= deadline:
+            break
+    timings = np.empty(samples, dtype=np.float64)
+    j = 0
+    for s in range(samples):
+        t0 = perf()
+        for _ in range(per_sample):
+            calls[j]()
+            j += 1
+            if j == n:
+                j = 0
+        timings[s] = (perf() - t0) / per_sample / 1000.0
+    p50, p90, p99 = np.percentile(timings, (50, 90, 99))
+    return {
+        "p50_us": round(float(p50), 3),
+        "p90_us": round(float(p90), 3),
+        "p99_us": round(float(p99), 3),
+        "mean_us": round(float(timings.mean()), 3),
+        "samples": samples,
+        "calls_per_sample": per_sample,
+    }
+
+
+def run(n_builds: int = 500, samples: int = 200, per_sample: int = 100,
+        only: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    cases = _cases()
+    dists = distributions(n_builds)
+    results: Dict[str, Any] = {}
+    for case, setup in cases.items():
+        if only and case not in only:
+            continue
+        # the full POST is ~1000x slower than the pure functions: fewer calls
+        case_samples, case_per = (max(20, samples // 10), 1) if case == "app_post" else (samples, per_sample)
+        for dist, builds in dists.items():
+            results[f"{case}/{dist}"] = _time_case(setup(builds), case_samples, case_per)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float,
+            metric: str = "p50_us") -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Return (rows, regressions); a regression is current > baseline * (1 + threshold)."""
+    rows, regressions = [], []
+    for key, cur in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if not base:
+            continue
+        ratio = cur[metric] / base[metric] if base[metric] else float("inf")
+        row = {"case": key, "baseline": base[metric], "current": cur[metric], "ratio": round(ratio, 3)}
+        rows.append(row)
+        if ratio > 1.0 + threshold:
+            regressions.append(row)
+    return rows, regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.hotpaths", description="OBIXConfig Doctor hot-path benchmarks")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    def common(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--builds", type=int, default=500, help="random / out-of-range inputs per distribution")
+        p.add_argument("--samples", type=int, default=200)
+        p.add_argument("--per-sample", type=int, default=100, help="calls averaged into one sample")
+        p.add_argument("--only", nargs="*", help="case names to run")
+
+    p_run = sub.add_parser("run", help="run benchmarks and write JSON")
+    common(p_run)
+    p_run.add_argument("-o", "--output", default="-")
+
+    p_cmp = sub.add_parser("compare", help="fail on regressions against a baseline file")
+    common(p_cmp)
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("--current", help="existing results file instead of a fresh run")
+    p_cmp.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown (0.25 = +25%%)")
+    p_cmp.add_argument("--metric", default="p50_us", choices=("p50_us", "p90_us", "p99_us", "mean_us"))
+
+    args = ap.parse_args(argv)
+
+    if args.cmd == "run":
+        report = run(args.builds, args.samples, args.per_sample, args.only)
+        text = json.dumps(report, indent=2, ensure_ascii=False)
+        if args.output == "-":
+            print(text)
+        else:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if args.current:
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+    else:
+        current = run(args.builds, args.samples, args.per_sample, args.only)
+
+    rows, regressions = compare(baseline, current, args.threshold, args.metric)
+    for row in rows:
+        flag = "REGRESSION" if row in regressions else "ok"
+        print(f"{row['case']:<42} {row['baseline']:>10.3f} -> {row['current']:>10.3f} us  x{row['ratio']:<6} {flag}")
+    if regressions:
+        print(f"{len(regressions)} hot path(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+# benchmarks/loadtest.py
+# OBIXConfig Doctor - local HTTP load test: start gunicorn per config, replay a request mix, compare
+#
+# usage:
+#   python -m benchmarks.loadtest --configs sync:1 sync:2 gthread:2x4 --concurrency 8 --duration 20
+#   python -m benchmarks.loadtest --url http://127.0.0.1:10000 --concurrency 16 -o load.json
+#
+# config = <worker_class>:<workers>[x<threads>]  เช่น sync:2 / gthread:2x4
+# client เป็น closed loop: แต่ละ connection ส่ง request ถัดไปทันทีที่ได้ response
+# client กับ server อยู่เครื่องเดียวกัน -> ใช้ --client-procs แยก process ให้ client ไม่ติด GIL ตัวเดียว
+# และตีความตัวเลขเทียบกันระหว่าง config มากกว่าดูค่าสัมบูรณ์
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from benchmarks.hotpaths import random_builds
+from logic.presets import PRESETS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# request mix: (kind, weight)
+DEFAULT_MIX = (("get", 0.3), ("preset", 0.3), ("custom", 0.4))
+GET_PATHS = ("/app", "/landing")
+FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+
+class Request(NamedTuple):
+    kind: str
+    method: str
+    path: str
+    body: Optional[bytes]
+
+
+class ServerConfig(NamedTuple):
+    worker_class: str
+    workers: int
+    threads: int
+
+    @property
+    def label(self) -> str:
+        return f"{self.worker_class}:{self.workers}" + (f"x{self.threads}" if self.threads > 1 else "")
+
+
+def parse_config(text: str) -> ServerConfig:
+    """'sync:2' / 'gthread:2x4' -> ServerConfig."""
+    try:
+        worker_class, rest = text.split(":", 1)
+        workers, _, threads = rest.partition("x")
+        return ServerConfig(worker_class, int(workers), int(threads or 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad config {text!r}: expected <worker_class>:<workers>[x<threads>]")
+
+
+def parse_mix(text: str) -> Tuple[Tuple[str, float], ...]:
+    """'get=3,preset=3,custom=4' -> normalized weights."""
+    pairs = []
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in ("get", "preset", "custom"):
+            raise argparse.ArgumentTypeError(f"unknown request kind {kind!r}")
+        pairs.append((kind, float(weight or 1)))
+    total = sum(w for _, w in pairs) or 1.0
+    return tuple((k, w / total) for k, w in pairs)
+
+
+# -----------------------
+# request mix
+# -----------------------
+def build_requests(n: int, mix: Sequence[Tuple[str, float]], seed: int = 7) -> List[Request]:
+    """Deterministic request sequence; custom builds come from the hotpaths random distribution."""
+    rng = random.Random(seed)
+    kinds = [k for k, _ in mix]
+    weights = [w for _, w in mix]
+    customs = random_builds(max(1, n), seed=seed)
+    presets = list(PRESETS)
+    out = []
+    for i in range(n):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "get":
+            out.append(Request(kind, "GET", rng.choice(GET_PATHS), None))
+        elif kind == "preset":
+            out.append(Request(kind, "POST", "/app", urlencode({"preset": rng.choice(presets)}).encode()))
+        else:
+            out.append(Request(kind, "POST", "/app", urlencode(customs[i]).encode()))
+    return out
+
+
+# -----------------------
+# client (closed loop)
+# -----------------------
+def _connect(host: str, port: int, timeout: float) -> http.client.HTTPConnection:
+    return http.client.HTTPConnection(host, port, timeout=timeout)
+
+
+def _client_thread(host: str, port: int, requests: Sequence[Request], offset: int, stride: int,
+                   deadline: float, warmup_until: float, timeout: float, out: List[Tuple[str, float, int]]) -> None:
+    conn = _connect(host, port, timeout)
+    i = offset
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        req = requests[i % len(requests)]
+        i += stride
+        t0 = time.perf_counter()
+        try:
+            conn.request(req.method, req.path, body=req.body, headers=FORM_HEADERS if req.body else {})
+            resp = conn.getresponse()
+            resp.read()
+            status = resp.status
+            if resp.will_close:
+                conn.close()
+                conn = _connect(host, port, timeout)
+        except (OSError, http.client.HTTPException):
+            status = 0  # connection error / timeout
+            conn.close()
+            conn = _connect(host, port, timeout)
+        if t0 >= warmup_until:
+            out.append((req.kind, time.perf_counter() - t0, status))
+    conn.close()
+
+
+def _client_proc(args: Tuple[str, int, Sequence[Request], int, int, int, float, float, float]) -> List[Tuple[str, float, int]]:
+    host, port, requests, first, threads, stride, duration, warmup, timeout = args
+    start = time.perf_counter()
+    deadline = start + warmup + duration
+    results: List[List[Tuple[str, float, int]]] = [[] for _ in range(threads)]
+    pool = [
+        threading.Thread(target=_client_thread, args=(
+            host, port, requests, first + t, stride, deadline, start + warmup, timeout, results[t],
+        ), daemon=True)
+        for t in range(threads)
+    ]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return [r for rs in results for r in rs]
+
+
+def drive(url: str, requests: Sequence[Request], concurrency: int, duration: float, warmup: float,
+          client_procs: int = 1, timeout: float = 30.0) -> Dict[str, Any]:
+    """Hit url with `concurrency` connections for warmup + duration seconds; summarize the measured part."""
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    procs = max(1, min(client_procs, concurrency))
+    per = [concurrency // procs + (1 if p < concurrency % procs else 0) for p in range(procs)]
+    jobs, first = [], 0
+    for threads in per:
+        jobs.append((host, port, requests, first, threads, concurrency, duration, warmup, timeout))
+        first += threads
+    if procs == 1:
+        samples = _client_proc(jobs[0])
+    else:
+        with multiprocessing.get_context("spawn").Pool(procs) as pool:
+            samples = [s for part in pool.map(_client_proc, jobs) for s in part]
+    return summarize(samples, duration)
+
+
+def _latency(values: Sequence[float]) -> Dict[str, Any]:
+    if not values:
+        return {"count": 0}
+    ms = np.asarray(values) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(ms),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "mean_ms": round(float(ms.mean()), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def summarize(samples: Sequence[Tuple[str, float, int]], duration: float) -> Dict[str, Any]:
+    errors = sum(1 for _, _, status in samples if not 200 <= status < 400)
+    statuses: Dict[str, int] = {}
+    for _, _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    by_kind: Dict[str, List[float]] = {}
+    for kind, seconds, _ in samples:
+        by_kind.setdefault(kind, []).append(seconds)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(samples) / duration, 1) if duration else 0.0,
+        "latency": _latency([s for _, s, _ in samples]),
+        "by_kind": {kind: _latency(values) for kind, values in sorted(by_kind.items())},
+        "status": statuses,
+    }
+
+
+# -----------------------
+# server (gunicorn per config)
+# -----------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(port: int, proc: subprocess.Popen, timeout: float) -> float:
+    """Seconds until the first 200 (boot -> first byte as a user after an idle wake-up sees it)."""
+    t0 = time.monotonic()
+    deadline = t0 + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {proc.returncode}")
+        try:
+            conn = _connect("127.0.0.1", port, 2.0)
+            conn.request("GET", "/landing")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return time.monotonic() - t0
+        except OSError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError(f"gunicorn not ready on port {port} after {timeout:.0f}s")
+
+
+def start_server(config: ServerConfig, port: int, extra_args: Sequence[str] = (),
+                 ready_timeout: float = 60.0) -> Tuple[subprocess.Popen, float]:
+    cmd = [
+        sys.executable, "-m", "gunicorn", "app:app",
+        "--bind", f"127.0.0.1:{port}",
+        "--worker-class", config.worker_class,
+        "--workers", str(config.workers),
+        "--threads", str(config.threads),
+        "--log-level", "warning",
+        *extra_args,
+    ]
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, start_new_session=True)
+    try:
+        ready_s = _wait_ready(port, proc, ready_timeout)
+    except Exception:
+        stop_server(proc)
+        raise
+    return proc, ready_s
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    if proc.poll() is None:
+        os.killpg(proc.pid, signal.SIGTERM)
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+
+
+def run(configs: Sequence[ServerConfig], concurrency: Sequence[int], duration: float, warmup: float,
+        mix: Sequence[Tuple[str, float]], client_procs: int = 1, url: Optional[str] = None,
+        gunicorn_args: Sequence[str] = (), seed: int = 7) -> Dict[str, Any]:
+    requests = build_requests(4096, mix, seed)
+    results = []
+    targets: List[Tuple[str, Optional[ServerConfig]]] = [(url, None)] if url else [("", c) for c in configs]
+    for target, config in targets:
+        proc = None
+        ready_s = None
+        if config is not None:
+            port = _free_port()
+            proc, ready_s = start_server(config, port, gunicorn_args)
+            target = f"http://127.0.0.1:{port}"
+            print(f"{config.label:<16} first byte after {ready_s * 1000:.0f} ms", file=sys.stderr)
+        try:
+            for c in concurrency:
+                row = {"config": config.label if config else target, "concurrency": c}
+                if ready_s is not None:
+                    row["startup_ms"] = round(ready_s * 1000, 1)
+                row.update(drive(target, requests, c, duration, warmup, client_procs))
+                results.append(row)
+                print(_format_row(row), file=sys.stderr)
+        finally:
+            if proc is not None:
+                stop_server(proc)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "duration_s": duration,
+            "warmup_s": warmup,
+            "mix": dict(mix),
+            "client_procs": client_procs,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def _format_row(row: Dict[str, Any]) -> str:
+    lat = row["latency"]
+    return (
+        f"{row['config']:<16} c={row['concurrency']:<4} {row['throughput_rps']:>8.1f} req/s  "
+        f"p50 {lat.get('p50_ms', 0):>7.1f}  p95 {lat.get('p95_ms', 0):>7.1f}  p99 {lat.get('p99_ms', 0):>7.1f} ms  "
+        f"errors {row['error_rate']:.2%}"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description="OBIXConfig Doctor HTTP load test")
+    ap.add_argument("--configs", nargs="+", type=parse_config,
+                    default=[parse_config(c) for c in ("sync:1", "sync:2", "gthread:1x4", "gthread:2x4")],
+                    help="gunicorn configs to compare, e.g. sync:2 gthread:2x4")
+    ap.add_argument("--url", help="load an already running server instead of starting gunicorn")
+    ap.add_argument("--concurrency", nargs="+", type=int, default=[8], help="concurrent connections (several = sweep)")
+    ap.add_argument("--duration", type=float, default=20.0, help="measured seconds per run")
+    ap.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before each run")
+    ap.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. get=3,preset=3,custom=4")
+    ap.add_argument("--client-procs", type=int, default=1, help="client processes sharing the connections")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--gunicorn-arg", action="append", default=[], help="extra gunicorn argument, e.g. --gunicorn-arg=--max-requests=1000 (repeatable)")
+    ap.add_argument("-o", "--output", default="-")
+    args = ap.parse_args(argv)
+
+    report = run(args.configs, args.concurrency, args.duration, args.warmup, args.mix,
+                 args.client_procs, args.url, args.gunicorn_arg, args.seed)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 1 if any(r["requests"] == 0 for r in report["results"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+# gunicorn.conf.py
+# OBIXConfig Doctor - gunicorn settings (gunicorn อ่านไฟล์นี้เองเมื่อรันจากโฟลเดอร์โปรเจกต์)
+#
+# preload (default): import app + warm_start() ครั้งเดียวใน master แล้วค่อย fork
+#   -> worker ได้ตาราง / template ที่ compile แล้ว / preset results แบบ copy-on-write
+#   OBIX_PRELOAD=0 กลับไปให้แต่ละ worker import เอง
+# CLI (--bind, --workers, ...) ยัง override ค่าในไฟล์นี้ได้ตามปกติ
+
+import os
+import sys
+
+from logic.metrics import clear_snapshots, retire_snapshot
+from logic.startup import boot_t0, freeze_heap
+
+# one boot clock for master + workers: seconds are measured from here
+os.environ.setdefault("OBIX_BOOT_T0", repr(boot_t0()))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+preload_app = os.environ.get("OBIX_PRELOAD", "1") != "0"
+
+
+def when_ready(server):
+    # master: sockets bound, app preloaded, no worker forked yet
+    web = sys.modules.get("app")
+    if web is None:
+        return
+    frozen = freeze_heap()
+    web.BOOT.mark("ready")
+    server.log.info("obix boot: %s (gc.freeze: %d objects)", web.BOOT.format(), frozen)
+
+
+def on_starting(server):
+    # master, before any worker: /metrics must not sum snapshots of a previous run / deploy
+    removed = clear_snapshots(os.environ.get("OBIX_METRICS_DIR"))
+    if removed:
+        server.log.info("obix metrics: removed %d stale worker snapshot(s)", removed)
+
+
+def worker_exit(server, worker):
+    # worker, on its way out (max_requests / graceful stop): write the last unflushed samples
+    web = sys.modules.get("app")
+    if web is not None:
+        web.METRICS.flush()
+
+
+def child_exit(server, worker):
+    # master, after a worker exited for any reason (also SIGKILL / timeout / max_requests):
+    # keep its totals in obix_retired.json so /metrics counters never go backwards
+    retire_snapshot(os.environ.get("OBIX_METRICS_DIR"), worker.pid)
@@ -0,0 +1,247 @@
+# logic/assets.py
+# OBIXConfig Doctor - static asset pipeline: content-hashed names + precompressed variants
+#
+# ทุกไฟล์ใน static/ -> <ชื่อ>.<sha256 12 ตัว>.<ext> ใน OBIX_ASSETS_DIR (default .cache/assets)
+#   + .gz (และ .br ถ้าติดตั้ง pip install brotli) สำหรับไฟล์ text ที่บีบแล้วเล็กลง
+#   + manifest.json : ชื่อเดิม -> ชื่อที่ hash แล้ว
+# ชื่อเปลี่ยนเมื่อเนื้อหาเปลี่ยน -> ตอบด้วย Cache-Control: immutable ได้ (/assets/<hashed>)
+# ตอน boot build() ใช้ไฟล์ที่บีบไว้แล้วซ้ำ (ดูจาก hash) จึงเหลือแค่อ่าน + hash
+#
+#   python -m logic.assets vendor   # ดาวน์โหลด Chart.js ลง static/vendor (ครั้งเดียว, commit ได้)
+#   python -m logic.assets build    # build step: hash + gzip/brotli ทุกไฟล์
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import urllib.request
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DIR = os.path.join(ROOT, "static")
+DEFAULT_OUT_DIR = os.path.join(ROOT, ".cache", "assets")
+URL_PREFIX = "/assets/"
+HASH_LEN = 12
+
+# text types worth precompressing (png / jpg are already compressed)
+COMPRESSIBLE = frozenset({".css", ".js", ".svg", ".json", ".txt", ".map", ".html"})
+# server preference order for Accept-Encoding negotiation
+ENCODINGS: Tuple[str, ...] = ("br", "gzip", "identity")
+SUFFIX = {"br": ".br", "gzip": ".gz"}
+
+# vendored third-party files: static path -> upstream URL (also the fallback when not vendored)
+CHART_JS_VERSION = "4.4.1"
+VENDOR: Mapping[str, str] = MappingProxyType({
+    "vendor/chart.umd.js": f"https://cdn.jsdelivr.net/npm/chart.js@{CHART_JS_VERSION}/dist/chart.umd.js",
+})
+
+
+class Asset(NamedTuple):
+    name: str                      # path under static/ ("css/style.css")
+    hashed: str                    # "css/style.0123456789ab.css"
+    digest: str                    # sha256 of the original bytes
+    mimetype: str
+    bodies: Mapping[str, bytes]    # encoding -> bytes ("identity" always present)
+
+    @property
+    def encodings(self) -> List[str]:
+        return [e for e in ENCODINGS if e in self.bodies]
+
+
+def hashed_name(name: str, digest: str) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest[:HASH_LEN]}{ext}"
+
+
+# -----------------------
+# build
+# -----------------------
+def _compress(encoding: str, data: bytes) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)  # type: ignore[union-attr]
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _source_files(source: str) -> List[str]:
+    names = []
+    for dirpath, dirnames, filenames in os.walk(source):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for filename in sorted(filenames):
+            if not filename.startswith("."):
+                names.append(os.path.relpath(os.path.join(dirpath, filename), source).replace(os.sep, "/"))
+    return names
+
+
+def build(source: str = SOURCE_DIR, out: Optional[str] = DEFAULT_OUT_DIR) -> Dict[str, Asset]:
+    """
+    Hash + precompress every file under `source`. With `out`, variants are
+    written there (and reused on the next build when the hash matches);
+    an unwritable `out` only costs recompression at the next boot.
+    """
+    assets: Dict[str, Asset] = {}
+    writable = out is not None
+    for name in _source_files(source):
+        data = _read(os.path.join(source, name))
+        if data is None:
+            continue
+        digest = hashlib.sha256(data).hexdigest()
+        hashed = hashed_name(name, digest)
+        mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        bodies = {"identity": data}
+        if os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+            for encoding in ("br", "gzip"):
+                path = os.path.join(out, hashed + SUFFIX[encoding]) if out else None
+                body = _read(path) if path else None
+                if body is None:
+                    if encoding == "br" and brotli is None:
+                        continue  # a .br from a build step with brotli is still served
+                    body = _compress(encoding, data)
+                    if writable:
+                        try:
+                            _write_atomic(path, body)  # type: ignore[arg-type]
+                        except OSError:
+                            writable = False
+                if len(body) < len(data):
+                    bodies[encoding] = body
+        assets[name] = Asset(name, hashed, digest, mimetype, MappingProxyType(bodies))
+
+    if writable:
+        manifest = {
+            "version": 1,
+            "assets": {
+                a.name: {"file": a.hashed, "sizes": {e: len(b) for e, b in a.bodies.items()}}
+                for a in assets.values()
+            },
+        }
+        try:
+            _write_atomic(os.path.join(out, "manifest.json"),  # type: ignore[arg-type]
+                          json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+            _prune(out, assets)  # type: ignore[arg-type]
+        except OSError:
+            pass
+    return assets
+
+
+def _prune(out: str, assets: Mapping[str, Asset]) -> None:
+    """Remove variants of content that no longer exists under static/."""
+    keep = {a.hashed + SUFFIX[e] for a in assets.values() for e in SUFFIX}
+    for name in _source_files(out):
+        if name != "manifest.json" and name not in keep:
+            try:
+                os.remove(os.path.join(out, name))
+            except OSError:
+                pass
+
+
+# -----------------------
+# lookup (app side)
+# -----------------------
+class AssetStore:
+    """In-memory assets by logical and by hashed name (bodies shared copy-on-write after preload)."""
+
+    def __init__(self, assets: Mapping[str, Asset]):
+        self.assets = MappingProxyType(dict(assets))
+        self.by_hashed = MappingProxyType({a.hashed: a for a in assets.values()})
+        self.urls = MappingProxyType({name: URL_PREFIX + a.hashed for name, a in assets.items()})
+
+    @classmethod
+    def from_env(cls) -> "AssetStore":
+        """OBIX_ASSETS_DIR (default .cache/assets; "off" = keep everything in memory only)."""
+        out = os.environ.get("OBIX_ASSETS_DIR", DEFAULT_OUT_DIR)
+        return cls(build(SOURCE_DIR, None if out.lower() == "off" else out))
+
+    def url(self, name: str) -> Optional[str]:
+        """Hashed URL of static/<name>; vendored files fall back to their CDN URL; None = unknown."""
+        url = self.urls.get(name)
+        if url is None:
+            return VENDOR.get(name)
+        return url
+
+    def get(self, hashed: str) -> Optional[Asset]:
+        return self.by_hashed.get(hashed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "count": len(self.assets),
+            "brotli": brotli is not None,
+            "bytes": {e: sum(len(a.bodies.get(e, a.bodies["identity"])) for a in self.assets.values())
+                      for e in ENCODINGS},
+            "vendored": {name: name in self.assets for name in VENDOR},
+        }
+
+
+# -----------------------
+# vendoring
+# -----------------------
+def vendor(source: str = SOURCE_DIR, force: bool = False) -> List[Tuple[str, int]]:
+    """Download VENDOR files into static/ (skipped when present unless force)."""
+    out = []
+    for name, url in VENDOR.items():
+        path = os.path.join(source, name)
+        if os.path.exists(path) and not force:
+            continue
+        with urllib.request.urlopen(url, timeout=30) as resp:
+            data = resp.read()
+        _write_atomic(path, data)
+        out.append((name, len(data)))
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m logic.assets", description="build hashed + precompressed static assets")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_vendor = sub.add_parser("vendor", help="download third-party files into static/vendor")
+    p_vendor.add_argument("--force", action="store_true")
+    p_build = sub.add_parser("build", help="hash + gzip/brotli every file under static/")
+    p_build.add_argument("--out", default=os.environ.get("OBIX_ASSETS_DIR", DEFAULT_OUT_DIR))
+    p_build.add_argument("--allow-cdn", action="store_true", help="build even if VENDOR files are missing")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "vendor":
+        for name, size in vendor(force=args.force):
+            print(f"{name:<32} {size:>9} bytes")
+        return 0
+
+    # deploy build ต้องมีไฟล์ vendor ครบ (commit ไว้ใน static/vendor); CDN fallback มีไว้แค่ตอน dev
+    missing = [name for name in VENDOR if not os.path.isfile(os.path.join(SOURCE_DIR, name))]
+    if missing and not args.allow_cdn:
+        print(f"not vendored: {', '.join(missing)} (run `python -m logic.assets vendor` and commit, "
+              f"or pass --allow-cdn)", file=sys.stderr)
+        return 1
+
+    assets = build(SOURCE_DIR, args.out)
+    for a in assets.values():
+        sizes = "  ".join(f"{e} {len(b)}" for e, b in sorted(a.bodies.items()))
+        print(f"{a.hashed:<44} {sizes}")
+    if missing:
+        print(f"not vendored (CDN fallback): {', '.join(missing)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+# logic/atlas.py
+# OBIXConfig Doctor - precomputed, memory-mapped analysis atlas
+#
+# build (offline / at deploy):
+#   python -m logic.atlas build atlas.bin
+# runtime: ตั้ง OBIX_ATLAS=atlas.bin แล้วทุก worker จะ mmap ไฟล์เดียวกัน (page cache ใช้ร่วมกัน)
+#
+# ผลวิเคราะห์ที่เป็นตัวเลขขึ้นกับ input แค่บางตัว จึงแยกเป็น section แทน product เต็ม
+#   section "sw"  : size x weight      -> drone_class (= detected_class), weight_class, confidence
+#   section "thr" : weight x motor_load -> thrust_ratio
+#   section "bat" : weight x battery   -> battery_est
+# lookup = คำนวณ index ของแต่ละ section (O(1)) + อ่าน record; นอก grid -> คำนวณสดตามเดิม
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from analyzer.batch import (
+    BATTERIES, WEIGHT_CLASS_LABELS, analyze_columns, calculate_thrust_weight_batch, round_like_python,
+)
+from analyzer.drone_class import CLASS_INDEX
+from logic.cache import tables_fingerprint
+
+MAGIC = b"OBIXATL1"
+FORMAT_VERSION = 2  # 2: one class per build (no separate size-only preset class)
+HEADER = struct.Struct("<8sII")  # magic, version, json header length
+ALIGN = 64
+
+MOTOR_LOADS = (2, 3, 4, 5, 6)
+SW_DTYPE = np.dtype([
+    ("drone_class", "u1"), ("weight_class", "u1"), ("confidence", "u1"),
+])
+
+
+class SizeWeightRecord(NamedTuple):
+    drone_class: str
+    weight_class: str
+    confidence_score: int
+
+
+class AtlasRecord(NamedTuple):
+    drone_class: str
+    weight_class: str
+    confidence_score: int
+    thrust_ratio: float
+    battery_est: float
+
+
+def grid(start: float, stop: float, step: float) -> np.ndarray:
+    """Grid values rounded to the decimal the user would type (exact float match)."""
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return np.round(start + step * np.arange(count), 6)
+
+
+# -----------------------
+# Builder
+# -----------------------
+def _sections(sizes: np.ndarray, weights: np.ndarray) -> Dict[str, np.ndarray]:
+    s, w = np.meshgrid(sizes, weights, indexing="ij")
+    n = s.size
+    res = analyze_columns(
+        s.ravel(), w.ravel(), np.zeros(n, dtype=np.int8),
+        np.full(n, 5.0), np.full(n, 4.0), np.full(n, 3, dtype=np.int64),
+    )
+    sw = np.empty(n, dtype=SW_DTYPE)
+    sw["drone_class"] = res["drone_class"]
+    sw["weight_class"] = res["weight_class"]
+    sw["confidence"] = res["confidence_score"]
+
+    # the formula part of thrust only depends on motor_load and weight (measured thrust
+    # tables, when present, are looked up before the atlas and are not stored here)
+    nw = len(weights)
+    thr = np.empty((nw, len(MOTOR_LOADS)), dtype=np.float64)
+    for j, load in enumerate(MOTOR_LOADS):
+        thr[:, j] = round_like_python(calculate_thrust_weight_batch(np.full(nw, load), weights), 2)
+
+    bat = np.empty((nw, len(BATTERIES)), dtype=np.float64)
+    for j in range(len(BATTERIES)):
+        r = analyze_columns(
+            np.full(nw, 5.0), weights, np.full(nw, j, dtype=np.int8),
+            np.full(nw, 5.0), np.full(nw, 4.0), np.full(nw, 3, dtype=np.int64),
+        )
+        bat[:, j] = round_like_python(r["battery_est"], 1)
+
+    return {"sw": sw, "thr": thr, "bat": bat}
+
+
+def build_atlas(path: str, size_step: float = 0.1, weight_step: float = 1.0,
+                max_weight: float = 3000.0) -> Dict[str, Any]:
+    sizes = grid(1.0, 10.0, size_step)
+    weights = grid(weight_step, max_weight, weight_step)
+    sections = _sections(sizes, weights)
+
+    header: Dict[str, Any] = {
+        "fingerprint": tables_fingerprint(),
+        "size": [1.0, size_step, len(sizes)],
+        "weight": [weight_step, weight_step, len(weights)],
+        "drone_classes": CLASS_INDEX.keys,
+        "batteries": list(BATTERIES),
+        "motor_loads": list(MOTOR_LOADS),
+        "sections": {},
+    }
+    # offsets depend on the header length, so lay out twice
+    for _ in range(2):
+        blob = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        offset = HEADER.size + len(blob)
+        for name, arr in sections.items():
+            offset = (offset + ALIGN - 1) // ALIGN * ALIGN
+            header["sections"][name] = {
+                "offset": offset, "shape": list(arr.shape), "dtype": arr.dtype.descr if arr.dtype.names else arr.dtype.str,
+            }
+            offset += arr.nbytes
+    blob = json.dumps(header, ensure_ascii=False).encode("utf-8")
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(blob)))
+        f.write(blob)
+        for name, arr in sections.items():
+            f.write(b"\0" * (header["sections"][name]["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(arr).tobytes())
+    os.replace(tmp, path)
+    return {"path": path, "bytes": os.path.getsize(path), "records": sum(a.size for a in sections.values())}
+
+
+# -----------------------
+# Runtime (mmap)
+# -----------------------
+class Atlas:
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, hlen = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("not an OBIX atlas (or wrong format version)")
+        self.header = json.loads(bytes(self._mm[HEADER.size:HEADER.size + hlen]).decode("utf-8"))
+        self.path = path
+
+        def section(name: str) -> np.ndarray:
+            meta = self.header["sections"][name]
+            dtype = np.dtype([tuple(d) for d in meta["dtype"]]) if isinstance(meta["dtype"], list) else np.dtype(meta["dtype"])
+            count = int(np.prod(meta["shape"]))
+            return np.frombuffer(self._mm, dtype=dtype, count=count, offset=meta["offset"]).reshape(meta["shape"])
+
+        self._sw = section("sw")
+        self._thr = section("thr")
+        self._bat = section("bat")
+        s0, s_step, s_n = self.header["size"]
+        w0, w_step, w_n = self.header["weight"]
+        self._sizes = grid(s0, s0 + s_step * (s_n - 1), s_step).tolist()
+        self._weights = grid(w0, w0 + w_step * (w_n - 1), w_step).tolist()
+        self._s0, self._s_step, self._w0, self._w_step = s0, s_step, w0, w_step
+        self._drone_classes = self.header["drone_classes"]
+        self._batteries = {b: i for i, b in enumerate(self.header["batteries"])}
+
+    @classmethod
+    def from_env(cls) -> Optional["Atlas"]:
+        """Open OBIX_ATLAS if set and still consistent with the code/tables."""
+        path = os.environ.get("OBIX_ATLAS")
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            atlas = cls(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return atlas if atlas.is_current() else None
+
+    def is_current(self, samples: int = 256) -> bool:
+        """Tables unchanged and a random sample of records still matches live kernels."""
+        if self.header.get("fingerprint") != tables_fingerprint():
+            return False
+        if self._drone_classes != CLASS_INDEX.keys:
+            return False
+        rng = np.random.default_rng(0)
+        si = rng.integers(0, len(self._sizes), samples)
+        wi = rng.integers(0, len(self._weights), samples)
+        sizes = np.array(self._sizes)[si]
+        weights = np.array(self._weights)[wi]
+        fresh = _sections_at(sizes, weights)
+        rec = self._sw.reshape(len(self._sizes), len(self._weights))[si, wi]
+        return (
+            all(np.array_equal(rec[k], fresh["sw"][k]) for k in SW_DTYPE.names)
+            and np.array_equal(self._thr[wi], fresh["thr"], equal_nan=True)
+            and np.array_equal(self._bat[wi], fresh["bat"], equal_nan=True)
+        )
+
+    @staticmethod
+    def _index(x: float, start: float, step: float, values: List[float]) -> int:
+        k = int(round((x - start) / step))
+        if 0 <= k < len(values) and values[k] == x:
+            return k
+        return -1
+
+    def _grid_indexes(self, size: Optional[float], weight: float) -> Tuple[int, int]:
+        try:
+            si = 0 if size is None else self._index(size, self._s0, self._s_step, self._sizes)
+            wi = self._index(weight, self._w0, self._w_step, self._weights)
+        except (TypeError, ValueError, OverflowError):
+            return -1, -1
+        return si, wi
+
+    def lookup_size_weight(self, size: float, weight: float) -> Optional[SizeWeightRecord]:
+        si, wi = self._grid_indexes(size, weight)
+        if si < 0 or wi < 0:
+            return None
+        rec = self._sw[si * len(self._weights) + wi]
+        return SizeWeightRecord(
+            self._drone_classes[rec["drone_class"]],
+            WEIGHT_CLASS_LABELS[rec["weight_class"]],
+            int(rec["confidence"]),
+        )
+
+    def lookup_thrust(self, weight: float, motor_load: int) -> Optional[float]:
+        _si, wi = self._grid_indexes(None, weight)
+        if wi < 0 or motor_load not in MOTOR_LOADS:
+            return None
+        return float(self._thr[wi, motor_load - MOTOR_LOADS[0]])
+
+    def lookup_runtime(self, weight: float, battery: str) -> Optional[float]:
+        _si, wi = self._grid_indexes(None, weight)
+        bi = self._batteries.get(battery, -1)
+        if wi < 0 or bi < 0:
+            return None
+        return float(self._bat[wi, bi])
+
+    def lookup(self, size: float, weight: float, motor_load: int, battery: str) -> Optional[AtlasRecord]:
+        """O(1) record decode, or None when the input is off-grid / out of range."""
+        sw = self.lookup_size_weight(size, weight)
+        thrust = self.lookup_thrust(weight, motor_load)
+        runtime = self.lookup_runtime(weight, battery)
+        if sw is None or thrust is None or runtime is None:
+            return None
+        return AtlasRecord(*sw, thrust, runtime)
+
+
+def _sections_at(sizes: np.ndarray, weights: np.ndarray) -> Dict[str, np.ndarray]:
+    """Same records as _sections() but for paired (size, weight) samples."""
+    n = len(sizes)
+    res = analyze_columns(
+        sizes, weights, np.zeros(n, dtype=np.int8),
+        np.full(n, 5.0), np.full(n, 4.0), np.full(n, 3, dtype=np.int64),
+    )
+    sw = np.empty(n, dtype=SW_DTYPE)
+    sw["drone_class"] = res["drone_class"]
+    sw["weight_class"] = res["weight_class"]
+    sw["confidence"] = res["confidence_score"]
+    full = _sections(np.array([5.0]), weights)
+    return {"sw": sw, "thr": full["thr"], "bat": full["bat"]}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m logic.atlas", description="build / inspect the analysis atlas")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_build = sub.add_parser("build")
+    p_build.add_argument("path", nargs="?", default="atlas.bin")
+    p_build.add_argument("--size-step", type=float, default=0.1)
+    p_build.add_argument("--weight-step", type=float, default=1.0)
+    p_build.add_argument("--max-weight", type=float, default=3000.0)
+    p_info = sub.add_parser("info")
+    p_info.add_argument("path", nargs="?", default="atlas.bin")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        print(json.dumps(build_atlas(args.path, args.size_step, args.weight_step, args.max_weight)))
+        return 0
+    atlas = Atlas(args.path)
+    info = {k: v for k, v in atlas.header.items() if k != "sections"}
+    info["sections"] = atlas.header["sections"]
+    info["current"] = atlas.is_current()
+    print(json.dumps(info, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+# logic/bulk.py
+# OBIXConfig Doctor - streaming bulk analysis (CSV / NDJSON) with constant memory
+#
+# usage:
+#   python -m logic.bulk fleet.csv -o results.ndjson
+#   cat fleet.ndjson | python -m logic.bulk - --input-format ndjson --output-format csv
+#   python -m logic.bulk fleet.csv -o results.csv --workers 4 --batch-size 65536   # หลาย core
+#
+# อ่านทีละแถว (lazy) -> รวมเป็น batch ขนาดคงที่ -> วิเคราะห์แบบ vectorized -> เขียนออกทันที
+
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+import numpy as np
+
+from analyzer.batch import analyze_coerced, coerce_columns, result_columns, validation_masks
+from logic.parallel import ParallelExecutor, default_workers
+from logic.results import RowMessages, dumps_str
+
+INPUT_FIELDS = ("size", "weight", "battery", "style", "prop_size", "pitch", "blades", "preset")
+OUTPUT_FIELDS = (
+    "row", "size", "weight", "battery", "style", "prop_size", "pitch", "blades",
+    "preset_used", "weight_class", "thrust_ratio", "battery_est", "flight_profile", "flight_time",
+    "noise", "motor_load", "drone_class", "detected_class", "confidence_score", "confidence_level", "class_top",
+    "warnings",
+)
+DEFAULT_BATCH_SIZE = 4096
+
+
+# rejected rows whose schema errors are listed in the summary (the rest are only counted)
+ERROR_SAMPLE = 20
+
+
+class BulkStats:
+    def __init__(self) -> None:
+        self.rows = 0
+        self.accepted = 0
+        # accepted rows that carry a validate warning (typical-range notes, still analyzed)
+        self.warned = 0
+        self.rejected = 0
+        # why rows were rejected: "unparseable", "<field>.<code>" (BUILD_SCHEMA)
+        self.reasons: Dict[str, int] = {}
+        self.errors: List[Dict[str, Any]] = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def reject(self, reason: str, count: int) -> None:
+        if count:
+            self.reasons[reason] = self.reasons.get(reason, 0) + count
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = self.elapsed or (time.perf_counter() - self.started)
+        return {
+            "rows": self.rows,
+            "accepted": self.accepted,
+            "warned": self.warned,
+            "rejected": self.rejected,
+            "reasons": self.reasons,
+            "errors": self.errors,
+            "seconds": round(elapsed, 3),
+            "rows_per_s": round(self.rows / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+
+# -----------------------
+# Readers (lazy)
+# -----------------------
+def iter_records(lines: Iterable[str], fmt: str) -> Iterator[Optional[Dict[str, Any]]]:
+    """Yield one dict per input row; None for rows that cannot be parsed."""
+    if fmt == "csv":
+        for rec in csv.DictReader(lines):
+            yield rec
+    elif fmt == "ndjson":
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                yield None
+                continue
+            yield rec if isinstance(rec, dict) else None
+    else:
+        raise ValueError(f"unknown input format: {fmt}")
+
+
+# -----------------------
+# Pipeline
+# -----------------------
+def analyze_stream(
+    records: Iterable[Optional[Dict[str, Any]]],
+    stats: BulkStats,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    analyze: Callable[[Dict[str, Any]], Dict[str, np.ndarray]] = analyze_coerced,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Analyze records in fixed-size batches and yield the accepted rows of each
+    batch. Rows that cannot be parsed or fail BUILD_SCHEMA are dropped before
+    analysis; stats counts them by reason and keeps the first ERROR_SAMPLE
+    schema errors. validate_input() warnings do not reject a row (same as /app
+    and /api/analyze/batch): they go in its "warnings" column and stats.warned.
+    `analyze` runs the numeric pipeline on a batch (ParallelExecutor.analyze
+    to spread it over cores).
+    """
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            break
+        first_row = stats.rows + 1
+        stats.rows += len(chunk)
+
+        parsed = [i for i, rec in enumerate(chunk) if rec is not None]
+        stats.reject("unparseable", len(chunk) - len(parsed))
+        if not parsed:
+            stats.rejected += len(chunk)
+            continue
+        data = {f: [chunk[i].get(f) for i in parsed] for f in INPUT_FIELDS}
+        cols = coerce_columns(data, max_rows=batch_size, strict=False)
+
+        bad = cols["invalid"].copy()
+        if bad.any():
+            checked = cols["checked"]
+            for reason, count in checked.counts().items():
+                stats.reject(reason, count)
+            room = ERROR_SAMPLE - len(stats.errors)
+            if room > 0:
+                for err in checked.errors(room):
+                    err["row"] = first_row + parsed[err["row"]]
+                    stats.errors.append(err)
+        ok = np.flatnonzero(~bad)
+        stats.rejected += len(chunk) - len(ok)
+        stats.accepted += len(ok)
+        if not len(ok):
+            continue
+
+        sub = {k: (v[ok] if isinstance(v, np.ndarray) else v) for k, v in cols.items()}
+        sub["n"] = len(ok)
+        masks = validation_masks(sub["size"], sub["weight"], sub["prop_size"], sub["pitch"], sub["blades"])
+        warnings = RowMessages(len(ok), masks).to_lists()
+        stats.warned += sum(1 for w in warnings if w)
+        out = result_columns(sub, analyze(sub))
+        out["warnings"] = warnings
+        out["row"] = [first_row + parsed[i] for i in ok.tolist()]
+        # ranked classes in one cell: "freestyle_5:75|cine:40|mid_lr:30"
+        out["class_top"] = [
+            "|".join(f"{key}:{score}" for key, score in zip(keys, scores))
+            for keys, scores in zip(out["class_top"], out["class_top_score"])
+        ]
+        for f in ("size", "weight", "battery", "style", "prop_size", "pitch", "blades"):
+            out[f] = sub[f].tolist()
+        yield [dict(zip(OUTPUT_FIELDS, vals)) for vals in zip(*(out[f] for f in OUTPUT_FIELDS))]
+
+    stats.elapsed = time.perf_counter() - stats.started
+
+
+# -----------------------
+# Writers (as rows are produced)
+# -----------------------
+def iter_output(batches: Iterable[List[Dict[str, Any]]], fmt: str, stats: BulkStats) -> Iterator[str]:
+    """Serialize result batches to text chunks; the summary goes last."""
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=OUTPUT_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        yield buf.getvalue()
+        for rows in batches:
+            buf.seek(0)
+            buf.truncate()
+            # list cells (warnings) joined like class_top
+            writer.writerows({**r, "warnings": "|".join(r["warnings"])} for r in rows)
+            yield buf.getvalue()
+        yield "# summary " + json.dumps(stats.as_dict()) + "\n"
+    elif fmt == "ndjson":
+        for rows in batches:
+            yield "".join(dumps_str(r) + "\n" for r in rows)
+        yield json.dumps({"summary": stats.as_dict()}) + "\n"
+    else:
+        raise ValueError(f"unknown output format: {fmt}")
+
+
+def _guess_format(path: str, default: str) -> str:
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return default
+
+
+def run(src: TextIO, dst: TextIO, input_format: str, output_format: str, batch_size: int,
+        workers: int = 1) -> BulkStats:
+    stats = BulkStats()
+    if workers <= 1:
+        batches = analyze_stream(iter_records(src, input_format), stats, batch_size)
+        for text in iter_output(batches, output_format, stats):
+            dst.write(text)
+        return stats
+
+    # each batch is split into shards over the pool (shared-memory columns, order kept)
+    with ParallelExecutor(workers) as executor:
+        batches = analyze_stream(iter_records(src, input_format), stats, batch_size, executor.analyze)
+        for text in iter_output(batches, output_format, stats):
+            dst.write(text)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m logic.bulk", description="OBIXConfig Doctor bulk analysis")
+    ap.add_argument("input", help="CSV / NDJSON file, '-' for stdin")
+    ap.add_argument("-o", "--output", default="-", help="output file, '-' for stdout")
+    ap.add_argument("--input-format", choices=("csv", "ndjson"))
+    ap.add_argument("--output-format", choices=("csv", "ndjson"))
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    ap.add_argument("--workers", type=int, default=1,
+                    help="processes per batch (0 = OBIX_WORKERS / all cores); pair with a large --batch-size")
+    args = ap.parse_args(argv)
+
+    in_fmt = args.input_format or _guess_format(args.input, "csv")
+    out_fmt = args.output_format or _guess_format(args.output, "ndjson")
+
+    src = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        workers = args.workers or default_workers()
+        stats = run(src, dst, in_fmt, out_fmt, args.batch_size, workers)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+    print(json.dumps(stats.as_dict()), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
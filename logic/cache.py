@@ -0,0 +1,234 @@
+# logic/cache.py
+# OBIXConfig Doctor - memoized analysis results
+# tier 1: in-process LRU (OrderedDict) / tier 2: SQLite file ที่ทุก gunicorn worker อ่านร่วมกันได้
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from analyzer.drone_class import DRONE_CLASSES as ANALYZER_CLASSES
+from analyzer.thrust_table import THRUST_TABLE
+from logic.presets import BASELINE_CTRL, DRONE_CLASSES, PRESETS, STYLE_PROFILES
+from logic.results import ANALYSIS_KEYS, AnalysisResult, dumps_str, loads
+from logic.rules import RULES
+
+
+def tables_fingerprint() -> str:
+    """Content hash of every table / rule the analysis depends on (+ the analysis key set)."""
+    tables = [PRESETS, BASELINE_CTRL, DRONE_CLASSES, ANALYZER_CLASSES, STYLE_PROFILES, RULES.spec, ANALYSIS_KEYS]
+    if THRUST_TABLE is not None:
+        tables.append(THRUST_TABLE.fingerprint)
+    blob = json.dumps(tables, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Two-tier result cache keyed on the normalized input tuple.
+
+    Local tier: bounded LRU with TTL. Shared tier (optional): SQLite file in
+    WAL mode, one connection per process, so workers forked by gunicorn reuse
+    each other's results. Entries are tagged with tables_fingerprint(); when
+    PRESETS / BASELINE_CTRL / DRONE_CLASSES change, old entries stop matching
+    and are dropped.
+
+    Cached values are shared between requests: treat them as read-only.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300.0,
+        shared_path: Optional[str] = None,
+        shared_maxsize: int = 20000,
+        check_interval: float = 5.0,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared_path = shared_path
+        self.shared_maxsize = shared_maxsize
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._local: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._puts_since_trim = 0
+
+        self.fingerprint = tables_fingerprint()
+        self._next_check = time.monotonic() + check_interval
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> "AnalysisCache":
+        return cls(
+            maxsize=int(os.environ.get("OBIX_CACHE_SIZE", 1024)),
+            ttl=float(os.environ.get("OBIX_CACHE_TTL", 300)),
+            shared_path=os.environ.get("OBIX_CACHE_DB") or None,
+            shared_maxsize=int(os.environ.get("OBIX_CACHE_DB_SIZE", 20000)),
+        )
+
+    # -----------------------
+    # invalidation
+    # -----------------------
+    def _check_tables(self, now: float) -> None:
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        fp = tables_fingerprint()
+        if fp != self.fingerprint:
+            self.fingerprint = fp
+            self.invalidations += 1
+            self._local.clear()
+            conn = self._shared()
+            if conn is not None:
+                with conn:
+                    conn.execute("DELETE FROM analysis_cache WHERE fp != ?", (fp,))
+
+    # -----------------------
+    # shared tier (SQLite)
+    # -----------------------
+    def _shared(self) -> Optional[sqlite3.Connection]:
+        if not self.shared_path:
+            return None
+        pid = os.getpid()
+        if self._conn is None or self._conn_pid != pid:
+            # connections must not cross fork(); open one per worker
+            conn = sqlite3.connect(self.shared_path, timeout=1.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                " key TEXT PRIMARY KEY, fp TEXT NOT NULL, value TEXT NOT NULL,"
+                " expires REAL NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS analysis_cache_created ON analysis_cache(created)")
+            conn.commit()
+            self._conn, self._conn_pid = conn, pid
+        return self._conn
+
+    def _shared_key(self, key: Hashable) -> str:
+        return self.fingerprint + ":" + json.dumps(key, ensure_ascii=False)
+
+    def _shared_get(self, key: Hashable, wall: float) -> Optional[Any]:
+        conn = self._shared()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT value, expires FROM analysis_cache WHERE key = ?", (self._shared_key(key),)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or row[1] < wall:
+            return None
+        # same type as a fresh build_analysis() (templates use attribute access)
+        try:
+            return AnalysisResult(loads(row[0]))
+        except (KeyError, ValueError):
+            return None
+
+    def _shared_put(self, key: Hashable, value: Any, wall: float) -> None:
+        conn = self._shared()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, fp, value, expires, created)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (self._shared_key(key), self.fingerprint,
+                     dumps_str(value), wall + self.ttl, wall),
+                )
+                self._puts_since_trim += 1
+                if self._puts_since_trim >= 256:
+                    self._puts_since_trim = 0
+                    conn.execute("DELETE FROM analysis_cache WHERE expires < ?", (wall,))
+                    cur = conn.execute(
+                        "DELETE FROM analysis_cache WHERE key IN ("
+                        " SELECT key FROM analysis_cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                        (self.shared_maxsize,),
+                    )
+                    self.evictions += max(cur.rowcount, 0)
+        except sqlite3.Error:
+            # shared tier is best-effort; the local tier still works
+            pass
+
+    # -----------------------
+    # public API
+    # -----------------------
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            self._check_tables(now)
+            entry = self._local.get(key)
+            if entry is not None:
+                if entry[0] >= now:
+                    self._local.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._local[key]
+
+            value = self._shared_get(key, time.time())
+            if value is not None:
+                self.shared_hits += 1
+                self._store_local(key, value, now)
+                return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._store_local(key, value, now)
+            self._shared_put(key, value, time.time())
+
+    def _store_local(self, key: Hashable, value: Any, now: float) -> None:
+        self._local[key] = (now + self.ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.maxsize:
+            self._local.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
+            conn = self._shared()
+            if conn is not None:
+                with conn:
+                    conn.execute("DELETE FROM analysis_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "pid": os.getpid(),
+            "size": len(self._local),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "shared": bool(self.shared_path),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+            "fingerprint": self.fingerprint,
+        }
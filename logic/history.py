@@ -0,0 +1,304 @@
+# logic/history.py
+# OBIXConfig Doctor - persistent analysis history (SQLite WAL) with a background batched writer
+#
+# request path: record() แค่ใส่ queue (ไม่แตะ disk) / writer thread รวมหลายรายการแล้ว commit ทีเดียว
+# queue มีขนาดจำกัด: เต็มแล้วทำตาม policy (drop_new / drop_oldest / block) และนับจำนวนที่ทิ้งไว้
+# fork-safe: thread + queue + connection ถูกสร้างใหม่ใน process ที่ใช้งานจริง (gunicorn worker)
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from logic.results import dumps_str
+
+POLICIES = ("drop_new", "drop_oldest", "block")
+
+log = logging.getLogger(__name__)
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS analysis_history ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, uid TEXT, preset TEXT, cls TEXT,"
+    " size REAL, weight REAL, battery TEXT, style TEXT, inputs TEXT NOT NULL, analysis TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS analysis_history_ts ON analysis_history(ts)",
+    "CREATE INDEX IF NOT EXISTS analysis_history_cls ON analysis_history(cls, ts)",
+    "CREATE INDEX IF NOT EXISTS analysis_history_preset ON analysis_history(preset, ts)",
+    "CREATE INDEX IF NOT EXISTS analysis_history_uid ON analysis_history(uid, ts)",
+)
+
+# (ts, uid, inputs, analysis)
+Entry = Tuple[float, str, Dict[str, Any], Dict[str, Any]]
+
+
+class HistoryStore:
+    """
+    Append-only analysis log. Disabled (record() is a no-op) without a path.
+
+    Entries hold references to analysis dicts that are shared with the
+    caches; the writer only serializes them, never mutates.
+    """
+
+    def __init__(self, path: Optional[str], queue_size: int = 10000, batch_size: int = 256,
+                 flush_interval: float = 0.5, policy: str = "drop_new", block_timeout: float = 0.05):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        self.path = path
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._pid: Optional[int] = None
+        self._queue: "queue.Queue[Optional[Entry]]" = queue.Queue(maxsize=queue_size)
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._reader: Optional[sqlite3.Connection] = None
+        self._reader_pid: Optional[int] = None
+        # counters are bumped by request threads and the writer thread (read by /metrics)
+        self._stats_lock = threading.Lock()
+
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self.max_depth = 0
+
+    @classmethod
+    def from_env(cls) -> "HistoryStore":
+        return cls(
+            path=os.environ.get("OBIX_HISTORY_DB") or None,
+            queue_size=int(os.environ.get("OBIX_HISTORY_QUEUE", 10000)),
+            batch_size=int(os.environ.get("OBIX_HISTORY_BATCH", 256)),
+            policy=os.environ.get("OBIX_HISTORY_POLICY", "drop_new"),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    # -----------------------
+    # connections / writer lifecycle
+    # -----------------------
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)  # type: ignore[arg-type]
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            for stmt in SCHEMA:
+                conn.execute(stmt)
+        return conn
+
+    def _ensure_started(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            # after fork the parent's thread does not exist here: start fresh
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._writer = threading.Thread(target=self._run, name="obix-history-writer", daemon=True)
+            self._writer.start()
+            self._pid = pid
+            atexit.register(self.close)
+
+    def _open(self) -> Optional[sqlite3.Connection]:
+        # writer side: a bad path / locked or read-only file must not kill the thread
+        try:
+            return self._connect()
+        except (sqlite3.Error, OSError) as e:
+            log.warning("history db %s unavailable: %s", self.path, e)
+            return None
+
+    def _run(self) -> None:
+        conn = self._open()
+        q = self._queue
+        while True:
+            item = q.get()
+            stop = item is None
+            batch: List[Entry] = [] if stop else [item]  # type: ignore[list-item]
+            # collect what is already queued (plus a short wait) into one transaction
+            deadline = time.monotonic() + self.flush_interval
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    nxt = q.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            if batch:
+                if conn is None:
+                    conn = self._open()
+                if conn is None:
+                    # still no db: the batch is lost, but the queue keeps draining (flush() returns)
+                    with self._stats_lock:
+                        self.write_errors += len(batch)
+                else:
+                    self._write(conn, batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                q.task_done()
+            if stop:
+                if conn is not None:
+                    conn.close()
+                return
+
+    def _write(self, conn: sqlite3.Connection, batch: List[Entry]) -> None:
+        rows = []
+        for ts, uid, inputs, analysis in batch:
+            rows.append((
+                ts, uid, inputs.get("preset") or None, analysis.get("detected_class"),
+                inputs.get("size"), inputs.get("weight"), inputs.get("battery"), inputs.get("style"),
+                json.dumps(inputs, ensure_ascii=False),
+                dumps_str(analysis),
+            ))
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO analysis_history (ts, uid, preset, cls, size, weight, battery, style, inputs, analysis)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            with self._stats_lock:
+                self.written += len(rows)
+                self.batches += 1
+        except sqlite3.Error:
+            with self._stats_lock:
+                self.write_errors += len(rows)
+
+    # -----------------------
+    # write path
+    # -----------------------
+    def record(self, uid: str, inputs: Dict[str, Any], analysis: Dict[str, Any]) -> bool:
+        """Queue one analysis; never touches disk. Returns False if it was dropped."""
+        if not self.path:
+            return False
+        self._ensure_started()
+        entry = (time.time(), uid, inputs, analysis)
+        q = self._queue
+        try:
+            if self.policy == "block":
+                q.put(entry, timeout=self.block_timeout)
+            else:
+                q.put_nowait(entry)
+        except queue.Full:
+            if self.policy != "drop_oldest":
+                self._count_drop()
+                return False
+            # make room by discarding the oldest queued entry
+            try:
+                q.get_nowait()
+                q.task_done()
+                self._count_drop()
+            except queue.Empty:
+                pass
+            try:
+                q.put_nowait(entry)
+            except queue.Full:
+                self._count_drop()
+                return False
+        depth = q.qsize()
+        with self._stats_lock:
+            self.enqueued += 1
+            if depth > self.max_depth:
+                self.max_depth = depth
+        return True
+
+    def _count_drop(self) -> None:
+        with self._stats_lock:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far is committed."""
+        if self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self) -> None:
+        if self._pid != os.getpid() or self._writer is None or not self._writer.is_alive():
+            return
+        self.flush()
+        try:
+            self._queue.put(None, timeout=1.0)
+        except queue.Full:
+            return
+        self._writer.join(timeout=2.0)
+
+    # -----------------------
+    # queries
+    # -----------------------
+    def query(self, cls: Optional[str] = None, preset: Optional[str] = None, uid: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None, limit: int = 50,
+              with_analysis: bool = False, with_uid: bool = False) -> List[Dict[str, Any]]:
+        """
+        Newest first; every filter maps onto an (x, ts) index. The session uid
+        is only returned with with_uid (public listings must not link sessions).
+        """
+        if not self.path:
+            return []
+        where, params = [], []  # type: List[str], List[Any]
+        for column, value in (("cls", cls), ("preset", preset), ("uid", uid)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            params.append(until)
+        sql = "SELECT id, ts, preset, cls, inputs" + (", analysis" if with_analysis else "") + (", uid" if with_uid else "")
+        sql += " FROM analysis_history"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        params.append(max(1, min(int(limit), 1000)))
+
+        with self._read_lock:
+            if self._reader is None or self._reader_pid != os.getpid():
+                self._reader, self._reader_pid = self._connect(), os.getpid()
+            rows = self._reader.execute(sql, params).fetchall()
+        out = []
+        for row in rows:
+            item = {"id": row[0], "ts": row[1], "preset": row[2], "class": row[3], "inputs": json.loads(row[4])}
+            if with_analysis:
+                item["analysis"] = json.loads(row[5])
+            if with_uid:
+                item["uid"] = row[-1]
+            out.append(item)
+        return out
+
+    def recent(self, uid: str, limit: int = 20) -> List[Dict[str, Any]]:
+        return self.query(uid=uid, limit=limit, with_analysis=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            counts = {
+                "max_depth": self.max_depth,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "write_errors": self.write_errors,
+            }
+        return {
+            "enabled": self.enabled,
+            "policy": self.policy,
+            "queue_size": self.queue_size,
+            "depth": self._queue.qsize() if self._pid == os.getpid() else 0,
+            **counts,
+        }
@@ -0,0 +1,111 @@
+# logic/inputs.py
+# OBIXConfig Doctor - input schema + coercion + preset override (shared by form / API / bulk)
+import re
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from logic.presets import PRESETS
+from logic.schema import Schema
+
+# ค่า default เดียวกับที่ฟอร์ม /app ใช้เมื่อไม่ได้กรอก
+BUILD_DEFAULTS: Dict[str, Any] = {
+    "size": 5.0,
+    "weight": 1.0,
+    "battery": "4S",
+    "style": "freestyle",
+    "prop_size": 5.0,
+    "pitch": 4.0,
+    "blades": 3,
+}
+
+# ลำดับของ normalized build tuple
+BUILD_FIELDS: Tuple[str, ...] = (
+    "size", "battery", "style", "weight", "prop_size", "pitch", "blades", "preset"
+)
+
+
+# ขอบเขตแข็งของ input: นอกนี้คือข้อมูลเสีย (reject ก่อนวิเคราะห์)
+# ช่วงที่ "ควร" เป็น (แค่เตือน) อยู่ในกฎ validate ของ data/rules.json
+BUILD_SCHEMA = Schema({
+    "size": {"type": "float", "default": BUILD_DEFAULTS["size"], "gt": 0, "le": 60, "label": "ขนาดโดรน"},
+    "weight": {"type": "float", "default": BUILD_DEFAULTS["weight"], "gt": 0, "le": 100000, "label": "น้ำหนัก"},
+    "battery": {"type": "str", "default": BUILD_DEFAULTS["battery"], "pattern": r"[1-9][0-9]?S", "strip": True,
+                "label": "แบตเตอรี่"},
+    "style": {"type": "str", "default": BUILD_DEFAULTS["style"], "pattern": r"[A-Za-z0-9_-]+", "max_len": 32,
+              "strip": True, "label": "สไตล์การบิน"},
+    "prop_size": {"type": "float", "default": BUILD_DEFAULTS["prop_size"], "gt": 0, "le": 60, "label": "ขนาดใบพัด"},
+    "pitch": {"type": "float", "default": BUILD_DEFAULTS["pitch"], "gt": 0, "le": 20, "label": "Pitch ใบพัด"},
+    "blades": {"type": "int", "default": BUILD_DEFAULTS["blades"], "ge": 1, "le": 12, "label": "จำนวนใบพัด"},
+    "preset": {"type": "str", "default": "", "choices": list(PRESETS), "strip": True, "label": "Preset"},
+})
+
+
+# "<n>S" at the start of a pack label (catalogs may add text after it: "6S 1300mAh")
+_CELLS = re.compile(r"\s*(\d+)\s*S", re.IGNORECASE)
+
+
+def battery_cells(battery: Any) -> Optional[int]:
+    """'4S' / '6s 1300mAh' -> 4 / 6; None for anything that is not a <n>S pack label."""
+    m = _CELLS.match(battery) if isinstance(battery, str) else None
+    return int(m.group(1)) if m else None
+
+
+def safe_float(x: Any, default: float = 0.0) -> float:
+    try:
+        return float(x)
+    except Exception:
+        return default
+
+
+def safe_int(x: Any, default: int = 0) -> int:
+    try:
+        return int(x)
+    except Exception:
+        return default
+
+
+def normalize_build(
+    size: Any = None,
+    weight: Any = None,
+    battery: Optional[str] = None,
+    style: Optional[str] = None,
+    prop_size: Any = None,
+    pitch: Any = None,
+    blades: Any = None,
+    preset: Optional[str] = None,
+) -> Tuple[float, str, str, float, float, float, int, str]:
+    """
+    Coerce raw inputs exactly like the /app form does and apply the preset
+    override. Returns the tuple in BUILD_FIELDS order.
+    """
+    preset_key = (preset or "").strip()
+
+    size = safe_float(size, BUILD_DEFAULTS["size"])
+    battery = BUILD_DEFAULTS["battery"] if battery is None else battery
+    style = BUILD_DEFAULTS["style"] if style is None else style
+    weight = safe_float(weight, BUILD_DEFAULTS["weight"])
+    prop_size = safe_float(prop_size, BUILD_DEFAULTS["prop_size"])
+    blades = safe_int(blades, BUILD_DEFAULTS["blades"])
+    pitch = safe_float(pitch, BUILD_DEFAULTS["pitch"])
+
+    # override with preset if selected
+    if preset_key:
+        p = PRESETS.get(preset_key)
+        if p:
+            size = safe_float(p.get("size", size))
+            battery = p.get("battery", battery)
+            style = p.get("style", style)
+            weight = safe_float(p.get("weight", weight))
+            prop_size = safe_float(p.get("prop_size", prop_size))
+            pitch = safe_float(p.get("pitch", pitch))
+            blades = safe_int(p.get("blades", blades))
+
+    return size, battery, style, weight, prop_size, pitch, blades, preset_key
+
+
+def parse_build(data: Mapping[str, Any]) -> Tuple[Tuple[float, str, str, float, float, float, int, str], Dict[str, Dict[str, str]]]:
+    """
+    BUILD_SCHEMA check + normalize_build() for a request.form / JSON mapping.
+    Returns (build tuple, {field: error}); callers reject when errors is non-empty.
+    """
+    values, errors = BUILD_SCHEMA.parse(data)
+    return normalize_build(**values), errors
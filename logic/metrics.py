@@ -0,0 +1,323 @@
+# logic/metrics.py
+# OBIXConfig Doctor - lightweight per-stage latency metrics + Prometheus text export
+#
+# หลาย gunicorn worker: ตั้ง OBIX_METRICS_DIR แล้วแต่ละ worker จะเขียน snapshot ของตัวเอง
+# ลงไฟล์ (อย่างมากทุก flush_interval วินาที) ส่วน /metrics รวมทุกไฟล์ก่อนตอบ
+# อายุของไฟล์ผูกกับ worker (gunicorn.conf.py): master ล้างโฟลเดอร์ตอนเริ่ม (clear_snapshots)
+# และเมื่อ worker ตาย (retire_snapshot) counter / histogram ของมันถูกรวมเข้า obix_retired.json
+# ก่อนลบไฟล์ -> ผลรวมใน /metrics ไม่ลดลงตอน recycle / crash (rate() ไม่เห็นเป็น counter reset)
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# seconds; +Inf is implicit
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+HELP: Dict[str, str] = {
+    "obix_stage_seconds": "Time spent per pipeline stage.",
+    "obix_request_seconds": "Request latency per endpoint.",
+    "obix_requests_total": "Requests served.",
+    "obix_errors_total": "Requests that hit the error (traceback) branch.",
+    "obix_input_rejected_total": "Requests rejected by the input schema before any analysis.",
+    "obix_cache_hits_total": "Analysis cache hits (local + shared tier).",
+    "obix_cache_misses_total": "Analysis cache misses.",
+    "obix_cache_evictions_total": "Analysis cache evictions.",
+    "obix_cache_hit_ratio": "Analysis cache hit ratio across workers.",
+    "obix_history_enqueued_total": "Analyses queued for the history store.",
+    "obix_history_written_total": "Analyses committed to the history store.",
+    "obix_history_dropped_total": "Analyses dropped because the history queue was full.",
+    "obix_startup_seconds": "Seconds from boot (OBIX_BOOT_T0) to each worker's first response.",
+}
+
+
+class Timer:
+    """with METRICS.time("stage"): ... -> observe into obix_stage_seconds."""
+
+    __slots__ = ("_metrics", "_labels", "_t0")
+
+    def __init__(self, metrics: "Metrics", labels: Labels):
+        self._metrics = metrics
+        self._labels = labels
+
+    def __enter__(self) -> "Timer":
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._metrics.observe("obix_stage_seconds", time.perf_counter() - self._t0, self._labels)
+
+
+class Metrics:
+    """
+    In-process counters and histograms. Recording is a dict lookup plus a
+    bisect, so it stays in the low-microsecond range on the request path.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                 directory: Optional[str] = None, flush_interval: float = 1.0):
+        self.buckets = buckets
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        self.collectors: List[Callable[[], Dict[str, float]]] = []
+        self._lock = threading.Lock()
+        self._next_flush = 0.0
+        self._stage_labels: Dict[str, Labels] = {}
+
+    @classmethod
+    def from_env(cls) -> "Metrics":
+        directory = os.environ.get("OBIX_METRICS_DIR") or None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return cls(directory=directory)
+
+    # -----------------------
+    # recording
+    # -----------------------
+    def inc(self, name: str, labels: Labels = (), value: float = 1.0) -> None:
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, labels: Labels = ()) -> None:
+        key = (name, labels)
+        idx = bisect_left(self.buckets, seconds)
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = [0.0] * (len(self.buckets) + 2)
+            h[idx] += 1
+            h[-1] += seconds
+
+    def time(self, stage: str) -> Timer:
+        return Timer(self, self._stage(stage))
+
+    def stage_since(self, stage: str, t0: float) -> None:
+        """Observe perf_counter() - t0 for a stage (for blocks not worth a with)."""
+        self.observe("obix_stage_seconds", time.perf_counter() - t0, self._stage(stage))
+
+    def _stage(self, stage: str) -> Labels:
+        labels = self._stage_labels.get(stage)
+        if labels is None:
+            labels = self._stage_labels[stage] = (("stage", stage),)
+        return labels
+
+    def reset(self) -> None:
+        """Drop everything recorded so far (boot-time work is not traffic); collectors stay."""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self._next_flush = 0.0
+
+    def add_collector(self, fn: Callable[[], Dict[str, float]]) -> None:
+        """fn() -> {counter name: current total}; read at flush / scrape time."""
+        self.collectors.append(fn)
+
+    # -----------------------
+    # multi-process snapshots
+    # -----------------------
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = [[n, list(map(list, l)), v] for (n, l), v in self.counters.items()]
+            histograms = [[n, list(map(list, l)), list(h)] for (n, l), h in self.histograms.items()]
+        for fn in self.collectors:
+            for name, value in fn().items():
+                counters.append([name, [], value])
+        return {"buckets": list(self.buckets), "counters": counters, "histograms": histograms}
+
+    def _path(self, pid: int) -> str:
+        return snapshot_path(self.directory, pid)  # type: ignore[arg-type]
+
+    def maybe_flush(self) -> None:
+        """Write this worker's snapshot, at most once per flush_interval."""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if now < self._next_flush:
+            return
+        self._next_flush = now + self.flush_interval
+        self.flush()
+
+    def flush(self) -> None:
+        if not self.directory:
+            return
+        path = self._path(os.getpid())
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def _snapshots(self) -> Iterable[Dict[str, Any]]:
+        yield self.snapshot()
+        if not self.directory:
+            return
+        own = os.path.basename(self._path(os.getpid()))
+        for name in os.listdir(self.directory):
+            if not (name.startswith("obix_") and name.endswith(".json")) or name == own:
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    yield json.load(f)
+            except (OSError, ValueError):
+                continue
+
+    # -----------------------
+    # Prometheus text format
+    # -----------------------
+    def render(self) -> str:
+        counters: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        for snap in self._snapshots():
+            if tuple(snap.get("buckets", ())) != self.buckets:
+                continue
+            for name, labels, value in snap["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0.0) + value
+            for name, labels, values in snap["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                acc = histograms.get(key)
+                if acc is None:
+                    histograms[key] = list(values)
+                else:
+                    for i, v in enumerate(values):
+                        acc[i] += v
+
+        hits = counters.get(("obix_cache_hits_total", ()), 0.0)
+        misses = counters.get(("obix_cache_misses_total", ()), 0.0)
+        gauges = {("obix_cache_hit_ratio", ()): hits / (hits + misses) if hits + misses else 0.0}
+
+        lines: List[str] = []
+        self._render_simple(lines, counters, "counter")
+        self._render_simple(lines, gauges, "gauge")
+        for name in sorted({n for n, _ in histograms}):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for (n, labels), values in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0.0
+                for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', le),))} {_num(cumulative)}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {values[-1]!r}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {_num(cumulative)}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_simple(lines: List[str], series: Dict[Tuple[str, Labels], float], kind: str) -> None:
+        for name in sorted({n for n, _ in series}):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (n, labels), value in sorted(series.items()):
+                if n == name:
+                    lines.append(f"{name}{_fmt_labels(labels)} {_num(value)}")
+
+
+# -----------------------
+# snapshot files (called from the gunicorn master)
+# -----------------------
+def snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"obix_{pid}.json")
+
+
+def clear_snapshots(directory: Optional[str]) -> int:
+    """Remove every worker snapshot (previous run / deploy); returns how many files went."""
+    if not directory or not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for name in os.listdir(directory):
+        if name.startswith("obix_") and (name.endswith(".json") or name.endswith(".tmp")):
+            try:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+RETIRED = "obix_retired.json"
+
+
+def _read_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def retire_snapshot(directory: Optional[str], pid: int) -> None:
+    """
+    Fold an exited worker's counters (*_total) and histograms into RETIRED,
+    then remove its file. Anything else it reported is a gauge and is dropped.
+    """
+    if not directory:
+        return
+    snap = _read_snapshot(snapshot_path(directory, pid))
+    if snap is not None:
+        path = os.path.join(directory, RETIRED)
+        retired = _read_snapshot(path)
+        if retired is None or retired.get("buckets") != snap.get("buckets"):
+            retired = {"buckets": snap.get("buckets", []), "counters": [], "histograms": []}
+        counters = {(n, _labels(l)): v for n, l, v in retired["counters"]}
+        for n, l, v in snap.get("counters", ()):
+            if n.endswith("_total"):
+                key = (n, _labels(l))
+                counters[key] = counters.get(key, 0.0) + v
+        histograms = {(n, _labels(l)): list(h) for n, l, h in retired["histograms"]}
+        for n, l, h in snap.get("histograms", ()):
+            acc = histograms.setdefault((n, _labels(l)), [0.0] * len(h))
+            for i, v in enumerate(h):
+                acc[i] += v
+        retired["counters"] = [[n, list(map(list, l)), v] for (n, l), v in counters.items()]
+        retired["histograms"] = [[n, list(map(list, l)), h] for (n, l), h in histograms.items()]
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(retired, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+    remove_snapshot(directory, pid)
+
+
+def _labels(labels: Iterable[Iterable[str]]) -> Labels:
+    return tuple(map(tuple, labels))  # type: ignore[arg-type]
+
+
+def remove_snapshot(directory: Optional[str], pid: int) -> None:
+    """Delete a worker's snapshot file (retire_snapshot() keeps its totals first)."""
+    if not directory:
+        return
+    path = snapshot_path(directory, pid)
+    for p in (path, path + ".tmp"):
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels) + "}"
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
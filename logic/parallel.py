@@ -0,0 +1,287 @@
+# logic/parallel.py
+# OBIXConfig Doctor - multi-core executor for large bulk jobs and sweeps
+#
+# input/output columns อยู่ใน shared memory (contiguous arrays) ไม่ pickle ทีละแถว
+# แต่ละ worker คำนวณเฉพาะช่วง [start, stop) ของตัวเองแล้วเขียนผลลงตำแหน่งเดิม
+# ผลลัพธ์จึงเรียงตามลำดับ input เสมอ
+#
+# benchmark:
+#   python -m logic.parallel --rows 4000000 --workers 1,2,4,8
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Value, shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analyzer.batch import BATTERY_CELLS, analyze_columns
+from analyzer.drone_class import CLASS_INDEX
+from analyzer.flight_sim import PROFILE_NAMES
+from analyzer.sweep import gather_flat, sweep_metrics
+
+# column layout: (name, dtype str, offset in bytes); "(k,)i8" = k values per row
+Layout = List[Tuple[str, str, int]]
+ANALYZE_INPUTS = ("size", "weight", "battery_code", "prop_size", "pitch", "blades", "cells", "flight_profile")
+# every column of analyzer.batch.analyze_columns(), so results feed result_columns() unchanged
+ANALYZE_OUTPUTS: Dict[str, str] = {
+    "pitch_tier": "i8",
+    "blade_tier": "i8",
+    "flight_profile": "i1",
+    "class_scores": f"({len(CLASS_INDEX)},)i8",
+    "thrust_ratio": "f8",
+    "battery_est": "f8",
+    "flight_time": "f8",
+    "noise": "i8",
+    "motor_load": "i8",
+    "weight_class": "i1",
+    "drone_class": "i8",
+    "detected_class": "i8",
+    "confidence_score": "i8",
+    "confidence_level": "i1",
+}
+SWEEP_OUTPUTS: Dict[str, str] = {
+    "thrust_ratio": "f8",
+    "battery_est": "f8",
+    "noise": "i8",
+    "motor_load": "i8",
+}
+
+
+def default_workers() -> int:
+    return int(os.environ.get("OBIX_WORKERS", 0)) or os.cpu_count() or 1
+
+
+# -----------------------
+# Shared-memory column blocks
+# -----------------------
+def _layout(columns: Dict[str, str], n: int) -> Tuple[Layout, int]:
+    layout: Layout = []
+    offset = 0
+    for name, dtype in columns.items():
+        # keep every column 64-byte aligned
+        offset = (offset + 63) & ~63
+        layout.append((name, dtype, offset))
+        offset += np.dtype(dtype).itemsize * n
+    return layout, max(offset, 1)
+
+
+def _views(shm: shared_memory.SharedMemory, layout: Layout, n: int) -> Dict[str, np.ndarray]:
+    return {
+        name: np.ndarray((n,), dtype=dtype, buffer=shm.buf, offset=offset)
+        for name, dtype, offset in layout
+    }
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # pool workers share the parent's resource tracker, and the parent
+    # unlinks every block it creates, so attaching needs no extra bookkeeping
+    return shared_memory.SharedMemory(name=name)
+
+
+class ColumnBlock:
+    """A set of equal-length typed columns living in one shared-memory block."""
+
+    def __init__(self, columns: Dict[str, str], n: int):
+        self.n = n
+        self.layout, size = _layout(columns, n)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.arrays = _views(self.shm, self.layout, n)
+
+    @property
+    def spec(self) -> Tuple[str, Layout, int]:
+        return self.shm.name, self.layout, self.n
+
+    def close(self) -> None:
+        self.arrays = {}
+        self.shm.close()
+        self.shm.unlink()
+
+
+# -----------------------
+# Per-shard kernels (run inside workers)
+# -----------------------
+def analyze_kernel(inputs: Dict[str, np.ndarray], start: int, stop: int, params: Any) -> Dict[str, np.ndarray]:
+    return analyze_columns(*(inputs[name] for name in ANALYZE_INPUTS))
+
+
+def sweep_kernel(inputs: Dict[str, np.ndarray], start: int, stop: int, params: Any) -> Dict[str, np.ndarray]:
+    # the per-axis metric tables are tiny: rebuild them and gather this flat range
+    _axes, shape, metrics = sweep_metrics(params)
+    return gather_flat(metrics, shape, start, stop)
+
+
+def _init_worker(counter: Any, pin: bool) -> None:
+    if not pin or not hasattr(os, "sched_setaffinity"):
+        return
+    cpus = sorted(os.sched_getaffinity(0))
+    with counter.get_lock():
+        slot = counter.value
+        counter.value += 1
+    os.sched_setaffinity(0, {cpus[slot % len(cpus)]})
+
+
+def _run_shard(
+    kernel: Callable[..., Dict[str, np.ndarray]],
+    in_spec: Optional[Tuple[str, Layout, int]],
+    out_spec: Tuple[str, Layout, int],
+    start: int,
+    stop: int,
+    params: Any,
+) -> Tuple[int, int]:
+    blocks = []
+    try:
+        inputs: Dict[str, np.ndarray] = {}
+        if in_spec is not None:
+            shm = _attach(in_spec[0])
+            blocks.append(shm)
+            inputs = {k: v[start:stop] for k, v in _views(shm, in_spec[1], in_spec[2]).items()}
+        out_shm = _attach(out_spec[0])
+        blocks.append(out_shm)
+        outputs = _views(out_shm, out_spec[1], out_spec[2])
+
+        result = kernel(inputs, start, stop, params)
+        for name, values in result.items():
+            if name in outputs:
+                outputs[name][start:stop] = values
+        del inputs, outputs, result
+        return start, stop
+    finally:
+        for shm in blocks:
+            shm.close()
+
+
+# -----------------------
+# Executor
+# -----------------------
+class ParallelExecutor:
+    """
+    Process pool that runs a kernel over contiguous shards of shared-memory
+    columns. Use as a context manager so the pool is shut down.
+    """
+
+    def __init__(self, workers: Optional[int] = None, pin: bool = True, shards_per_worker: int = 2):
+        self.workers = workers or default_workers()
+        self.shards_per_worker = shards_per_worker
+        counter = Value("i", 0)
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(counter, pin)
+        )
+
+    def __enter__(self) -> "ParallelExecutor":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+
+    def _bounds(self, n: int) -> List[Tuple[int, int]]:
+        shards = max(1, min(n, self.workers * self.shards_per_worker))
+        edges = np.linspace(0, n, shards + 1).astype(np.int64).tolist()
+        return [(a, b) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+    def map_columns(
+        self,
+        kernel: Callable[..., Dict[str, np.ndarray]],
+        inputs: Optional[Dict[str, np.ndarray]],
+        outputs: Dict[str, str],
+        n: int,
+        params: Any = None,
+    ) -> Dict[str, np.ndarray]:
+        """Run kernel over [0, n) in shards; returns the merged output columns."""
+        in_block = None
+        if inputs is not None:
+            in_block = ColumnBlock({k: v.dtype.str for k, v in inputs.items()}, n)
+            for k, v in inputs.items():
+                in_block.arrays[k][:] = v
+        out_block = ColumnBlock(outputs, n)
+        try:
+            futures = [
+                self.pool.submit(
+                    _run_shard, kernel, in_block.spec if in_block else None, out_block.spec, a, b, params
+                )
+                for a, b in self._bounds(n)
+            ]
+            for f in futures:
+                f.result()
+            return {k: v.copy() for k, v in out_block.arrays.items()}
+        finally:
+            if in_block is not None:
+                in_block.close()
+            out_block.close()
+
+    def analyze(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Parallel analyzer.batch.analyze_columns() over already-coerced columns."""
+        n = len(columns["size"])
+        inputs = {name: np.ascontiguousarray(columns[name]) for name in ANALYZE_INPUTS}
+        return self.map_columns(analyze_kernel, inputs, ANALYZE_OUTPUTS, n)
+
+    def sweep(self, spec: Dict[str, Any], max_points: int = 50_000_000) -> Dict[str, Any]:
+        """Parallel analyzer.sweep.sweep(): shards the flattened grid."""
+        axes, shape, _metrics = sweep_metrics(spec, max_points)
+        n = int(np.prod(shape))
+        columns = self.map_columns(sweep_kernel, None, SWEEP_OUTPUTS, n, params=spec)
+        return {"axes": axes, "shape": shape, "points": n, "columns": columns}
+
+
+# -----------------------
+# Scaling benchmark
+# -----------------------
+def _random_columns(n: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    battery_code = rng.integers(0, 2, n).astype(np.int8)
+    return {
+        "size": np.round(rng.uniform(1, 10, n), 1),
+        "weight": np.round(rng.uniform(50, 3000, n)),
+        "battery_code": battery_code,
+        "prop_size": np.round(rng.uniform(1, 10, n), 1),
+        "pitch": np.round(rng.uniform(2, 6.5, n), 1),
+        "blades": rng.integers(2, 5, n),
+        "cells": BATTERY_CELLS[battery_code],
+        "flight_profile": rng.integers(0, len(PROFILE_NAMES), n).astype(np.int8),
+    }
+
+
+def benchmark(rows: int, worker_counts: Sequence[int], repeat: int = 3) -> List[Dict[str, Any]]:
+    columns = _random_columns(rows)
+    report = []
+    base = None
+    for workers in worker_counts:
+        with ParallelExecutor(workers) as ex:
+            ex.analyze({k: v[:1000] for k, v in columns.items()})  # warm up the pool
+            best = float("inf")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                ex.analyze(columns)
+                best = min(best, time.perf_counter() - t0)
+        base = base or best
+        report.append({
+            "workers": workers,
+            "seconds": round(best, 4),
+            "rows_per_s": round(rows / best),
+            "speedup": round(base / best, 2),
+            "efficiency": round(base / best / workers, 2),
+        })
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m logic.parallel", description="parallel executor scaling benchmark")
+    ap.add_argument("--rows", type=int, default=4_000_000)
+    ap.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+    counts = [int(x) for x in args.workers.split(",") if x.strip()]
+    for row in benchmark(args.rows, counts, args.repeat):
+        print(json.dumps(row))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
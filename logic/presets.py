@@ -3,6 +3,10 @@
 # รองรับขนาดตั้งแต่ 2" ถึง 10" แบ่งเป็น class ที่เหมาะสม
 from typing import Dict, Any, Tuple
 
+import numpy as np
+
+from analyzer.class_index import ClassIndex
+
 # -----------------------
 # Drone classes definition
 # -----------------------
@@ -18,6 +22,9 @@ DRONE_CLASSES: Dict[str, Dict[str, Any]] = {
     "long_range": {"size_range": (7.6, 10.0), "description": "Long Range / Cinematic (7.6–10\")"},
 }
 
+# precompiled once at import (sorted boundaries + nearest-centre fallback)
+PRESET_CLASS_INDEX = ClassIndex.from_size_ranges(DRONE_CLASSES)
+
 # -----------------------
 # Baseline PID & Filter per class (conservative & safe)
 # Notes: These are baseline starting points designed to be safe for initial flights.
@@ -66,6 +73,39 @@ BASELINE_CTRL: Dict[str, Dict[str, Any]] = {
     },
 }
 
+# -----------------------
+# PID / filter profile per flying style (style -> profile เลือกด้วยกฎ style_profile ใน data/rules.json)
+# -----------------------
+STYLE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "freestyle": {
+        "pid": {
+            "roll": {"p": 48, "i": 52, "d": 38},
+            "pitch": {"p": 48, "i": 52, "d": 38},
+            "yaw": {"p": 40, "i": 45, "d": 0}
+        },
+        "filter": {"gyro_lpf2": 90, "dterm_lpf1": 120, "dyn_notch": 2},
+        "extra_tips": ["Freestyle, สมดุล แรงพอดี"],
+    },
+    "racing": {
+        "pid": {
+            "roll": {"p": 55, "i": 45, "d": 42},
+            "pitch": {"p": 55, "i": 45, "d": 42},
+            "yaw": {"p": 50, "i": 40, "d": 0}
+        },
+        "filter": {"gyro_lpf2": 120, "dterm_lpf1": 150, "dyn_notch": 3},
+        "extra_tips": ["Racing, ตอบสนองไว"],
+    },
+    "longrange": {
+        "pid": {
+            "roll": {"p": 42, "i": 50, "d": 32},
+            "pitch": {"p": 42, "i": 50, "d": 32},
+            "yaw": {"p": 35, "i": 45, "d": 0}
+        },
+        "filter": {"gyro_lpf2": 70, "dterm_lpf1": 90, "dyn_notch": 1},
+        "extra_tips": ["Long Range, Smooth, ประหยัดแบต"],
+    },
+}
+
 # -----------------------
 # Preset auto-fill examples (quick form fill)
 # Key format: "<size>_<shortkey>"
@@ -112,23 +152,13 @@ def detect_class_from_size(size: float) -> Tuple[str, Dict[str, Any]]:
     Return (class_key, meta) based on size (inches).
     If exact class not found, returns nearest logical class.
     """
-    # exact match
-    for cls, meta in DRONE_CLASSES.items():
-        lo, hi = meta["size_range"]
-        if lo <= size <= hi:
-            return cls, meta
+    cls = PRESET_CLASS_INDEX.keys[PRESET_CLASS_INDEX.lookup(size)]
+    return cls, DRONE_CLASSES[cls]
+
 
-    # fallback: find nearest by distance to center
-    best = None
-    best_dist = None
-    for cls, meta in DRONE_CLASSES.items():
-        lo, hi = meta["size_range"]
-        center = (lo + hi) / 2.0
-        dist = abs(center - size)
-        if best is None or dist < best_dist:
-            best = cls
-            best_dist = dist
-    return best, DRONE_CLASSES[best]
+def detect_class_from_size_batch(sizes) -> np.ndarray:
+    """Vectorized detect_class_from_size(): index into PRESET_CLASS_INDEX.keys per row."""
+    return PRESET_CLASS_INDEX.classify(sizes)
 
 
 def get_baseline_for_class(cls_key: str) -> Dict[str, Any]:
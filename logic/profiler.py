@@ -0,0 +1,318 @@
+# logic/profiler.py
+# OBIXConfig Doctor - on-demand request profiler (WSGI middleware)
+#
+# เปิดด้วย OBIX_PROFILE_DIR + อย่างน้อยหนึ่งใน:
+#   OBIX_PROFILE_SECRET : request ที่ส่ง header X-Obix-Profile: <secret> ถูก profile
+#   OBIX_PROFILE_SAMPLE : สุ่ม profile ตามสัดส่วน (เช่น 0.01 = 1% ของ request)
+# ไม่ตั้ง = from_env() คืน None และ app ไม่ครอบ wsgi_app เลย (ไม่มี overhead)
+#
+# ต่อ request ที่ถูกเลือก: cProfile ครอบทั้ง view และการ stream body แล้วเขียน
+#   <id>.pstats    : pstats (python -m pstats / snakeviz)
+#   <id>.collapsed : collapsed stacks (flamegraph.pl / speedscope) ประมาณจาก call graph ของ pstats
+#   <id>.json      : method / path / status / เวลา
+# เก็บล่าสุดไม่เกิน OBIX_PROFILE_KEEP ชุด (ลบชุดเก่าสุดก่อน)
+#
+#   python -m logic.profiler collapse profile.pstats > profile.collapsed
+
+import argparse
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+HEADER = "X-Obix-Profile"
+ID_HEADER = "X-Obix-Profile-Id"
+FORMATS = {"pstats": "application/octet-stream", "collapsed": "text/plain; charset=utf-8"}
+PROFILE_ID = re.compile(r"^[0-9A-Za-z_-]{1,64}$")
+
+# collapsed stacks: drop paths worth less than this many microseconds / deeper than MAX_DEPTH
+MIN_US = 1.0
+MAX_DEPTH = 96
+
+
+# -----------------------
+# pstats -> collapsed stacks
+# -----------------------
+def _frame_label(func: Tuple[str, int, str]) -> str:
+    filename, lineno, name = func
+    if filename == "~":  # built-in
+        label = name
+    else:
+        label = f"{name} ({os.path.basename(filename)}:{lineno})"
+    return label.replace(";", ":")
+
+
+def collapse_stats(stats: Dict[Tuple, Tuple]) -> Dict[str, int]:
+    """
+    Approximate collapsed stacks ("a;b;c" -> self microseconds) from a
+    pstats table. cProfile only records caller -> callee edges, so time of a
+    function is split across its callers in proportion to each edge's
+    cumulative time (same idea as flameprof / gprof2dot).
+    """
+    callees: Dict[Tuple, Dict[Tuple, float]] = defaultdict(dict)
+    for func, (_cc, _nc, _tt, _ct, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees[caller][func] = edge[3]
+    roots = [func for func, value in stats.items() if not value[4]]
+
+    out: Dict[str, float] = defaultdict(float)
+
+    def walk(func: Tuple, path: Tuple[str, ...], on_path: frozenset, share: float) -> None:
+        _cc, _nc, tt, ct, _callers = stats[func]
+        path = path + (_frame_label(func),)
+        self_us = tt * share * 1e6
+        if self_us >= MIN_US:
+            out[";".join(path)] += self_us
+        if len(path) >= MAX_DEPTH:
+            return
+        on_path = on_path | {func}
+        for callee, edge_ct in callees.get(func, {}).items():
+            callee_ct = stats[callee][3]
+            if callee in on_path or callee_ct <= 0:
+                continue
+            part = share * edge_ct / callee_ct
+            if callee_ct * part * 1e6 >= MIN_US:
+                walk(callee, path, on_path, part)
+
+    for root in roots:
+        walk(root, (), frozenset(), 1.0)
+    return {stack: int(round(us)) for stack, us in out.items() if us >= 0.5}
+
+
+def write_collapsed(stacks: Dict[str, int], f: Any) -> None:
+    for stack, us in sorted(stacks.items()):
+        f.write(f"{stack} {us}\n")
+
+
+# -----------------------
+# middleware
+# -----------------------
+class _ProfiledBody:
+    """Response iterable that keeps profiling while the body streams; saves on close()."""
+
+    def __init__(self, body: Iterable[bytes], prof: cProfile.Profile, finish: Callable[[], None]):
+        self._body = body
+        self._prof = prof
+        self._finish = finish
+
+    def __iter__(self) -> Iterator[bytes]:
+        it = iter(self._body)
+        while True:
+            self._prof.enable()
+            try:
+                chunk = next(it)
+            except StopIteration:
+                return
+            finally:
+                self._prof.disable()
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            close = getattr(self._body, "close", None)
+            if close is not None:
+                self._prof.enable()
+                try:
+                    close()
+                finally:
+                    self._prof.disable()
+        finally:
+            self._finish()
+
+
+class RequestProfiler:
+    """
+    Profiles selected requests (secret header or random sample) on the
+    configured path prefixes and keeps the newest `keep` profiles in `directory`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        secret: Optional[str] = None,
+        sample: float = 0.0,
+        keep: int = 50,
+        prefixes: Tuple[str, ...] = ("/app", "/api/"),
+        exclude: Tuple[str, ...] = ("/api/profiles",),
+    ):
+        self.directory = directory
+        self.secret = secret or None
+        self.sample = max(0.0, min(1.0, float(sample)))
+        self.keep = max(1, int(keep))
+        self.prefixes = prefixes
+        self.exclude = exclude
+        self.written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestProfiler"]:
+        """OBIX_PROFILE_DIR + OBIX_PROFILE_SECRET / OBIX_PROFILE_SAMPLE; None when profiling is off."""
+        directory = os.environ.get("OBIX_PROFILE_DIR")
+        secret = os.environ.get("OBIX_PROFILE_SECRET")
+        sample = float(os.environ.get("OBIX_PROFILE_SAMPLE", 0) or 0)
+        if not directory or (not secret and sample <= 0):
+            return None
+        prefixes = tuple(p for p in os.environ.get("OBIX_PROFILE_PATHS", "/app,/api/").split(",") if p)
+        return cls(directory, secret, sample, int(os.environ.get("OBIX_PROFILE_KEEP", 50)), prefixes)
+
+    # -----------------------
+    # selection
+    # -----------------------
+    def authorized(self, header_value: Optional[str]) -> bool:
+        """Secret header check (constant time); always False without a configured secret."""
+        if not self.secret or not header_value:
+            return False
+        return hmac.compare_digest(header_value.encode("utf-8"), self.secret.encode("utf-8"))
+
+    def trigger(self, environ: Dict[str, Any]) -> Optional[str]:
+        path = environ.get("PATH_INFO", "")
+        if not path.startswith(self.prefixes) or path.startswith(self.exclude):
+            return None
+        if self.authorized(environ.get("HTTP_X_OBIX_PROFILE")):
+            return "header"
+        if self.sample and random.random() < self.sample:
+            return "sample"
+        return None
+
+    def wrap(self, wsgi_app: Callable) -> Callable:
+        def profiled_app(environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+            trigger = self.trigger(environ)
+            if trigger is None:
+                return wsgi_app(environ, start_response)
+            return self._run(wsgi_app, environ, start_response, trigger)
+
+        return profiled_app
+
+    # -----------------------
+    # one profiled request
+    # -----------------------
+    def _run(self, wsgi_app: Callable, environ: Dict[str, Any], start_response: Callable, trigger: str) -> Iterable[bytes]:
+        now = time.time()
+        # time-ordered ids: rotation / listing sort them as strings
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now)) + f"{int(now % 1 * 1e6):06d}"
+        profile_id = f"{stamp}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        meta: Dict[str, Any] = {
+            "id": profile_id,
+            "method": environ.get("REQUEST_METHOD", ""),
+            "path": environ.get("PATH_INFO", ""),
+            "query": environ.get("QUERY_STRING", ""),
+            "trigger": trigger,
+            "pid": os.getpid(),
+            "created": now,
+        }
+
+        def profiled_start(status: str, headers: List[Tuple[str, str]], exc_info: Any = None) -> Any:
+            meta["status"] = int(status.split(" ", 1)[0])
+            headers.append((ID_HEADER, profile_id))
+            return start_response(status, headers, exc_info)
+
+        prof = cProfile.Profile()
+        t0 = time.perf_counter()
+
+        def finish() -> None:
+            meta["ms"] = round((time.perf_counter() - t0) * 1000, 3)
+            self.save(prof, meta)
+
+        prof.enable()
+        try:
+            body = wsgi_app(environ, profiled_start)
+        except BaseException:
+            prof.disable()
+            meta["status"] = 500
+            finish()
+            raise
+        prof.disable()
+        return _ProfiledBody(body, prof, finish)
+
+    def _path(self, profile_id: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{ext}")
+
+    def save(self, prof: cProfile.Profile, meta: Dict[str, Any]) -> None:
+        profile_id = meta["id"]
+        try:
+            stats = pstats.Stats(prof)
+            tmp = self._path(profile_id, "pstats.tmp")
+            stats.dump_stats(tmp)
+            os.replace(tmp, self._path(profile_id, "pstats"))
+            with open(self._path(profile_id, "collapsed.tmp"), "w", encoding="utf-8") as f:
+                write_collapsed(collapse_stats(stats.stats), f)  # type: ignore[attr-defined]
+            os.replace(self._path(profile_id, "collapsed.tmp"), self._path(profile_id, "collapsed"))
+            # meta last: list() only shows complete profiles
+            with open(self._path(profile_id, "json.tmp"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(self._path(profile_id, "json.tmp"), self._path(profile_id, "json"))
+            self.written += 1
+            self.rotate()
+        except OSError:
+            # profiling must never break the request it measured
+            pass
+
+    # -----------------------
+    # storage
+    # -----------------------
+    def rotate(self) -> None:
+        """Drop the oldest profiles beyond `keep` (shared directory: any worker may rotate)."""
+        metas = sorted(
+            (name[:-5] for name in os.listdir(self.directory) if name.endswith(".json")),
+            reverse=True,
+        )
+        for profile_id in metas[self.keep:]:
+            for ext in ("json", *FORMATS):
+                try:
+                    os.remove(self._path(profile_id, ext))
+                except OSError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Newest first."""
+        out = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    out.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def file(self, profile_id: str, fmt: str) -> Optional[str]:
+        """Path of a stored profile file, or None (unknown id / format)."""
+        if fmt not in FORMATS or not PROFILE_ID.match(profile_id):
+            return None
+        path = self._path(profile_id, fmt)
+        return path if os.path.exists(path) else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "header": bool(self.secret),
+            "sample": self.sample,
+            "keep": self.keep,
+            "prefixes": list(self.prefixes),
+            "written": self.written,
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m logic.profiler", description="convert stored request profiles")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_collapse = sub.add_parser("collapse", help="pstats -> collapsed stacks (stdout)")
+    p_collapse.add_argument("path")
+    args = ap.parse_args(argv)
+
+    stats = pstats.Stats(args.path)
+    write_collapsed(collapse_stats(stats.stats), sys.stdout)  # type: ignore[attr-defined]
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+# logic/results.py
+# OBIXConfig Doctor - shared immutable tables + compact analysis result + fast JSON
+#
+# ตารางที่ทุก request ใช้ร่วมกัน (style profile / baseline ของ class) ถูกแปลงเป็น
+# MappingProxyType / tuple ครั้งเดียวตอน import แล้วแนบเข้า analysis โดยไม่ copy
+# AnalysisResult = __slots__ (ไม่มี dict ต่อ instance) อ่านได้ทั้ง result.key และ result["key"]
+# JSON: ใช้ orjson ถ้าติดตั้งไว้ (pip install orjson) ไม่งั้นใช้ json ของ stdlib
+
+import json
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analyzer.drone_class import DRONE_CLASSES as ANALYZER_CLASSES
+from logic.presets import STYLE_PROFILES, get_baseline_for_class
+from logic.stages import merge_fragments
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+# id(proxy) -> (proxy, plain dict ที่ serialize ได้ตรง ๆ) ให้ JSON ไม่ต้องแปลงซ้ำทุก request
+_THAWED: Dict[int, Tuple[Mapping, Dict[str, Any]]] = {}
+
+
+def _thaw(obj: Any) -> Any:
+    if isinstance(obj, MappingProxyType):
+        return _THAWED[id(obj)][1]
+    if isinstance(obj, tuple):
+        return [_thaw(v) for v in obj]
+    return obj
+
+
+def freeze(obj: Any) -> Any:
+    """Deep read-only copy: dict -> MappingProxyType, list -> tuple. Meant for import-time tables."""
+    if isinstance(obj, Mapping):
+        proxy = MappingProxyType({k: freeze(v) for k, v in obj.items()})
+        _THAWED[id(proxy)] = (proxy, {k: _thaw(v) for k, v in proxy.items()})
+        return proxy
+    if isinstance(obj, (list, tuple)):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+
+# -----------------------
+# shared fragments (built once)
+# -----------------------
+# profile -> {"pid", "filter", "extra_tips"}
+STYLE_FRAGMENTS: Mapping = freeze(STYLE_PROFILES)
+
+
+def _baseline(ctrl_key: str) -> Dict[str, Any]:
+    baseline_ctrl = get_baseline_for_class(ctrl_key) or {}
+    pid = baseline_ctrl.get("pid", {})
+    flt = baseline_ctrl.get("filter", {})
+    P = pid.get("P", pid.get("p", 0))
+    I = pid.get("I", pid.get("i", 0))
+    D = pid.get("D", pid.get("d", 0))
+    return {
+        "baseline_control": baseline_ctrl,
+        "pid_baseline": {
+            "roll": {"p": P, "i": I, "d": D},
+            "pitch": {"p": P, "i": I, "d": D},
+            "yaw": {"p": int(P * 0.6) if P else 0, "i": int(I * 0.6) if I else 0, "d": 0},
+        },
+        "filter_baseline": {
+            "gyro_lpf2": flt.get("gyro_cutoff", flt.get("gyro_lpf2")),
+            "dterm_lpf1": flt.get("dterm_lowpass", flt.get("dterm_lpf1")),
+            "dyn_notch": flt.get("notch", flt.get("dyn_notch")),
+        },
+    }
+
+
+# analyzer class (the one drone_class_stage detected) -> baseline_stage fragment
+CLASS_BASELINES: Mapping = MappingProxyType({
+    key: freeze(_baseline(meta.get("baseline", key))) for key, meta in ANALYZER_CLASSES.items()
+})
+# class detection failed: no class, no baseline
+UNKNOWN_BASELINE: Mapping = freeze({"detected_class": "unknown", "class_meta": {}, **_baseline("unknown")})
+
+# analyzer class (by size + weight) -> the class part of drone_class_stage
+ANALYZER_BASELINES: Mapping = MappingProxyType({
+    key: freeze({
+        "detected_class": key,
+        "class_meta": {"description": meta.get("description", "")},
+        "pid_baseline": meta.get("pid", {}),
+        "filter_baseline": meta.get("filter", {}),
+        "extra_tips": [f"System detected class '{key}' — baseline PID/filter suggested."],
+    })
+    for key, meta in ANALYZER_CLASSES.items()
+})
+
+
+# -----------------------
+# analysis result
+# -----------------------
+# key order = merge order of build_analysis()
+ANALYSIS_KEYS = (
+    "overview", "summary", "basic_tips", "pid", "filter", "extra_tips", "thrust_ratio", "battery_est",
+    "flight_time",
+    "weight_class", "detected_class", "class_meta", "pid_baseline", "filter_baseline",
+    "class_scores", "confidence_score", "confidence_level", "confidence_desc", "preset_used", "baseline_control",
+    "similar_builds", "warnings", "prop_result",
+)
+_KEYS = frozenset(ANALYSIS_KEYS)
+
+
+class AnalysisResult(Mapping):
+    """
+    Read-only analysis. Attribute access for templates (analysis.pid_baseline),
+    Mapping access for everything that used the dict (analysis["pid"],
+    .get, .items). Keys a pipeline run did not produce are simply absent.
+    """
+
+    __slots__ = ANALYSIS_KEYS
+
+    def __init__(self, values: Optional[Mapping] = None, **kw: Any):
+        for source in (values or {}, kw):
+            for key, value in source.items():
+                _slot_setter(key)(self, value)
+
+    @classmethod
+    def from_fragments(cls, fragments: Iterable[Mapping]) -> "AnalysisResult":
+        """merge_fragments() then fill the slots."""
+        self = cls.__new__(cls)
+        setters = _SETTERS
+        values = merge_fragments(fragments)
+        unknown = values.keys() - setters.keys()
+        if unknown:
+            raise KeyError(f"unknown analysis keys {sorted(unknown)} (add them to ANALYSIS_KEYS)")
+        for key, value in values.items():
+            setters[key](self, value)
+        return self
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        raise AttributeError("AnalysisResult is read-only")
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _KEYS:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[str]:
+        for key in ANALYSIS_KEYS:
+            if hasattr(self, key):
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, key: object) -> bool:
+        return key in _KEYS and hasattr(self, key)  # type: ignore[arg-type]
+
+    def __repr__(self) -> str:
+        return f"AnalysisResult({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self}
+
+
+# slot descriptors: set values without going through the read-only __setattr__
+_SETTERS = {key: getattr(AnalysisResult, key).__set__ for key in ANALYSIS_KEYS}
+
+
+def _slot_setter(key: str) -> Callable[[Any, Any], None]:
+    try:
+        return _SETTERS[key]
+    except KeyError:
+        raise KeyError(f"unknown analysis key {key!r} (add it to ANALYSIS_KEYS)") from None
+
+
+# -----------------------
+# JSON
+# -----------------------
+class RowMessages:
+    """
+    Per-row message lists kept as one boolean mask per message (batch
+    warnings); expanded to [[msg, ...], ...] only when serialized.
+    """
+
+    __slots__ = ("n", "masks")
+
+    def __init__(self, n: int, masks: Sequence[Tuple[np.ndarray, Any]]):
+        self.n = n
+        self.masks = list(masks)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def to_lists(self) -> List[List[Any]]:
+        empty: List[Any] = []  # shared by every row without messages (serialized, never mutated)
+        out = [empty] * self.n
+        if not self.masks:
+            return out
+        hits = np.stack([np.asarray(mask, dtype=bool) for mask, _ in self.masks])
+        messages = [msg for _, msg in self.masks]
+        for row in np.flatnonzero(hits.any(axis=0)).tolist():
+            out[row] = [messages[r] for r in np.flatnonzero(hits[:, row]).tolist()]
+        return out
+
+
+def to_builtin(obj: Any) -> Any:
+    """json `default` hook: read-only tables / AnalysisResult / batch masks / numpy -> plain JSON types."""
+    if isinstance(obj, AnalysisResult):
+        return obj.to_dict()
+    if isinstance(obj, RowMessages):
+        return obj.to_lists()
+    frozen = _THAWED.get(id(obj))
+    if frozen is not None and frozen[0] is obj:
+        return frozen[1]
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, (tuple, set, frozenset)):
+        return list(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any, sort_keys: bool = False, default: Callable[[Any], Any] = to_builtin) -> bytes:
+        """Compact UTF-8 JSON (non-ASCII kept as is)."""
+        return orjson.dumps(obj, default=default, option=_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0))
+
+    loads = orjson.loads
+else:
+    def dumps(obj: Any, sort_keys: bool = False, default: Callable[[Any], Any] = to_builtin) -> bytes:
+        """Compact UTF-8 JSON (non-ASCII kept as is)."""
+        return json.dumps(
+            obj, ensure_ascii=False, sort_keys=sort_keys, separators=(",", ":"), default=default,
+        ).encode("utf-8")
+
+    loads = json.loads
+
+
+def dumps_str(obj: Any, sort_keys: bool = False) -> str:
+    return dumps(obj, sort_keys).decode("utf-8")
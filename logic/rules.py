@@ -0,0 +1,323 @@
+# logic/rules.py
+# OBIXConfig Doctor - declarative advice / classification rules (data/rules.json)
+#
+# กฎทุกข้อ (tier ของ pitch / ใบพัด, class น้ำหนัก, แบต, style, คำเตือน input, คำแนะนำ doctor)
+# อยู่ในไฟล์ JSON แล้วถูก compile ครั้งเดียวตอน import:
+#   bins    : if/elif บนตัวเลข (ge/gt เรียงจากมากไปน้อย หรือ lt/le เรียงจากน้อยไปมาก) -> edges + bisect / searchsorted
+#   match   : เท่ากับค่าที่ระบุ (eq / in) -> dict lookup
+#   compare : field เทียบกับอีก field (gt / ge / lt / le)
+# bin ของ bins / match ซ้อนกฎย่อยได้ด้วย "rule"; bin สุดท้าย (ไม่มีเงื่อนไข) = else และรับค่า nan
+# ผลของกฎ = index ของ outcome (dict ค่าที่แนบ เช่น label / load / warn)
+# ใช้ได้ทั้งทีละ build (outcome / collect) และทั้ง column (codes / take / masks) ด้วยตารางเดียวกัน
+#
+#   python -m logic.rules size=5 weight=750 pitch=4.3 blades=3 style=racing battery=4S
+
+import argparse
+import json
+import operator
+import os
+import sys
+from bisect import bisect_right
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_RULES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "rules.json")
+
+BOUND_KEYS = ("ge", "gt", "lt", "le")
+CONDITION_KEYS = frozenset(BOUND_KEYS + ("eq", "in", "rule"))
+COMPARE_OPS = {"gt": operator.gt, "ge": operator.ge, "lt": operator.lt, "le": operator.le}
+
+Outcome = Mapping
+
+
+def _value_columns(outcomes: Sequence[Outcome]) -> Dict[str, np.ndarray]:
+    """outcome key -> array indexed by outcome code (numeric when every outcome has a number)."""
+    keys: List[str] = []
+    for o in outcomes:
+        keys.extend(k for k in o if k not in keys)
+    columns = {}
+    for key in keys:
+        values = [o.get(key) for o in outcomes]
+        numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values)
+        columns[key] = np.array(values) if numeric else np.array(values, dtype=object)
+    return columns
+
+
+# -----------------------
+# Compiled rules
+# -----------------------
+class Rule:
+    """
+    Base: a rule picks one branch per build; a branch is either an outcome
+    or a nested rule whose outcomes are appended to this rule's list.
+    """
+
+    def __init__(self, name: str, fields: Tuple[str, ...], branches: Sequence[Mapping]):
+        self.name = name
+        outcomes: List[Outcome] = []
+        leaf: List[int] = []
+        self._children: Dict[int, Tuple["Rule", int]] = {}
+        for b, spec in enumerate(branches):
+            if "rule" in spec:
+                child = compile_rule(f"{name}[{b}]", spec["rule"])
+                self._children[b] = (child, len(outcomes))
+                outcomes.extend(child.outcomes)
+                fields += tuple(f for f in child.fields if f not in fields)
+                leaf.append(-1)
+            else:
+                leaf.append(len(outcomes))
+                outcomes.append(MappingProxyType({k: v for k, v in spec.items() if k not in CONDITION_KEYS}))
+        self.fields = fields
+        self.outcomes: Tuple[Outcome, ...] = tuple(outcomes)
+        self.values = _value_columns(self.outcomes)
+        self._leaf = leaf
+        self._leaf_arr = np.array(leaf, dtype=np.int64)
+        if not self._children:
+            # no nested rules: branch == outcome index, skip the indirection
+            self.index = self._branch  # type: ignore[method-assign]
+
+    # --- per rule kind ---
+    def _branch(self, build: Mapping) -> int:
+        raise NotImplementedError
+
+    def _branches(self, columns: Mapping) -> np.ndarray:
+        raise NotImplementedError
+
+    # --- one build ---
+    def index(self, build: Mapping) -> int:
+        b = self._branch(build)
+        child = self._children.get(b)
+        if child is None:
+            return self._leaf[b]
+        rule, offset = child
+        return offset + rule.index(build)
+
+    def outcome(self, build: Mapping) -> Outcome:
+        return self.outcomes[self.index(build)]
+
+    # --- many builds ---
+    def codes(self, columns: Mapping) -> np.ndarray:
+        """Outcome index per row (keeps the broadcast shape of the input columns)."""
+        b = self._branches(columns)
+        codes = self._leaf_arr[b]
+        for branch, (rule, offset) in self._children.items():
+            codes = np.where(b == branch, offset + rule.codes(columns), codes)
+        return codes
+
+    def take(self, key: str, codes: np.ndarray) -> np.ndarray:
+        return self.values[key][codes]
+
+
+class BinsRule(Rule):
+    """
+    if/elif over one numeric field, compiled to ascending edges where
+    value >= edge moves one bin up (gt / le use the next float up).
+    """
+
+    def __init__(self, name: str, spec: Mapping):
+        self.field = spec["field"]
+        bins = spec["bins"]
+        if not bins or any(k in bins[-1] for k in BOUND_KEYS):
+            raise ValueError(f"rule {name}: the last bin must have no bound (else)")
+        bounds = []
+        for b in bins[:-1]:
+            keys = [k for k in BOUND_KEYS if k in b]
+            if len(keys) != 1:
+                raise ValueError(f"rule {name}: every bin but the last needs exactly one of {BOUND_KEYS}")
+            bounds.append((keys[0], float(b[keys[0]])))
+
+        edges = [np.nextafter(v, np.inf) if k in ("gt", "le") else v for k, v in bounds]
+        if all(k in ("ge", "gt") for k, _ in bounds):
+            # checked from the top down: listed bin 0 = highest values
+            edges.reverse()
+            m = len(edges)
+            bin_of_pos = [m - p for p in range(m + 1)]
+        elif all(k in ("lt", "le") for k, _ in bounds):
+            bin_of_pos = list(range(len(edges) + 1))
+        else:
+            raise ValueError(f"rule {name}: mix of lower (ge/gt) and upper (lt/le) bounds")
+        if any(a > b for a, b in zip(edges, edges[1:])):
+            raise ValueError(f"rule {name}: bounds out of order")
+
+        self._edges = [float(e) for e in edges]
+        self._edges_arr = np.array(self._edges, dtype=np.float64)
+        self._bin_of_pos = bin_of_pos
+        self._bin_of_pos_arr = np.array(bin_of_pos, dtype=np.int64)
+        self._nan_bin = int(spec.get("nan", len(bins) - 1))
+        super().__init__(name, (self.field,), bins)
+
+    def _branch(self, build: Mapping) -> int:
+        v = build[self.field]
+        if v != v:
+            return self._nan_bin
+        return self._bin_of_pos[bisect_right(self._edges, v)]
+
+    def _branches(self, columns: Mapping) -> np.ndarray:
+        v = np.asarray(columns[self.field], dtype=np.float64)
+        b = self._bin_of_pos_arr[np.searchsorted(self._edges_arr, v, side="right")]
+        return np.where(np.isnan(v), self._nan_bin, b)
+
+
+class MatchRule(Rule):
+    """First bin whose eq / in contains the value; the last bin is the default."""
+
+    def __init__(self, name: str, spec: Mapping):
+        self.field = spec["field"]
+        bins = spec["match"]
+        if not bins or "eq" in bins[-1] or "in" in bins[-1]:
+            raise ValueError(f"rule {name}: the last match entry must have no eq/in (default)")
+        lookup: Dict[Any, int] = {}
+        for i, b in enumerate(bins[:-1]):
+            if ("eq" in b) == ("in" in b):
+                raise ValueError(f"rule {name}: every entry but the last needs exactly one of eq / in")
+            for value in ([b["eq"]] if "eq" in b else b["in"]):
+                lookup.setdefault(value, i)
+        self._lookup = lookup
+        self._default = len(bins) - 1
+        super().__init__(name, (self.field,), bins)
+
+    def _branch(self, build: Mapping) -> int:
+        try:
+            return self._lookup.get(build[self.field], self._default)
+        except TypeError:  # unhashable input
+            return self._default
+
+    def _branches(self, columns: Mapping) -> np.ndarray:
+        arr = np.asarray(columns[self.field])
+        out = np.full(arr.shape, self._default, dtype=np.int64)
+        numeric = arr.dtype.kind in "biuf"
+        for value, i in self._lookup.items():
+            if numeric and not isinstance(value, (int, float)):
+                continue
+            out[arr == value] = i
+        return out
+
+
+class CompareRule(Rule):
+    """field <op> other -> "then", otherwise "else"."""
+
+    def __init__(self, name: str, spec: Mapping):
+        self.field = spec["field"]
+        self.other = spec["other"]
+        try:
+            self._op = COMPARE_OPS[spec["compare"]]
+        except KeyError:
+            raise ValueError(f"rule {name}: compare must be one of {sorted(COMPARE_OPS)}") from None
+        super().__init__(name, (self.field, self.other), [spec.get("then", {}), spec.get("else", {})])
+
+    def _branch(self, build: Mapping) -> int:
+        return 0 if self._op(build[self.field], build[self.other]) else 1
+
+    def _branches(self, columns: Mapping) -> np.ndarray:
+        hit = self._op(np.asarray(columns[self.field]), np.asarray(columns[self.other]))
+        return np.where(hit, 0, 1)
+
+
+def compile_rule(name: str, spec: Mapping) -> Rule:
+    if "bins" in spec:
+        return BinsRule(name, spec)
+    if "match" in spec:
+        return MatchRule(name, spec)
+    if "compare" in spec:
+        return CompareRule(name, spec)
+    raise ValueError(f"rule {name}: needs one of bins / match / compare")
+
+
+# -----------------------
+# Rule set
+# -----------------------
+class RuleSet(Mapping):
+    """Every rule of one rules file plus named groups (e.g. "validate")."""
+
+    def __init__(self, spec: Mapping, source: str = "inline"):
+        self.spec = spec
+        self.source = source
+        self.version = spec.get("version", 1)
+        self._rules: Dict[str, Rule] = {name: compile_rule(name, s) for name, s in spec["rules"].items()}
+        self.groups: Dict[str, Tuple[Rule, ...]] = {}
+        for group, names in spec.get("groups", {}).items():
+            missing = [n for n in names if n not in self._rules]
+            if missing:
+                raise ValueError(f"group {group}: unknown rules {missing}")
+            self.groups[group] = tuple(self._rules[n] for n in names)
+        self._collectors: Dict[Tuple[str, str], List[Tuple[Any, Tuple[Any, ...]]]] = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> "RuleSet":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), source=path)
+
+    @classmethod
+    def from_env(cls) -> "RuleSet":
+        """OBIX_RULES (default data/rules.json)."""
+        return cls.from_file(os.environ.get("OBIX_RULES") or DEFAULT_RULES)
+
+    def __getitem__(self, name: str) -> Rule:
+        return self._rules[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rules)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def evaluate(self, build: Mapping, names: Optional[Sequence[str]] = None) -> Dict[str, Outcome]:
+        """Outcome of every rule (or the named ones) whose fields are all in build."""
+        rules = self._rules.values() if names is None else (self._rules[n] for n in names)
+        return {r.name: r.outcome(build) for r in rules if all(f in build for f in r.fields)}
+
+    def collect(self, group: str, build: Mapping, key: str) -> List[Any]:
+        """outcome[key] of each rule in the group, in order, skipping outcomes without it."""
+        steps = self._collectors.get((group, key))
+        if steps is None:
+            steps = [(rule.index, tuple(o.get(key) for o in rule.outcomes)) for rule in self.groups[group]]
+            self._collectors[(group, key)] = steps
+        out = []
+        for index, values in steps:
+            value = values[index(build)]
+            if value:
+                out.append(value)
+        return out
+
+    def masks(self, group: str, columns: Mapping, key: str) -> List[Tuple[np.ndarray, Any]]:
+        """Vectorized collect(): one (row mask, value) pair per distinct value of each rule."""
+        out = []
+        for rule in self.groups[group]:
+            codes = rule.codes(columns)
+            seen: List[Any] = []
+            for o in rule.outcomes:
+                value = o.get(key)
+                if value and value not in seen:
+                    seen.append(value)
+                    idx = [i for i, other in enumerate(rule.outcomes) if other.get(key) == value]
+                    out.append((np.isin(codes, idx), value))
+        return out
+
+
+RULES = RuleSet.from_env()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m logic.rules", description="evaluate the rule table for one build")
+    ap.add_argument("fields", nargs="*", help="field=value (numbers are parsed as float, blades as int)")
+    ap.add_argument("--rules", help="rules file (default: OBIX_RULES / data/rules.json)")
+    args = ap.parse_args(argv)
+
+    rules = RuleSet.from_file(args.rules) if args.rules else RULES
+    build: Dict[str, Any] = {}
+    for item in args.fields:
+        key, _, raw = item.partition("=")
+        try:
+            build[key] = int(raw) if key == "blades" else float(raw)
+        except ValueError:
+            build[key] = raw
+    result = {name: dict(o) for name, o in rules.evaluate(build).items()}
+    print(json.dumps({"source": rules.source, "rules": len(rules), "outcomes": result}, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
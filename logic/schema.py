@@ -0,0 +1,277 @@
+# logic/schema.py
+# OBIXConfig Doctor - declarative input schema compiled into scalar + columnar validators
+#
+# spec ต่อ field (ใช้คำเดียวกับ data/rules.json):
+#   {"type": "float" | "int" | "str", "default": ..., "gt"/"ge"/"lt"/"le": ขอบเขตแข็ง,
+#    "choices": [...], "pattern": regex, "max_len": n, "strip": true, "label": ชื่อที่แสดงใน error}
+# ค่าว่าง (ไม่ส่ง / None / "") = default; ค่าที่ส่งมาแต่ใช้ไม่ได้ = error ของ field นั้น
+# ขอบเขตในนี้คือ "ข้อมูลเสีย" (reject) ส่วนช่วงที่ควรเป็น (warning) อยู่ในกฎ validate ของ rules.json
+#
+#   Schema.parse(mapping)          -> (values, {field: error})        ฟอร์ม / JSON ทีละ build
+#   Schema.columns(data, n)        -> ColumnBatch (arrays + row mask)  batch / bulk ทีละหลายพันแถว
+
+import math
+import operator
+import re
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# error code -> message template ({label}, {bounds})
+MESSAGES: Dict[str, str] = {
+    "not_a_number": "{label} ต้องเป็นตัวเลข",
+    "not_finite": "{label} ต้องเป็นตัวเลขจริง (ไม่ใช่ NaN / inf)",
+    "not_an_integer": "{label} ต้องเป็นจำนวนเต็ม",
+    "out_of_range": "{label} ต้องอยู่ในช่วง {bounds}",
+    "not_a_string": "{label} ต้องเป็นข้อความ",
+    "too_long": "{label} ยาวเกินไป",
+    "invalid_choice": "{label} ไม่ใช่ค่าที่รองรับ",
+}
+# index 0 = ok in columnar code arrays
+CODES: Tuple[str, ...] = ("",) + tuple(MESSAGES)
+_CODE = {code: i for i, code in enumerate(CODES)}
+
+_BOUND_OPS = (("gt", ">"), ("ge", "≥"), ("lt", "<"), ("le", "≤"))
+# elementwise on numpy arrays as well
+_COMPARE = {"gt": operator.gt, "ge": operator.ge, "lt": operator.lt, "le": operator.le}
+
+
+class InputError(ValueError):
+    """Rejected input; `errors` is the structured list (field / code / message [/ row])."""
+
+    def __init__(self, errors: List[Dict[str, Any]], total: Optional[int] = None):
+        self.errors = errors
+        self.total = len(errors) if total is None else total
+        super().__init__(f"invalid input ({self.total} error{'s' if self.total != 1 else ''})")
+
+
+# -----------------------
+# one field
+# -----------------------
+class Field:
+    """Compiled field: parse(raw) -> (value, code) and column(values) -> (array, codes)."""
+
+    def __init__(self, name: str, spec: Mapping[str, Any]):
+        self.name = name
+        self.type = spec["type"]
+        if self.type not in ("float", "int", "str"):
+            raise ValueError(f"field {name!r}: unknown type {self.type!r}")
+        self.default = spec["default"]
+        self.label = spec.get("label", name)
+        self.bounds = tuple((op, float(spec[op])) for op, _ in _BOUND_OPS if op in spec)
+        self.choices = frozenset(spec["choices"]) if "choices" in spec else None
+        self.pattern = re.compile(spec["pattern"]) if "pattern" in spec else None
+        self.max_len = spec.get("max_len")
+        self.strip = bool(spec.get("strip", False))
+        self.messages = {
+            code: text.format(label=self.label, bounds=self.describe_bounds()) for code, text in MESSAGES.items()
+        }
+        self.parse: Callable[[Any], Tuple[Any, str]] = self._number if self.type != "str" else self._string
+        self._in_bounds = self._compile_bounds()
+
+    def describe_bounds(self) -> str:
+        symbols = dict(_BOUND_OPS)
+        return " และ ".join(f"{symbols[op]} {value:g}" for op, value in self.bounds) or "-"
+
+    def _compile_bounds(self) -> Callable[[Any], Any]:
+        pairs = tuple((_COMPARE[op], limit) for op, limit in self.bounds)
+        return lambda x: all(compare(x, limit) for compare, limit in pairs)
+
+    def error(self, code: str) -> Dict[str, str]:
+        return {"field": self.name, "code": code, "message": self.messages[code]}
+
+    # -----------------------
+    # scalar
+    # -----------------------
+    def _number(self, raw: Any) -> Tuple[Any, str]:
+        if raw is None or (isinstance(raw, str) and not raw.strip()):
+            return self.default, ""
+        try:
+            value = float(raw)
+        except (TypeError, ValueError):
+            return self.default, "not_a_number"
+        if not math.isfinite(value):
+            return self.default, "not_finite"
+        if self.type == "int":
+            if value != int(value):
+                return self.default, "not_an_integer"
+        if not self._in_bounds(value):
+            return self.default, "out_of_range"
+        return (int(value) if self.type == "int" else value), ""
+
+    def _string(self, raw: Any) -> Tuple[Any, str]:
+        if _is_blank(raw):
+            return self.default, ""
+        if not isinstance(raw, str):
+            return self.default, "not_a_string"
+        if self.strip:
+            raw = raw.strip()
+        if self.max_len is not None and len(raw) > self.max_len:
+            return self.default, "too_long"
+        if self.choices is not None and raw not in self.choices:
+            return self.default, "invalid_choice"
+        if self.pattern is not None and not self.pattern.fullmatch(raw):
+            return self.default, "invalid_choice"
+        return raw, ""
+
+    # -----------------------
+    # columnar
+    # -----------------------
+    def column(self, values: Optional[Sequence[Any]], n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(typed array with defaults for missing / bad rows, int8 codes into CODES)."""
+        if self.type == "str":
+            return self._string_column(values, n)
+        return self._number_column(values, n)
+
+    def _number_column(self, values: Optional[Sequence[Any]], n: int) -> Tuple[np.ndarray, np.ndarray]:
+        codes = np.zeros(n, dtype=np.int8)
+        if values is None:
+            out = np.full(n, self.default, dtype=np.float64)
+        else:
+            out = None
+            if isinstance(values, np.ndarray) and values.dtype.kind in "biuf":
+                out = values.astype(np.float64)
+            else:
+                # float() is the scalar rule too; any blank / bad cell drops to the memo path
+                try:
+                    out = np.fromiter(map(float, values), np.float64, n)
+                except (TypeError, ValueError):
+                    out = None
+            if out is None:
+                # mixed / malformed: scalar rules once per distinct value
+                return self._memo_column(values, n, np.float64 if self.type == "float" else np.int64)
+            nonfinite = ~np.isfinite(out)
+            codes[nonfinite] = _CODE["not_finite"]
+            if self.type == "int":
+                codes[(out != np.trunc(out)) & (codes == 0)] = _CODE["not_an_integer"]
+            in_bounds = np.ones(n, dtype=bool)
+            for op, limit in self.bounds:
+                in_bounds &= _COMPARE[op](out, limit)
+            codes[~in_bounds & (codes == 0)] = _CODE["out_of_range"]
+            out[codes != 0] = self.default
+        if self.type == "int":
+            return out.astype(np.int64), codes
+        return out, codes
+
+    def _string_column(self, values: Optional[Sequence[Any]], n: int) -> Tuple[np.ndarray, np.ndarray]:
+        if values is None:
+            return np.full(n, self.default, dtype=object), np.zeros(n, dtype=np.int8)
+        # object 1-D ทีละ cell: cell ที่เป็น list / ragged ไม่ถูก numpy ขยายเป็นมิติใหม่ และ 1 ไม่กลายเป็น "1"
+        arr = np.fromiter(values, dtype=object, count=n)
+        if all(isinstance(v, str) for v in arr):
+            # distinct values only: real columns repeat a handful of labels
+            uniq, inverse = np.unique(arr, return_inverse=True)
+            parsed = [self.parse(u) for u in uniq.tolist()]
+            out = np.empty(len(parsed), dtype=object)
+            out[:] = [v for v, _ in parsed]
+            codes = np.array([_CODE[c] for _, c in parsed], dtype=np.int8)
+            return out[inverse], codes[inverse]
+        return self._memo_column(values, n, object)
+
+    def _memo_column(self, values: Sequence[Any], n: int, dtype: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """Generic path: parse() per distinct value (same rules as the scalar path)."""
+        parse = self.parse
+        memo: Dict[Any, Tuple[Any, str]] = {}
+        out = np.empty(n, dtype=dtype)
+        codes = np.zeros(n, dtype=np.int8)
+        for i, raw in enumerate(values):
+            try:
+                hit = memo.get(raw)
+                if hit is None:
+                    hit = memo[raw] = parse(raw)
+            except TypeError:  # unhashable (list / dict cell)
+                hit = parse(raw)
+            out[i] = hit[0]
+            if hit[1]:
+                codes[i] = _CODE[hit[1]]
+        return out, codes
+
+
+def _is_blank(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+# -----------------------
+# batch result
+# -----------------------
+class ColumnBatch:
+    """Typed columns for n rows + per-field error codes; `invalid` marks rows to reject."""
+
+    def __init__(self, fields: Mapping[str, Field], n: int, columns: Dict[str, np.ndarray],
+                 codes: Dict[str, np.ndarray]):
+        self.fields = fields
+        self.n = n
+        self.columns = columns
+        self.codes = codes
+        self.invalid = np.zeros(n, dtype=bool)
+        for c in codes.values():
+            self.invalid |= c != 0
+
+    @property
+    def error_count(self) -> int:
+        return int(sum(np.count_nonzero(c) for c in self.codes.values()))
+
+    def errors(self, limit: int = 100, row_offset: int = 0) -> List[Dict[str, Any]]:
+        """First `limit` errors ordered by row: {"row", "field", "code", "message"}."""
+        out = []
+        for row in np.flatnonzero(self.invalid)[:limit].tolist():
+            for name, c in self.codes.items():
+                if c[row]:
+                    err = self.fields[name].error(CODES[c[row]])
+                    out.append({"row": row + row_offset, **err})
+        return out[:limit]
+
+    def counts(self) -> Dict[str, int]:
+        """{"field.code": rows} for summaries."""
+        out: Dict[str, int] = {}
+        for name, c in self.codes.items():
+            if not c.any():
+                continue
+            values, counts = np.unique(c[c != 0], return_counts=True)
+            for code, count in zip(values.tolist(), counts.tolist()):
+                out[f"{name}.{CODES[code]}"] = count
+        return out
+
+
+# -----------------------
+# schema
+# -----------------------
+class Schema:
+    """Field specs compiled once; parse() for one record, columns() for a batch."""
+
+    def __init__(self, spec: Mapping[str, Mapping[str, Any]]):
+        self.spec = spec
+        self.fields: Dict[str, Field] = {name: Field(name, s) for name, s in spec.items()}
+        self._parsers = tuple((name, f.parse) for name, f in self.fields.items())
+
+    def parse(self, data: Mapping[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, str]]]:
+        """(values with defaults, {field: {"field", "code", "message"}}); bad fields take the default."""
+        values: Dict[str, Any] = {}
+        errors: Dict[str, Dict[str, str]] = {}
+        get = data.get
+        for name, parse in self._parsers:
+            value, code = parse(get(name))
+            values[name] = value
+            if code:
+                errors[name] = self.fields[name].error(code)
+        return values, errors
+
+    def check(self, data: Mapping[str, Any]) -> Dict[str, Any]:
+        """parse() that raises InputError instead of returning errors."""
+        values, errors = self.parse(data)
+        if errors:
+            raise InputError(list(errors.values()))
+        return values
+
+    def columns(self, data: Mapping[str, Any], n: int) -> ColumnBatch:
+        """Validate columns (list / tuple of n values, or a scalar broadcast to all rows)."""
+        columns: Dict[str, np.ndarray] = {}
+        codes: Dict[str, np.ndarray] = {}
+        for name, field in self.fields.items():
+            values = data.get(name)
+            if values is not None and not isinstance(values, (list, tuple, np.ndarray)):
+                values = [values] * n
+            elif values is not None and len(values) != n:
+                raise ValueError("column length mismatch")
+            columns[name], codes[name] = field.column(values, n)
+        return ColumnBatch(self.fields, n, columns, codes)
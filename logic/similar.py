@@ -0,0 +1,504 @@
+# logic/similar.py
+# OBIXConfig Doctor - "similar known-good builds": k-NN over a catalog of tuned builds
+#
+# feature space: (size, weight, prop_size, pitch, blades, cells) หารด้วย std ของ catalog
+# KD-tree (numpy, leaf bucket) + delta buffer: build ที่เพิ่มใหม่ค้นแบบ brute force
+# จนกว่า buffer จะเต็ม แล้วค่อย rebuild tree ทั้งก้อนครั้งเดียว
+# catalog เล็ก (<= BRUTE_FORCE_MAX เช่น preset 10 ตัว) ไม่สร้าง tree: scan ด้วย loop ธรรมดาเร็วกว่าการตั้ง array
+#
+# catalog: OBIX_BUILD_CATALOG (CSV) หรือ data/tuned_builds.csv
+# ไม่มีไฟล์ -> ใช้ PRESETS + BASELINE_CTRL เป็น catalog เริ่มต้น
+#
+# usage:
+#   python -m logic.similar --size 5 --weight 750 --battery 4S -k 3
+#   python -m logic.similar --catalog builds.csv --size 7 --weight 1100 --prop-size 7 --pitch 3.5 --blades 2
+
+import argparse
+import csv
+import json
+import math
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from logic.inputs import battery_cells
+from logic.presets import BASELINE_CTRL, PRESETS
+
+DEFAULT_CATALOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "tuned_builds.csv")
+
+FEATURES = ("size", "weight", "prop_size", "pitch", "blades", "cells")
+PID_COLUMNS = ("roll_p", "roll_i", "roll_d", "pitch_p", "pitch_i", "pitch_d", "yaw_p", "yaw_i", "yaw_d")
+FILTER_COLUMNS = ("gyro_lpf2", "dterm_lpf1", "dyn_notch")
+
+CATALOG_COLUMNS = ("name", "size", "weight", "prop_size", "pitch", "blades", "battery") + PID_COLUMNS + FILTER_COLUMNS
+
+# column name -> values (CSV strings or numbers), all the same length; None = column absent
+Columns = Dict[str, Optional[Sequence[Any]]]
+
+# catalogs up to this many builds are scanned with a plain loop instead of the tree
+BRUTE_FORCE_MAX = 64
+
+
+def _cells(battery: Any) -> float:
+    # feature value: unknown pack -> nan (placed at the catalog mean / row skipped)
+    cells = battery_cells(battery)
+    return float("nan") if cells is None else float(cells)
+
+
+# -----------------------
+# KD-tree (static, rebuilt as a whole)
+# -----------------------
+class KDTree:
+    """
+    Balanced median-split KD-tree stored level by level: level l holds 2**l
+    bounding boxes, node i splits into 2i / 2i + 1, and points are reordered
+    so each leaf bucket is a contiguous slice. Queries descend one whole
+    level per numpy pass (prune by box distance against an upper bound on
+    the k-th distance), then scan the surviving leaves nearest-first.
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 32, stride: int = 3):
+        self.stride = stride
+        points = np.ascontiguousarray(points, dtype=np.float64)
+        n, d = points.shape
+        depth = max(0, int(np.ceil(np.log2(max(n, 1) / leaf_size))))
+        order = np.arange(n)
+        bounds = [0, n]  # leaf boundaries at the current level
+        # split_dim[l][i] / split_val[l][i]: node i of level l sends q[dim] < val left
+        self.split_dim: List[List[int]] = []
+        self.split_val: List[List[float]] = []
+        for _ in range(depth):
+            # extents of every node on this level in one reduceat pass (nodes tile [0, n))
+            edges = np.array(bounds)
+            starts = edges[:-1][edges[:-1] < edges[1:]]
+            pts = points[order]
+            extent = np.maximum.reduceat(pts, starts, axis=0) - np.minimum.reduceat(pts, starts, axis=0)
+            widest = dict(zip(starts.tolist(), np.argmax(extent, axis=1).tolist()))
+            nxt = [0]
+            dims: List[int] = []
+            vals: List[float] = []
+            for s, e in zip(bounds[:-1], bounds[1:]):
+                mid = (s + e) // 2
+                dim, val = 0, float("inf")
+                if e - s > 1:
+                    dim = widest[s]
+                    seg = order[s:e]
+                    part = np.argpartition(points[seg, dim], mid - s)
+                    order[s:e] = seg[part]
+                    val = float(points[order[mid], dim])
+                dims.append(dim)
+                vals.append(val)
+                nxt.extend((mid, e))
+            bounds = nxt
+            self.split_dim.append(dims)
+            self.split_val.append(vals)
+
+        self.points = points[order]
+        self.index = order
+        self.leaf_size = leaf_size
+        self.depth = depth
+        edges = np.array(bounds, dtype=np.int64)
+        self.start, self.end = edges[:-1], edges[1:]
+        count = self.end - self.start
+        lo = np.full((len(count), d), np.inf)
+        hi = np.full((len(count), d), -np.inf)
+        filled = np.flatnonzero(count)
+        if len(filled):
+            lo[filled] = np.minimum.reduceat(self.points, self.start[filled], axis=0)
+            hi[filled] = np.maximum.reduceat(self.points, self.start[filled], axis=0)
+        # levels[l] = (lo, hi) boxes of the 2**l nodes at depth l
+        self.levels = [(lo, hi)]
+        for _ in range(depth):
+            lo = np.minimum(lo[0::2], lo[1::2])
+            hi = np.maximum(hi[0::2], hi[1::2])
+            self.levels.append((lo, hi))
+        self.levels.reverse()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _home(self, q: List[float]) -> int:
+        """Leaf whose cell contains q (plain descent along the split planes)."""
+        node = 0
+        for dims, vals in zip(self.split_dim, self.split_val):
+            node = 2 * node + (q[dims[node]] >= vals[node])
+        return node
+
+    def query(self, q: np.ndarray, k: int, top: int = 6) -> Tuple[np.ndarray, np.ndarray]:
+        """(squared distances, point ids) of the k nearest points, nearest first."""
+        if not len(self.index) or k <= 0:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        # initial bound: k-th distance within the smallest subtree around q's own leaf that holds >= k points
+        leaf, span = self._home(q.tolist()), 1
+        while span < len(self.start) and self.end[leaf + span - 1] - self.start[leaf] < max(k, 16 * self.leaf_size):
+            span *= 2
+            leaf -= leaf % span
+        rows = np.arange(self.start[leaf], self.end[leaf + span - 1])
+        diff = self.points[rows] - q
+        home = np.einsum("ij,ij->i", diff, diff)
+        bound = float(np.partition(home, k - 1)[k - 1]) if len(home) >= k else np.inf
+
+        # empty nodes have lo=+inf / hi=-inf, i.e. an infinite box distance
+        level = min(top, self.depth)
+        nodes = np.arange(2 ** level)
+        while True:
+            lo, hi = self.levels[level]
+            gap = np.maximum(np.maximum(lo[nodes] - q, q - hi[nodes]), 0.0)
+            near = np.einsum("ij,ij->i", gap, gap)
+            keep = near <= bound
+            nodes, near = nodes[keep], near[keep]
+            if level == self.depth:
+                break
+            # descend `stride` levels per pass: fewer passes, a little less pruning
+            stride = min(self.stride, self.depth - level)
+            nodes = ((nodes << stride)[:, None] + np.arange(1 << stride)).ravel()
+            level += stride
+
+        # leaves nearest-first, a few at a time, until the next box is beyond the k-th distance
+        ranked = nodes[np.argsort(near, kind="stable")]
+        near = np.sort(near, kind="stable")
+        # the home subtree is already scanned
+        fresh = (ranked < leaf) | (ranked >= leaf + span)
+        ranked, near = ranked[fresh], near[fresh]
+        best_d, best_r, kth = home, rows, bound
+        pos, step = 0, 8
+        while pos < len(ranked) and near[pos] <= kth:
+            chunk = ranked[pos:pos + step]
+            chunk = chunk[near[pos:pos + step] <= kth]
+            lengths = self.end[chunk] - self.start[chunk]
+            rows = np.repeat(self.start[chunk] - np.cumsum(lengths) + lengths, lengths) + np.arange(int(lengths.sum()))
+            diff = self.points[rows] - q
+            best_d = np.concatenate((best_d, np.einsum("ij,ij->i", diff, diff)))
+            best_r = np.concatenate((best_r, rows))
+            if len(best_d) >= k:
+                kth = float(np.partition(best_d, k - 1)[k - 1])
+            pos += step
+            step *= 2
+        # keep everything tied with the k-th so the id tie-break below is exact
+        keep = best_d <= kth
+        best_d, best_r = best_d[keep], best_r[keep]
+        ids = self.index[best_r]
+        # ties broken by id so results do not depend on tree shape
+        order = np.lexsort((ids, best_d))[:k]
+        return best_d[order], ids[order]
+
+
+# -----------------------
+# catalog loading
+# -----------------------
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _float_column(values: Optional[Sequence[Any]], n: int) -> np.ndarray:
+    # blank / absent -> nan; one bad cell only costs the per-value fallback, not the whole file
+    if values is None:
+        return np.full(n, np.nan)
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return np.array(["nan" if v is None or v == "" else v for v in values], dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([_number(v) for v in values], dtype=np.float64)
+
+
+def seed_catalog() -> List[Dict[str, Any]]:
+    """PRESETS joined with BASELINE_CTRL of their class (same PID shape as pid_baseline)."""
+    rows = []
+    for key, p in PRESETS.items():
+        baseline = BASELINE_CTRL.get(p.get("class", ""), {})
+        pid = baseline.get("pid", {})
+        flt = baseline.get("filter", {})
+        P, I, D = pid.get("P", 0), pid.get("I", 0), pid.get("D", 0)
+        rows.append({
+            "name": key, "size": p["size"], "weight": p["weight"], "prop_size": p["prop_size"],
+            "pitch": p["pitch"], "blades": p["blades"], "battery": p["battery"],
+            "roll_p": P, "roll_i": I, "roll_d": D, "pitch_p": P, "pitch_i": I, "pitch_d": D,
+            "yaw_p": int(P * 0.6) if P else 0, "yaw_i": int(I * 0.6) if I else 0, "yaw_d": 0,
+            "gyro_lpf2": flt.get("gyro_cutoff"), "dterm_lpf1": flt.get("dterm_lowpass"), "dyn_notch": flt.get("notch"),
+        })
+    return rows
+
+
+def rows_to_columns(builds: Iterable[Dict[str, Any]]) -> Columns:
+    builds = list(builds)
+    return {c: [b.get(c) for b in builds] for c in CATALOG_COLUMNS}
+
+
+def read_catalog(path: str) -> Columns:
+    """
+    Columns of a tuned-build CSV. Header names: name, size, weight, prop_size,
+    pitch, blades, battery, roll_p .. yaw_d, gyro_lpf2, dterm_lpf1, dyn_notch
+    (any order; PID / filter columns may be missing or blank).
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = [h.strip().lower() for h in next(reader, [])]
+        width = len(header)
+        table = list(zip(*(row + [""] * (width - len(row)) for row in reader if row)))
+    found = {h: col for h, col in zip(header, table)}
+    return {c: found.get(c) for c in CATALOG_COLUMNS}
+
+
+# -----------------------
+# index over the catalog
+# -----------------------
+class BuildIndex:
+    """
+    k-NN over tuned builds. add() goes to a delta buffer that is scanned by
+    brute force; once it holds rebuild_at builds the tree is rebuilt over
+    everything. Queries read an immutable (tree, delta) snapshot; the tree
+    is rebuilt outside the lock so a rebuild does not stall them.
+    Up to brute_force_max builds there is no tree: every add() rebuilds the
+    scaled rows (or the tree, once past the limit) and queries scan them in
+    plain Python.
+    """
+
+    def __init__(self, catalog: Optional[Columns] = None, leaf_size: int = 32,
+                 rebuild_at: int = 4096, source: str = "memory", brute_force_max: int = BRUTE_FORCE_MAX):
+        self.leaf_size = leaf_size
+        self.rebuild_at = rebuild_at
+        self.brute_force_max = brute_force_max
+        self.source = source
+        self._lock = threading.Lock()
+        self._names: List[str] = []
+        self._n = 0
+        self._features = np.empty((0, len(FEATURES)))
+        self._pid = np.empty((0, len(PID_COLUMNS)))
+        self._filter = np.empty((0, len(FILTER_COLUMNS)))
+        self._scale = np.ones(len(FEATURES))
+        self._mean = np.zeros(len(FEATURES))
+        self._tree: Optional[KDTree] = None
+        # small catalogs: scaled feature rows + mean / scale as plain floats (no tree)
+        self._rows: Optional[Tuple[Tuple[float, ...], ...]] = None
+        self._mean_list: List[float] = []
+        self._scale_list: List[float] = []
+        self._described: Dict[int, Dict[str, Any]] = {}
+        self._delta: np.ndarray = np.empty(0, dtype=np.int64)  # ids not in the tree yet
+        self._rebuilding = False
+        self.skipped = 0
+        self.rebuilds = 0
+        if catalog is not None:
+            self._append(catalog)
+        self.rebuild()
+
+    @classmethod
+    def from_env(cls) -> "BuildIndex":
+        """OBIX_BUILD_CATALOG (default data/tuned_builds.csv); presets when the file is missing/unreadable."""
+        path = os.environ.get("OBIX_BUILD_CATALOG") or DEFAULT_CATALOG
+        if os.path.exists(path):
+            try:
+                return cls(read_catalog(path), source=path)
+            except (OSError, ValueError, csv.Error):
+                pass
+        return cls(rows_to_columns(seed_catalog()), source="presets")
+
+    def __len__(self) -> int:
+        return self._n
+
+    # -----------------------
+    # building
+    # -----------------------
+    def _append(self, cols: Columns) -> np.ndarray:
+        n = max((len(v) for v in cols.values() if v is not None), default=0)
+        cells_of: Dict[Any, float] = {}
+        cells = np.array([
+            cells_of[b] if b in cells_of else cells_of.setdefault(b, _cells(b)) for b in cols["battery"] or [None] * n
+        ], dtype=np.float64)
+        feats = np.column_stack([_float_column(cols[f], n) for f in FEATURES[:-1]] + [cells]).reshape(-1, len(FEATURES))
+        ok = ~np.isnan(feats).any(axis=1)
+        self.skipped += int(len(ok) - ok.sum())
+        if not ok.any():
+            return np.empty(0, dtype=np.int64)
+        first = self._n
+        rows = np.flatnonzero(ok)
+        raw_names = cols["name"] or [None] * n
+        last = first + len(rows)
+        if last > len(self._features):
+            # grow by doubling: readers keep the old arrays, only rows < their snapshot count are read
+            cap = max(last, 2 * len(self._features), 64)
+            self._features, self._pid, self._filter = (
+                np.concatenate((a[:first], np.empty((cap - first, a.shape[1])))) for a in (self._features, self._pid, self._filter)
+            )
+        self._features[first:last] = feats[rows]
+        self._pid[first:last] = np.column_stack([_float_column(cols[c], n) for c in PID_COLUMNS])[rows]
+        self._filter[first:last] = np.column_stack([_float_column(cols[c], n) for c in FILTER_COLUMNS])[rows]
+        self._names.extend(str(raw_names[i] or f"build-{first + j + 1}") for j, i in enumerate(rows.tolist()))
+        self._n = last
+        return np.arange(first, last)
+
+    def rebuild(self) -> None:
+        """Fold the delta buffer into a fresh tree (and refresh the feature scaling)."""
+        with self._lock:
+            n = self._n
+            feats = self._features[:n]
+            self._rebuilding = True
+        mean, scale = self._mean, self._scale
+        if n:
+            mean = feats.mean(axis=0)
+            std = feats.std(axis=0)
+            scale = np.where(std > 1e-9, std, 1.0)
+        # built outside the lock: queries keep using the old snapshot meanwhile
+        scaled = (feats - mean) / scale
+        tree = rows = None
+        if n > self.brute_force_max:
+            tree = KDTree(scaled, self.leaf_size)
+        else:
+            rows = tuple(map(tuple, scaled.tolist()))
+        with self._lock:
+            self._tree, self._rows, self._mean, self._scale = tree, rows, mean, scale
+            self._mean_list, self._scale_list = mean.tolist(), scale.tolist()
+            # builds added while the tree was being built stay in the delta
+            self._delta = self._delta[self._delta >= n]
+            self._rebuilding = False
+            self.rebuilds += 1
+
+    def add(self, builds: Iterable[Dict[str, Any]]) -> int:
+        """Append builds; they are searchable immediately. Returns how many were accepted."""
+        with self._lock:
+            ids = self._append(rows_to_columns(builds))
+            self._delta = np.concatenate((self._delta, ids))
+            full = (len(self._delta) >= self.rebuild_at or self._tree is None) and not self._rebuilding
+            if full:
+                self._rebuilding = True
+        if full:
+            self.rebuild()
+        return len(ids)
+
+    # -----------------------
+    # queries
+    # -----------------------
+    def _point(self, size: Any, weight: Any, prop_size: Any, pitch: Any, blades: Any, battery: Any,
+               mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+        raw = np.array([_number(size), _number(weight), _number(prop_size), _number(pitch), _number(blades),
+                        _cells(battery)])
+        # unknown field (e.g. battery "other"): put it at the catalog mean so it does not pull results
+        raw = np.where(np.isnan(raw), mean, raw)
+        return (raw - mean) / scale
+
+    def query(self, size: Any, weight: Any, prop_size: Any, pitch: Any, blades: Any, battery: Any,
+              k: int = 3) -> List[Tuple[float, int]]:
+        """[(distance, build id)] of the k nearest builds, nearest first."""
+        with self._lock:
+            tree, delta, mean, scale = self._tree, self._delta, self._mean, self._scale
+            feats, rows = self._features, self._rows
+            mean_list, scale_list = self._mean_list, self._scale_list
+        if rows is not None and k > 0:
+            raw = (_number(size), _number(weight), _number(prop_size), _number(pitch), _number(blades),
+                   _cells(battery))
+            q = [((m if v != v else v) - m) / s for v, m, s in zip(raw, mean_list, scale_list)]
+            ids: Sequence[int] = range(len(rows))
+            if len(delta):
+                # builds added while the rows were being rebuilt (scaled like the tree path's delta)
+                rows = rows + tuple(map(tuple, ((feats[delta] - mean) / scale).tolist()))
+                ids = list(ids) + delta.tolist()
+            return _scan(rows, ids, q, k)
+        if tree is None or k <= 0:
+            return []
+        q = self._point(size, weight, prop_size, pitch, blades, battery, mean, scale)
+        d2, ids = tree.query(q, k)
+        if len(delta):
+            diff = (feats[delta] - mean) / scale - q
+            d2 = np.concatenate((d2, np.einsum("ij,ij->i", diff, diff)))
+            ids = np.concatenate((ids, delta))
+            order = np.lexsort((ids, d2))[:k]
+            d2, ids = d2[order], ids[order]
+        return list(zip(np.sqrt(d2).tolist(), ids.tolist()))
+
+    def describe(self, build_id: int, distance: float) -> Dict[str, Any]:
+        # catalog rows never change once added: the rest of the entry is built once per id (shared, read-only)
+        entry = self._described.get(build_id)
+        if entry is None:
+            entry = self._described[build_id] = self._entry(build_id)
+        out = {"name": entry["name"], "distance": round(distance, 3)}
+        out.update(entry)
+        return out
+
+    def _entry(self, build_id: int) -> Dict[str, Any]:
+        f = self._features[build_id].tolist()
+        pid = [_plain(v) for v in self._pid[build_id].tolist()]
+        flt = [_plain(v) for v in self._filter[build_id].tolist()]
+        return {
+            "name": self._names[build_id],
+            "size": f[0], "weight": f[1], "prop_size": f[2], "pitch": f[3], "blades": int(f[4]),
+            "battery": f"{int(f[5])}S",
+            "pid": {
+                "roll": {"p": pid[0], "i": pid[1], "d": pid[2]},
+                "pitch": {"p": pid[3], "i": pid[4], "d": pid[5]},
+                "yaw": {"p": pid[6], "i": pid[7], "d": pid[8]},
+            },
+            "filter": {"gyro_lpf2": flt[0], "dterm_lpf1": flt[1], "dyn_notch": flt[2]},
+        }
+
+    def similar(self, size: Any, weight: Any, prop_size: Any, pitch: Any, blades: Any, battery: Any,
+                k: int = 3) -> List[Dict[str, Any]]:
+        return [self.describe(i, d) for d, i in self.query(size, weight, prop_size, pitch, blades, battery, k)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tree, delta = self._tree, self._delta
+        return {
+            "source": self.source,
+            "builds": len(self),
+            "search": "tree" if tree is not None else "scan",
+            "in_tree": len(tree) if tree is not None else 0,
+            "delta": len(delta),
+            "rebuild_at": self.rebuild_at,
+            "rebuilds": self.rebuilds,
+            "skipped": self.skipped,
+        }
+
+
+def _scan(rows: Sequence[Sequence[float]], ids: Sequence[int], q: Sequence[float], k: int) -> List[Tuple[float, int]]:
+    """Brute-force k-NN over a few scaled rows; same (distance, id) order as the tree."""
+    best = []
+    for row, i in zip(rows, ids):
+        d2 = 0.0
+        for a, b in zip(row, q):
+            d2 += (a - b) * (a - b)
+        best.append((d2, i))
+    best.sort()
+    return [(math.sqrt(d2), i) for d2, i in best[:k]]
+
+
+def _plain(value: float) -> Any:
+    # catalog numbers back to what a human wrote: 42.0 -> 42, blank -> None
+    if value != value:
+        return None
+    return int(value) if value.is_integer() else value
+
+
+# -----------------------
+# CLI
+# -----------------------
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Closest known-good tuned builds")
+    ap.add_argument("--catalog", help="tuned-build CSV (default: OBIX_BUILD_CATALOG / data/tuned_builds.csv / presets)")
+    ap.add_argument("--size", type=float, required=True)
+    ap.add_argument("--weight", type=float, required=True)
+    ap.add_argument("--prop-size", type=float)
+    ap.add_argument("--pitch", type=float, default=4.0)
+    ap.add_argument("--blades", type=int, default=3)
+    ap.add_argument("--battery", default="4S")
+    ap.add_argument("-k", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    index = BuildIndex(read_catalog(args.catalog), source=args.catalog) if args.catalog else BuildIndex.from_env()
+    prop = args.prop_size if args.prop_size is not None else args.size
+    out = {
+        "catalog": index.stats(),
+        "similar": index.similar(args.size, args.weight, prop, args.pitch, args.blades, args.battery, args.k),
+    }
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+# logic/stages.py
+# OBIXConfig Doctor - analysis pipeline as a dependency graph of memoized stages
+#
+# แต่ละ stage ประกาศ input (field ของ build หรือชื่อ stage ก่อนหน้า) และ key ที่มันเขียนลง analysis
+# ผลของ stage ถูก memo ตามค่า field ที่มันขึ้นกับจริง (รวมทางอ้อมผ่าน stage อื่น)
+# เปลี่ยน pitch -> คำนวณใหม่เฉพาะ stage ที่ขึ้นกับ pitch ที่เหลือมาจาก memo
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+Fragment = Dict[str, Any]
+
+# keys that several stages append to instead of overwrite
+APPEND_KEYS = frozenset({"extra_tips"})
+
+
+class Stage(NamedTuple):
+    name: str
+    inputs: Tuple[str, ...]   # build fields and/or earlier stage names (passed positionally)
+    outputs: Tuple[str, ...]  # analysis keys this stage writes
+    fn: Callable[..., Fragment]
+
+
+def merge_fragments(fragments: Iterable[Fragment]) -> Fragment:
+    """Combine stage fragments in order; later stages overwrite, APPEND_KEYS concatenate."""
+    analysis: Fragment = {}
+    for frag in fragments:
+        for key, value in frag.items():
+            if key in APPEND_KEYS:
+                analysis[key] = analysis.get(key, []) + list(value)
+            else:
+                analysis[key] = value
+    return analysis
+
+
+class StageGraph:
+    """
+    Stages must be listed in dependency order. Memo entries are keyed on the
+    transitive build fields of each stage, so memoized fragments are shared
+    between requests and must be treated as read-only.
+    """
+
+    def __init__(self, fields: Sequence[str], stages: Sequence[Stage], memo_size: int = 512,
+                 observe: Optional[Callable[[str, float], None]] = None):
+        self.fields = tuple(fields)
+        self.stages: Dict[str, Stage] = OrderedDict()
+        self.depends_on: Dict[str, Tuple[str, ...]] = {}
+        for stage in stages:
+            if stage.name in self.fields or stage.name in self.stages:
+                raise ValueError(f"stage name {stage.name!r} clashes with a field or another stage")
+            deps: List[str] = []
+            for name in stage.inputs:
+                if name in self.stages:
+                    deps.extend(self.depends_on[name])
+                elif name in self.fields:
+                    deps.append(name)
+                else:
+                    raise ValueError(f"stage {stage.name!r}: unknown input {name!r}")
+            # keep build-field order so memo keys are stable
+            self.depends_on[stage.name] = tuple(f for f in self.fields if f in deps)
+            self.stages[stage.name] = stage
+        self.memo_size = memo_size
+        self.observe = observe
+        self._memo: Dict[str, "OrderedDict[Tuple[Any, ...], Fragment]"] = {name: OrderedDict() for name in self.stages}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # -----------------------
+    # dependency queries
+    # -----------------------
+    def affected(self, changed: Iterable[str]) -> List[str]:
+        """Stages whose (transitive) inputs include any changed field, in graph order."""
+        changed = frozenset(changed)
+        unknown = changed - frozenset(self.fields)
+        if unknown:
+            raise ValueError(f"unknown field(s): {', '.join(sorted(map(repr, unknown)))}")
+        return [name for name, deps in self.depends_on.items() if changed.intersection(deps)]
+
+    def producers(self, keys: FrozenSet[str]) -> List[str]:
+        return [name for name, stage in self.stages.items() if keys.intersection(stage.outputs)]
+
+    # -----------------------
+    # evaluation
+    # -----------------------
+    def _eval(self, name: str, build: Dict[str, Any], done: Dict[str, Fragment]) -> Fragment:
+        frag = done.get(name)
+        if frag is not None:
+            return frag
+        stage = self.stages[name]
+        key = tuple(build[f] for f in self.depends_on[name])
+        memo = self._memo[name]
+        with self._lock:
+            frag = memo.get(key)
+            if frag is not None:
+                memo.move_to_end(key)
+                self.hits += 1
+        if frag is None:
+            args = [self._eval(i, build, done) if i in self.stages else build[i] for i in stage.inputs]
+            t0 = time.perf_counter()
+            frag = stage.fn(*args)
+            if self.observe is not None:
+                self.observe(name, t0)
+            with self._lock:
+                self.misses += 1
+                if self.memo_size > 0:
+                    memo[key] = frag
+                    if len(memo) > self.memo_size:
+                        memo.popitem(last=False)
+        done[name] = frag
+        return frag
+
+    def run(self, build: Dict[str, Any], stages: Optional[Iterable[str]] = None) -> Dict[str, Fragment]:
+        """Fragments for the requested stages (default: all), dependencies pulled in as needed."""
+        done: Dict[str, Fragment] = {}
+        wanted = list(self.stages) if stages is None else list(stages)
+        for name in wanted:
+            self._eval(name, build, done)
+        return {name: done[name] for name in self.stages if name in done and name in wanted}
+
+    def analyze(self, build: Dict[str, Any]) -> Fragment:
+        return merge_fragments(self.run(build).values())
+
+    def delta(self, build: Dict[str, Any], changed: Optional[Iterable[str]]) -> Dict[str, Any]:
+        """
+        Patch for a client that already holds the analysis of the previous
+        inputs: only keys written by stages affected by `changed`. Stages that
+        share an output key with an affected stage are evaluated too (memo hits
+        in practice) so merged keys like extra_tips come out complete.
+        """
+        affected = list(self.stages) if not changed else self.affected(changed)
+        keys = frozenset(k for name in affected for k in self.stages[name].outputs)
+        fragments = self.run(build, self.producers(keys))
+        merged = merge_fragments(fragments.values())
+        return {
+            "stages": affected,
+            "patch": {k: v for k, v in merged.items() if k in keys},
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            for memo in self._memo.values():
+                memo.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": {name: len(memo) for name, memo in self._memo.items()},
+                "inputs": {name: list(deps) for name, deps in self.depends_on.items()},
+            }
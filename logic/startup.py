@@ -0,0 +1,153 @@
+# logic/startup.py
+# OBIXConfig Doctor - cold start: template precompile, Jinja bytecode cache, boot timing
+#
+# Render พัก instance ที่ว่าง -> เวลาตั้งแต่ process เริ่มจนตอบ byte แรกคือสิ่งที่ผู้ใช้รอจริง
+#   - Jinja bytecode cache บนดิสก์ (OBIX_JINJA_CACHE, default .cache/jinja) : template ไม่ต้อง compile ใหม่ทุก boot
+#   - precompile_templates() : compile ทุก template ตอน boot แทน request แรก
+#   - freeze_heap() : gc.freeze() ใน gunicorn master (preload) ก่อน fork -> worker แชร์ page แบบ copy-on-write
+#   - BootTimer : เวลาแต่ละช่วงนับจาก OBIX_BOOT_T0 (gunicorn.conf.py ตั้งให้) หรือเวลาเริ่ม process
+#
+#   python -m logic.startup      # build step: import app (เติม bytecode cache) + พิมพ์เวลา
+
+import gc
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from jinja2 import Environment, FileSystemBytecodeCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_JINJA_CACHE = os.path.join(ROOT, ".cache", "jinja")
+
+
+# -----------------------
+# boot timing
+# -----------------------
+def process_start_time() -> float:
+    """Wall-clock start of this process (Linux /proc), else now."""
+    try:
+        with open("/proc/self/stat", encoding="ascii") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])  # field 22 (starttime), counted after "pid (comm)"
+        with open("/proc/uptime", encoding="ascii") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+def boot_t0() -> float:
+    """OBIX_BOOT_T0 (set once by gunicorn.conf.py, inherited by workers) or this process' start."""
+    try:
+        return float(os.environ["OBIX_BOOT_T0"])
+    except (KeyError, ValueError):
+        return process_start_time()
+
+
+class BootTimer:
+    """
+    Seconds since boot per phase ("import", "warm", "ready", "first_response").
+    Phases are kept per process; a forked worker starts with the master's
+    phases and adds its own (the master never serves, so first_response is
+    always the worker's).
+    """
+
+    def __init__(self, t0: Optional[float] = None):
+        self.t0 = boot_t0() if t0 is None else t0
+        self.phases: Dict[str, float] = {}
+        self.templates: List[Tuple[str, float]] = []
+        self.responded = False
+
+    def mark(self, phase: str) -> float:
+        elapsed = time.time() - self.t0
+        self.phases[phase] = elapsed
+        return elapsed
+
+    def first_response(self) -> Optional[float]:
+        """Mark "first_response"; None after the first call."""
+        if self.responded:
+            return None
+        self.responded = True
+        return self.mark("first_response")
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "boot_t0": self.t0,
+            "pid": os.getpid(),
+            "phases_ms": {phase: round(s * 1000, 1) for phase, s in self.phases.items()},
+            "templates_ms": dict(self.templates),
+        }
+
+    def format(self) -> str:
+        return " ".join(f"{phase}={s * 1000:.0f}ms" for phase, s in self.phases.items())
+
+
+# -----------------------
+# templates
+# -----------------------
+class SafeBytecodeCache(FileSystemBytecodeCache):
+    """FileSystemBytecodeCache that falls back to compiling when the directory is read-only / gone."""
+
+    def load_bytecode(self, bucket: Any) -> None:
+        try:
+            super().load_bytecode(bucket)
+        except OSError:
+            pass
+
+    def dump_bytecode(self, bucket: Any) -> None:
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+
+def bytecode_cache_from_env() -> Optional[SafeBytecodeCache]:
+    """OBIX_JINJA_CACHE directory (default .cache/jinja); "off" disables."""
+    directory = os.environ.get("OBIX_JINJA_CACHE", DEFAULT_JINJA_CACHE)
+    if not directory or directory.lower() == "off":
+        return None
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        return None
+    return SafeBytecodeCache(directory)
+
+
+def precompile_templates(env: Environment) -> List[Tuple[str, float]]:
+    """Load every template once (compiled or from the bytecode cache) -> [(name, ms)]."""
+    out = []
+    for name in env.list_templates():
+        t0 = time.perf_counter()
+        env.get_template(name)
+        out.append((name, round((time.perf_counter() - t0) * 1000, 2)))
+    return out
+
+
+# -----------------------
+# copy-on-write friendly heap
+# -----------------------
+def freeze_heap() -> int:
+    """
+    Collect, then move every live object to the permanent generation so the
+    cyclic GC in forked workers never writes to (and un-shares) their pages.
+    Returns the number of frozen objects.
+    """
+    gc.collect()
+    gc.freeze()
+    return gc.get_freeze_count()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    # build step (Render: build command) -> bytecode cache ready before the first boot
+    sys.path.insert(0, ROOT)
+    import app as web
+
+    for name, ms in web.BOOT.templates:
+        print(f"{name:<24} {ms:>8.2f} ms")
+    print(f"boot: {web.BOOT.format()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
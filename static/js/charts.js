@@ -0,0 +1,40 @@
+// static/js/charts.js
+// result charts on /app; values come from data-* attributes rendered by the template
+
+function chartValues(canvas, names) {
+  return names.map(name => Number(canvas.dataset[name]));
+}
+
+const thrustCanvas = document.getElementById('thrustChart');
+if (thrustCanvas && window.Chart) {
+  new Chart(thrustCanvas.getContext('2d'), {
+    type: 'bar',
+    data: {
+        labels: ['Thrust-to-Weight'],
+        datasets: [{
+            label: 'Ratio',
+            data: chartValues(thrustCanvas, ['ratio']),
+            backgroundColor: ['rgba(54, 162, 235, 0.6)']
+        }]
+    },
+    options: { scales: { y: { beginAtZero: true } } }
+  });
+}
+
+const noiseCanvas = document.getElementById('noiseChart');
+if (noiseCanvas && window.Chart) {
+  new Chart(noiseCanvas.getContext('2d'), {
+    type: 'line',
+    data: {
+        labels: ['Motor Load', 'Noise Level'],
+        datasets: [{
+            label: 'Effect',
+            data: chartValues(noiseCanvas, ['motorLoad', 'noise']),
+            fill: false,
+            borderColor: 'rgb(255, 99, 132)',
+            tension: 0.3
+        }]
+    },
+    options: { scales: { y: { beginAtZero: true } } }
+  });
+}
@@ -0,0 +1,196 @@
+// static/js/index.js
+// /app page behaviour (loaded with defer: runs after the DOM is parsed)
+
+function copyText(id) {
+    const text = document.getElementById(id).innerText;
+    navigator.clipboard.writeText(text);
+    alert("คัดลอกไปใช้ใน Betaflight ได้แล้ว");
+}
+
+// Dark/Light toggle
+function toggleTheme() {
+    document.body.classList.toggle('dark');
+    document.body.classList.toggle('light');
+    localStorage.setItem('theme', document.body.classList.contains('dark') ? 'dark' : 'light');
+}
+
+window.onload = () => {
+    const savedTheme = localStorage.getItem('theme') || 'light';
+    document.body.classList.add(savedTheme);
+}
+
+function toggleConcept() {
+  const box = document.querySelector('.concept-box');
+  box.classList.toggle('open');
+}
+
+const presets = {
+  beginner: `
+# OBIXConfig Lab - Beginner Preset
+set throttle_limit_percent = 85
+set dshot_bidir = OFF
+set iterm_relax = RP
+set feedforward_transition = 0
+set anti_gravity_gain = 3
+save
+`,
+
+  freestyle: `
+# OBIXConfig Lab - Freestyle Preset
+set throttle_limit_percent = 100
+set iterm_relax = RPY
+set feedforward_transition = 0.5
+set anti_gravity_gain = 5
+save
+`,
+
+  longrange: `
+# OBIXConfig Lab - Long Range Preset
+set throttle_limit_percent = 80
+set iterm_relax = OFF
+set feedforward_transition = 0
+set anti_gravity_gain = 2
+save
+`
+};
+
+function showPreset(type) {
+  document.getElementById("cliOutput").textContent = presets[type];
+}
+
+function copyCLI() {
+  const text = document.getElementById("cliOutput").textContent;
+  navigator.clipboard.writeText(text).then(() => {
+    alert("คัดลอก CLI เรียบร้อยแล้ว 🚀");
+  });
+}
+
+// OBIX Preset autofill
+const presetMap = {
+  "2.5_micro": {size:2.5, weight:80, battery:"2S", prop_size:2.5, pitch:2.0, blades:"2", style:"micro"},
+  "3_whoop":   {size:3.0, weight:120, battery:"2S", prop_size:3.0, pitch:2.0, blades:"2", style:"whoop"},
+  "3.5_cine":  {size:3.5, weight:350, battery:"4S", prop_size:3.5, pitch:2.5, blades:"2", style:"cine"},
+  "4_mini":    {size:4.0, weight:420, battery:"4S", prop_size:4.0, pitch:3.0, blades:"2", style:"mini"},
+  "5_freestyle":{size:5.0, weight:750, battery:"4S", prop_size:5.0, pitch:4.0, blades:"3", style:"freestyle"},
+  "6_heavy5":  {size:6.0, weight:1000, battery:"4S", prop_size:6.0, pitch:4.0, blades:"3", style:"heavy"},
+  "7_midlr":   {size:7.0, weight:1100, battery:"4S", prop_size:7.0, pitch:3.5, blades:"2", style:"longrange"},
+  "7.5_midlr": {size:7.5, weight:1200, battery:"4S", prop_size:7.5, pitch:3.0, blades:"2", style:"longrange"},
+  "8_lr":      {size:8.0, weight:1500, battery:"6S", prop_size:8.0, pitch:3.5, blades:"2", style:"longrange"},
+  "10_lr":     {size:10.0, weight:2200, battery:"6S", prop_size:10.0, pitch:4.5, blades:"2", style:"longrange"}
+};
+
+// helper: set value if element exists
+function setIfExists(selector, value) {
+  const el = document.querySelector(selector);
+  if (!el) return false;
+  if (el.tagName === 'SELECT' || el.type === 'select-one') {
+    el.value = value;
+    el.dispatchEvent(new Event('change', { bubbles: true }));
+  } else {
+    el.value = value;
+  }
+  return true;
+}
+
+const presetSelect = document.getElementById('preset-select');
+if (presetSelect) {
+  presetSelect.addEventListener('change', function () {
+    const key = this.value;
+    if (!key) return;
+    const p = presetMap[key];
+    if (!p) return;
+
+    // fill fields (matches names in your form)
+    setIfExists('input[name="size"]', p.size);
+    setIfExists('input[name="weight"]', p.weight);
+    setIfExists('select[name="battery"]', p.battery);
+    setIfExists('input[name="prop_size"]', p.prop_size);
+    setIfExists('input[name="pitch"]', p.pitch);
+    setIfExists('select[name="blades"]', p.blades);
+    // style may be select or input; try both
+    setIfExists('select[name="style"]', p.style);
+    setIfExists('input[name="style"]', p.style);
+  });
+}
+
+function el(id){ return document.getElementById(id); }
+
+function buildBaselineCLI() {
+  const lines = [];
+  lines.push("# OBIXConfig Lab - Baseline (class-based)");
+  lines.push("# NOTE: This output contains numeric baseline values. Map them to your Betaflight parameters (check version).");
+  lines.push("");
+
+  const pidText = el("pid-baseline") ? el("pid-baseline").innerText.trim() : "";
+  if (pidText) {
+    lines.push("# PID (baseline)");
+    pidText.split('\n').forEach(l => lines.push(l.trim()));
+    lines.push("");
+  }
+
+  const filterEl = el("filter-baseline");
+  if (filterEl) {
+    lines.push("# Filter (baseline)");
+    filterEl.innerText.trim().split('\n').forEach(l => lines.push(l.trim()));
+    lines.push("");
+  }
+
+  lines.push("# Suggested mapping example (manual):");
+  lines.push("# - Roll P/I/D  -> map to PID slots for Roll in Betaflight (e.g. set pid_roll = <P> etc.)");
+  lines.push("# - Pitch P/I/D -> map to Pitch");
+  lines.push("# - Yaw P/I     -> map to Yaw (D often 0 for yaw)");
+  lines.push("# - Filters: set gyro_lpf2, dterm_lpf1 according to your Betaflight version");
+  lines.push("");
+  lines.push("# After mapping, use 'save' in Betaflight CLI to persist changes");
+  lines.push("");
+  return lines.join("\n");
+}
+
+function showCliModal(cliText) {
+  const modal = el("cliModal");
+  const out = el("cliModalOutput");
+  if(!modal || !out) return;
+  out.textContent = cliText;
+  modal.style.display = "block";
+}
+
+function closeCliModal() {
+  const modal = el("cliModal");
+  if(modal) modal.style.display = "none";
+}
+
+function copyCliToClipboard() {
+  const out = el("cliModalOutput");
+  if(!out) return;
+  navigator.clipboard.writeText(out.textContent).then(()=>{
+    alert("CLI ถูกคัดลอกไปยังคลิปบอร์ดแล้ว — วางใน Betaflight CLI หรือไฟล์ตามต้องการ");
+  }).catch(()=>{
+    alert("คัดลอกไม่สำเร็จ ลองคัดลอกด้วยมือจากกล่อง CLI ด้านล่าง");
+  });
+}
+
+function downloadCliFile() {
+  const text = el("cliModalOutput").textContent || "";
+  const blob = new Blob([text], {type: "text/plain;charset=utf-8"});
+  const url = URL.createObjectURL(blob);
+  const a = document.createElement("a");
+  a.href = url;
+  a.download = "obix_baseline_cli.txt";
+  document.body.appendChild(a);
+  a.click();
+  a.remove();
+  URL.revokeObjectURL(url);
+}
+
+document.addEventListener("DOMContentLoaded", function(){
+  const btn = el("use-baseline-cli");
+  if(btn) btn.addEventListener('click', function(){
+    const cli = buildBaselineCLI();
+    showCliModal(cli);
+  });
+
+  el("closeCliModal")?.addEventListener("click", closeCliModal);
+  el("closeCliBtn2")?.addEventListener("click", closeCliModal);
+  el("copyCliBtn")?.addEventListener("click", copyCliToClipboard);
+  el("downloadCliBtn")?.addEventListener("click", downloadCliFile);
+});
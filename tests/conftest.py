@@ -0,0 +1,7 @@
+# tests/conftest.py
+# repo root บน sys.path (รันได้ทั้ง `pytest` และ `python -m pytest`) + import app แบบไม่ warm
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OBIX_WARM", "0")
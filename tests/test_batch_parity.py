@@ -0,0 +1,238 @@
+# tests/test_batch_parity.py
+# batch / index / schema / preset cache ต้องให้ผลเหมือนทางเดิม (scalar pipeline, linear scan)
+import json
+import math
+import random
+
+import pytest
+
+import app
+from analyzer.batch import analyze_batch
+from analyzer.drone_class import CLASS_INDEX, DRONE_CLASSES as ANALYZER_CLASSES, detect_drone_class
+from logic.inputs import BUILD_SCHEMA, normalize_build
+from logic.presets import BASELINE_CTRL, DRONE_CLASSES as PRESET_CLASSES, PRESET_CLASS_INDEX, PRESETS
+from logic.results import to_builtin
+from logic.schema import CODES, InputError
+
+BUILD_COLUMNS = ("size", "battery", "style", "weight", "prop_size", "pitch", "blades", "preset")
+
+
+def _json(obj):
+    # เทียบค่าหลัง serialize (แบบเดียวกับที่ client เห็น)
+    return json.loads(json.dumps(obj, default=to_builtin))
+
+
+def _random_builds(n, seed):
+    rng = random.Random(seed)
+    cols = {k: [] for k in BUILD_COLUMNS}
+    for _ in range(n):
+        cols["size"].append(round(rng.uniform(0.5, 12), 1))
+        cols["battery"].append(rng.choice(["1S", "2S", "3S", "4S", "5S", "6S", "8S", "12S"]))
+        cols["style"].append(rng.choice(["freestyle", "racing", "longrange", "cine", "heavy", "micro"]))
+        cols["weight"].append(float(rng.choice([rng.randint(1, 3500), round(rng.uniform(0.5, 3500), 1)])))
+        cols["prop_size"].append(round(rng.uniform(1.5, 11), 1))
+        cols["pitch"].append(round(rng.uniform(1.5, 7), 1))
+        cols["blades"].append(rng.choice([2, 3, 4, 5]))
+        cols["preset"].append(rng.choice(["", "", "", "5_freestyle", "3.5_cine"]))
+    return cols
+
+
+def _preset_builds():
+    cols = {k: [] for k in BUILD_COLUMNS}
+    for key in PRESETS:
+        for k in BUILD_COLUMNS:
+            cols[k].append(key if k == "preset" else "")
+    return cols
+
+
+def _scalar_row(a):
+    """Scalar analysis dict -> the batch result columns for that row."""
+    ft = a["flight_time"] or {}
+    effect = a["prop_result"]["effect"]
+    row = {
+        "preset_used": a["preset_used"],
+        "weight_class": a["weight_class"],
+        "thrust_ratio": a["thrust_ratio"],
+        "battery_est": a["battery_est"],
+        "flight_time": ft.get("minutes"),
+        "noise": effect["noise"],
+        "motor_load": effect["motor_load"],
+        "efficiency": effect["efficiency"],
+        "grip": effect["grip"],
+        "recommendation": a["prop_result"]["recommendation"],
+        "detected_class": a["detected_class"],
+        "confidence_score": a["confidence_score"],
+        "confidence_level": a["confidence_level"],
+        "class_top": [c["class"] for c in a["class_scores"]],
+        "class_top_score": [c["score"] for c in a["class_scores"]],
+        "class_top_share": [c["share"] for c in a["class_scores"]],
+        "warnings": a["warnings"],
+    }
+    # ไม่มีเวลาบิน (แบตที่ไม่รู้จัก) -> scalar ไม่ส่ง profile มา; batch ยังรายงาน profile ของ style
+    if ft:
+        row["flight_profile"] = ft["profile"]
+    return row
+
+
+@pytest.mark.parametrize("cols", [_random_builds(400, seed=7), _preset_builds()], ids=["random", "presets"])
+def test_analyze_batch_matches_scalar(cols):
+    batch = _json(analyze_batch(cols))
+    results = batch["results"]
+    n = len(cols["size"])
+    assert batch["count"] == n
+    for i in range(n):
+        row = {k: cols[k][i] for k in BUILD_COLUMNS}
+        scalar = _scalar_row(_json(app.build_analysis(*normalize_build(**row))))
+        got = {k: results[k][i] for k in scalar}
+        assert got == scalar, row
+        # int / float ต้องตรงกันด้วย (0 กับ 0.0 เป็น JSON คนละแบบ)
+        assert [type(v) for v in got.values()] == [type(v) for v in scalar.values()], row
+
+
+def test_baseline_follows_detected_class():
+    # class เดียวต่อ build: baseline มาจาก class ที่ drone_class_stage ตรวจเจอ ไม่ใช่ size lookup อีกตาราง
+    assert all(meta["baseline"] in BASELINE_CTRL for meta in ANALYZER_CLASSES.values())
+    cols = _random_builds(300, seed=5)
+    batch = _json(analyze_batch(cols))
+    for i in range(300):
+        row = {k: cols[k][i] for k in BUILD_COLUMNS}
+        values = normalize_build(**row)
+        a = _json(app.build_analysis(*values))
+        cls = detect_drone_class(values[0], values[3])[0]
+        assert a["detected_class"] == cls == batch["results"]["detected_class"][i], row
+        assert a["baseline_control"] == _json(BASELINE_CTRL[ANALYZER_CLASSES[cls]["baseline"]]), row
+        assert a["pid_baseline"] == batch["lookup"]["classes"][cls]["pid_baseline"], row
+        assert a["filter_baseline"] == batch["lookup"]["classes"][cls]["filter_baseline"], row
+
+
+def _linear_scan(rows, size, weight=None):
+    """The old lookup: first interval that fits, else nearest centre (lower class wins ties)."""
+    for i, (lo, hi, cap) in enumerate(rows):
+        if lo <= size <= hi and (weight is None or weight <= cap):
+            return i
+    dist = [abs((lo + hi) / 2.0 - size) for lo, hi, _ in rows]
+    return dist.index(min(dist))
+
+
+@pytest.mark.parametrize("index,rows", [
+    (CLASS_INDEX, [(m["min_size"], m["max_size"], m.get("max_weight", math.inf)) for m in ANALYZER_CLASSES.values()]),
+    (PRESET_CLASS_INDEX, [(m["size_range"][0], m["size_range"][1], math.inf) for m in PRESET_CLASSES.values()]),
+], ids=["analyzer", "presets"])
+def test_class_index_matches_linear_scan(index, rows):
+    rng = random.Random(3)
+    # ขอบ interval / จุดกึ่งกลางพอดี + ค่าสุ่ม
+    sizes = [v for lo, hi, _ in rows for v in (lo, hi, (lo + hi) / 2.0, lo - 0.05, hi + 0.05)]
+    sizes += [round(rng.uniform(0, 15), 2) for _ in range(500)]
+    weights = [rng.choice([50.0, 150.0, 300.0, 700.0, 1500.0, 5000.0]) for _ in sizes]
+
+    expected = [_linear_scan(rows, s) for s in sizes]
+    assert [index.lookup(s) for s in sizes] == expected
+    assert index.classify(sizes).tolist() == expected
+
+    expected_w = [_linear_scan(rows, s, w) for s, w in zip(sizes, weights)]
+    assert [index.lookup(s, w) for s, w in zip(sizes, weights)] == expected_w
+    assert index.classify(sizes, weights).tolist() == expected_w
+
+    assert index.score_matrix(sizes, weights).tolist() == [index.scores(s, w) for s, w in zip(sizes, weights)]
+
+
+@pytest.mark.parametrize("field,raw,code", [
+    ("size", "abc", "not_a_number"),
+    ("size", "0", "out_of_range"),
+    ("size", "61", "out_of_range"),
+    ("size", "nan", "not_finite"),
+    ("weight", "-5", "out_of_range"),
+    ("weight", "inf", "not_finite"),
+    ("battery", "four", "invalid_choice"),
+    ("style", "free style!", "invalid_choice"),
+    ("blades", "2.5", "not_an_integer"),
+    ("blades", "13", "out_of_range"),
+    ("preset", "9_unknown", "invalid_choice"),
+])
+def test_build_schema_rejects_bad_input(field, raw, code):
+    values, errors = BUILD_SCHEMA.parse({field: raw})
+    assert list(errors) == [field]
+    assert errors[field]["code"] == code
+    # batch path: same rule, reported with the row number
+    cols = {field: ["", raw]}
+    with pytest.raises(InputError) as exc:
+        analyze_batch(cols)
+    assert [(e["row"], e["field"], e["code"]) for e in exc.value.errors] == [(1, field, code)]
+
+
+BAD_STRING_CELLS = [1, 2.5, True, [1, 2], [[1, 2], [3]], {"a": 1}, " racing ", "", None, "x y"]
+
+
+@pytest.mark.parametrize("field", [name for name, f in BUILD_SCHEMA.fields.items() if f.type == "str"])
+@pytest.mark.parametrize("cells", [BAD_STRING_CELLS, ["freestyle", 1], [[[1, 2], [3]]]], ids=["mixed", "str-int", "ragged"])
+def test_string_column_matches_scalar_parse(field, cells):
+    f = BUILD_SCHEMA.fields[field]
+    values, codes = f.column(cells, len(cells))
+    parsed = [f.parse(c) for c in cells]
+    assert values.tolist() == [v for v, _ in parsed]
+    assert [CODES[c] for c in codes.tolist()] == [c for _, c in parsed]
+
+
+def test_bad_string_cells_reject_batch_rows():
+    # ragged / non-str cell = error ของแถวนั้น (InputError) ไม่ใช่ ValueError จาก numpy
+    with pytest.raises(InputError) as exc:
+        analyze_batch({"style": ["racing", [[1, 2], [3]], 1]})
+    assert [(e["row"], e["code"]) for e in exc.value.errors] == [(1, "not_a_string"), (2, "not_a_string")]
+
+
+def test_stream_survives_ragged_string_cell():
+    body = '{"style": [[1, 2], [3]]}\n{"size": 5}\n'
+    resp = app.app.test_client().post("/api/analyze/stream", data=body, content_type="application/x-ndjson")
+    lines = [json.loads(line) for line in resp.data.decode().splitlines()]
+    assert resp.status_code == 200
+    assert lines[0]["row"] == 2
+    assert lines[-1]["summary"]["reasons"] == {"style.not_a_string": 1}
+
+
+def test_stream_keeps_warned_rows():
+    # typical-range warnings are advisory: the row is analyzed like /api/analyze/batch does
+    cols = _random_builds(300, seed=11)
+    body = "".join(json.dumps({k: cols[k][i] for k in BUILD_COLUMNS}) + "\n" for i in range(300))
+    resp = app.app.test_client().post("/api/analyze/stream", data=body, content_type="application/x-ndjson")
+    lines = [json.loads(line) for line in resp.data.decode().splitlines()]
+    rows, summary = lines[:-1], lines[-1]["summary"]
+    batch = _json(analyze_batch(cols))["results"]
+
+    assert [r["row"] for r in rows] == list(range(1, 301))
+    assert [r["warnings"] for r in rows] == batch["warnings"]
+    assert [r["thrust_ratio"] for r in rows] == batch["thrust_ratio"]
+    assert summary["rejected"] == 0 and summary["accepted"] == 300
+    assert summary["warned"] == sum(1 for w in batch["warnings"] if w) > 0
+
+
+def test_build_schema_defaults_for_empty_input():
+    values, errors = BUILD_SCHEMA.parse({"size": "", "weight": None})
+    assert errors == {}
+    assert values["size"] == 5.0 and values["weight"] == 1.0 and values["preset"] == ""
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+@pytest.mark.parametrize("key", list(PRESETS))
+def test_preset_etag_and_304(client, key):
+    first = client.get(f"/api/preset/{key}")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.strip('"') == app.PRESET_RESULTS[key].etag
+    assert first.get_json()["preset_used"] == key
+
+    again = client.get(f"/api/preset/{key}", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+
+    stale = client.get(f"/api/preset/{key}", headers={"If-None-Match": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.data == first.data
+
+
+def test_unknown_preset_is_404(client):
+    assert client.get("/api/preset/nope").status_code == 404
@@ -0,0 +1,41 @@
+# tests/test_blackbox.py
+# /api/blackbox: sample_rate ที่ส่งมาต้องเป็น Hz ที่ใช้ได้ ไม่ใช่ถูกแปลงเป็น "อ่านจาก time column" เงียบ ๆ
+import numpy as np
+import pytest
+
+import app
+
+
+def _csv(rows=4096, with_time=False):
+    rng = np.random.default_rng(0)
+    gyro = rng.normal(0, 5, (rows, 3)).round(2)
+    lines = [("time (us)," if with_time else "") + "gyroADC[0],gyroADC[1],gyroADC[2]"]
+    for i, (r, p, y) in enumerate(gyro.tolist()):
+        lines.append((f"{i * 250}," if with_time else "") + f"{r},{p},{y}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+@pytest.mark.parametrize("rate", ["0", "-4000", "nan", "inf", "-inf", "fast"])
+def test_bad_sample_rate_is_400(client, rate):
+    resp = client.post(f"/api/blackbox?sample_rate={rate}", data=_csv(with_time=True), content_type="text/csv")
+    assert resp.status_code == 400
+    assert "sample_rate" in resp.get_json()["error"]
+
+
+def test_sample_rate_is_used_without_time_column(client):
+    resp = client.post("/api/blackbox?sample_rate=4000", data=_csv(), content_type="text/csv")
+    assert resp.status_code == 200, resp.get_json()
+    assert resp.get_json()["sample_rate_hz"] == 4000.0
+    # no rate and no time column: still an explicit error
+    assert client.post("/api/blackbox", data=_csv(), content_type="text/csv").status_code == 400
+
+
+def test_time_column_sets_the_rate(client):
+    resp = client.post("/api/blackbox?sample_rate=", data=_csv(with_time=True), content_type="text/csv")
+    assert resp.status_code == 200
+    assert resp.get_json()["sample_rate_hz"] == 4000.0
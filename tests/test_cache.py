@@ -0,0 +1,43 @@
+# tests/test_cache.py
+# ผลจาก cache ทั้งสอง tier ต้องเป็น AnalysisResult แบบเดียวกับที่คำนวณสด (template ใช้ analysis.pid_baseline)
+import json
+
+import app
+from logic.cache import AnalysisCache
+from logic.inputs import normalize_build
+from logic.results import AnalysisResult, to_builtin
+
+KEY = normalize_build(size=5, weight=650, battery="6S", style="freestyle", prop_size=5.1, pitch=3.5, blades=3)
+
+
+def _json(obj):
+    return json.loads(json.dumps(obj, default=to_builtin))
+
+
+def test_shared_tier_hit_is_an_analysis_result(tmp_path):
+    db = str(tmp_path / "cache.db")
+    fresh = app.build_analysis(*KEY)
+    writer = AnalysisCache(shared_path=db)
+    writer.put(KEY, fresh)
+    assert isinstance(writer.get(KEY), AnalysisResult) and writer.hits == 1
+
+    # another worker: empty LRU -> SQLite tier -> LRU
+    reader = AnalysisCache(shared_path=db)
+    for _ in range(2):
+        value = reader.get(KEY)
+        assert isinstance(value, AnalysisResult)
+        assert value.pid_baseline == value["pid_baseline"]
+        assert value.detected_class == fresh.detected_class
+        assert _json(value) == _json(fresh)
+    assert (reader.shared_hits, reader.hits, reader.misses) == (1, 1, 0)
+
+    with app.app.test_request_context():
+        assert app.render_template("index.html", analysis=value) == app.render_template("index.html", analysis=fresh)
+
+
+def test_local_only_cache_misses_without_shared_tier():
+    cache = AnalysisCache(shared_path=None)
+    assert cache.get(KEY) is None
+    value = cache.get_or_compute(KEY, lambda: app.build_analysis(*KEY))
+    assert cache.get(KEY) is value
+    assert (cache.hits, cache.shared_hits, cache.misses) == (1, 0, 2)
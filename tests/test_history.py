@@ -0,0 +1,103 @@
+# tests/test_history.py
+# HistoryStore: policy เมื่อ queue เต็ม, query / recent และ writer ที่เปิด db ไม่ได้
+import threading
+
+import pytest
+
+from logic.history import HistoryStore
+
+
+@pytest.fixture
+def stalled(monkeypatch):
+    """Writer thread waits on the returned event before draining the queue."""
+    gate = threading.Event()
+    run = HistoryStore._run
+
+    def gated(self):
+        gate.wait(5.0)
+        run(self)
+
+    monkeypatch.setattr(HistoryStore, "_run", gated)
+    return gate
+
+
+def _written_sizes(store):
+    return sorted(item["inputs"]["size"] for item in store.query(limit=1000))
+
+
+@pytest.mark.parametrize("policy,accepted,kept", [
+    ("drop_new", [True, True, True, False, False], [0, 1, 2]),
+    ("drop_oldest", [True] * 5, [2, 3, 4]),
+    ("block", [True, True, True, False, False], [0, 1, 2]),
+])
+def test_full_queue_policy(tmp_path, stalled, policy, accepted, kept):
+    store = HistoryStore(str(tmp_path / "h.db"), queue_size=3, policy=policy, block_timeout=0.01)
+    try:
+        assert [store.record("u", {"size": i}, {}) for i in range(5)] == accepted
+        assert store.stats()["depth"] == 3 and store.dropped == 2
+        stalled.set()
+        assert store.flush()
+        assert _written_sizes(store) == kept
+        stats = store.stats()
+        assert (stats["written"], stats["dropped"], stats["write_errors"], stats["max_depth"]) == (3, 2, 0, 3)
+    finally:
+        stalled.set()
+        store.close()
+
+
+def test_query_filters_and_recent(tmp_path):
+    store = HistoryStore(str(tmp_path / "h.db"), flush_interval=0.01)
+    rows = [
+        ("alice", {"size": 5.0, "preset": "5_freestyle"}, {"detected_class": "freestyle_5"}),
+        ("alice", {"size": 3.0, "preset": ""}, {"detected_class": "cine"}),
+        ("bob", {"size": 7.0, "preset": ""}, {"detected_class": "mid_lr"}),
+        ("bob", {"size": 5.5, "preset": ""}, {"detected_class": "freestyle_5"}),
+    ]
+    try:
+        for uid, inputs, analysis in rows:
+            assert store.record(uid, inputs, analysis)
+        assert store.flush()
+
+        everything = store.query(limit=1000)
+        assert len(everything) == 4
+        assert all("uid" not in item and "analysis" not in item for item in everything)
+        assert [item["ts"] for item in everything] == sorted((item["ts"] for item in everything), reverse=True)
+
+        assert sorted(i["inputs"]["size"] for i in store.query(cls="freestyle_5")) == [5.0, 5.5]
+        assert [i["inputs"]["size"] for i in store.query(preset="5_freestyle")] == [5.0]
+        assert [i["preset"] for i in store.query(preset="5_freestyle")] == ["5_freestyle"]
+        assert {i["uid"] for i in store.query(uid="bob", with_uid=True)} == {"bob"}
+        assert len(store.query(limit=2)) == 2
+
+        cut = everything[1]["ts"]
+        assert len(store.query(since=cut)) + len(store.query(until=cut)) == 4
+        assert store.query(since=everything[0]["ts"] + 1) == []
+
+        recent = store.recent("alice")
+        assert sorted(i["inputs"]["size"] for i in recent) == [3.0, 5.0]
+        assert all("uid" not in i and i["analysis"]["detected_class"] == i["class"] for i in recent)
+    finally:
+        store.close()
+
+
+def test_disabled_store_is_a_no_op():
+    store = HistoryStore(None)
+    assert not store.enabled
+    assert store.record("u", {"size": 5}, {}) is False
+    assert store.query() == [] and store.recent("u") == []
+    assert store.stats()["enqueued"] == 0
+
+
+def test_unopenable_db_counts_write_errors(tmp_path, caplog):
+    store = HistoryStore(str(tmp_path / "missing" / "h.db"), flush_interval=0.01)
+    try:
+        for i in range(3):
+            assert store.record("u", {"size": i}, {})
+        # the writer keeps draining: flush() does not hang on a dead thread
+        assert store.flush(timeout=2.0)
+        stats = store.stats()
+        assert (stats["written"], stats["write_errors"]) == (0, 3)
+        assert store._writer.is_alive()
+        assert "history db" in caplog.text
+    finally:
+        store.close()
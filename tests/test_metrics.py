@@ -0,0 +1,42 @@
+# tests/test_metrics.py
+# worker ที่ออกไปแล้ว: counter / histogram ต้องยังอยู่ในผลรวมของ /metrics (ไม่เห็นเป็น counter reset)
+import json
+import os
+
+from logic.metrics import RETIRED, Metrics, retire_snapshot, snapshot_path
+
+
+def _worker(directory, pid, requests, seconds):
+    m = Metrics(directory=str(directory))
+    m.inc("obix_requests_total", (("endpoint", "index"),), requests)
+    m.observe("obix_request_seconds", seconds, (("endpoint", "index"),))
+    m.add_collector(lambda: {"obix_cache_hit_ratio_local": 0.5})  # not a *_total: a gauge
+    snap = m.snapshot()
+    path = snapshot_path(str(directory), pid)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snap, f)
+    return path
+
+
+def test_retired_worker_totals_survive(tmp_path):
+    first = _worker(tmp_path, 101, 3, 0.002)
+    _worker(tmp_path, 102, 4, 0.02)
+    scrape = Metrics(directory=str(tmp_path))
+    before = scrape.render()
+    assert 'obix_requests_total{endpoint="index"} 7' in before
+
+    retire_snapshot(str(tmp_path), 101)
+    retire_snapshot(str(tmp_path), 101)  # second call (no file left) changes nothing
+    assert not os.path.exists(first)
+    assert os.path.exists(tmp_path / RETIRED)
+
+    after = scrape.render()
+    assert 'obix_requests_total{endpoint="index"} 7' in after
+    assert 'obix_request_seconds_count{endpoint="index"} 2' in after
+    # gauges of the dead worker are dropped, the live one's stay
+    assert "obix_cache_hit_ratio_local 1\n" in before
+    assert "obix_cache_hit_ratio_local 0.5\n" in after
+
+    _worker(tmp_path, 103, 5, 0.002)
+    retire_snapshot(str(tmp_path), 103)
+    assert 'obix_requests_total{endpoint="index"} 12' in scrape.render()
@@ -0,0 +1,50 @@
+# tests/test_parallel.py
+# ParallelExecutor ต้องให้ผลเท่ากับทางเดียว core ทั้ง bulk (--workers) และ /api/sweep
+import io
+import json
+
+import numpy as np
+import pytest
+
+from analyzer.sweep import sweep_json
+from logic.bulk import run
+from logic.parallel import ParallelExecutor
+
+
+@pytest.fixture(scope="module")
+def executor():
+    with ParallelExecutor(2) as ex:
+        yield ex
+
+
+def test_sweep_json_parallel_matches_single_core(executor):
+    spec = {"weight": {"start": 100, "stop": 2000, "step": 10}, "pitch": [3, 4, 5], "battery": ["4S", "6S", "12S"]}
+    calls = []
+
+    def get_executor():
+        calls.append(1)
+        return executor
+
+    assert sweep_json(spec, get_executor, parallel_points=100) == sweep_json(spec)
+    assert calls == [1]
+    # below the threshold the pool is never asked for
+    sweep_json(spec, get_executor, parallel_points=10 ** 6)
+    assert calls == [1]
+
+
+def test_bulk_workers_match_single_core():
+    rng = np.random.default_rng(4)
+    lines = [
+        json.dumps({"size": round(float(rng.uniform(1, 10)), 1), "weight": int(rng.integers(50, 3000)),
+                    "battery": str(rng.choice(["3S", "4S", "6S", "9S"])), "style": str(rng.choice(["racing", "cine"])),
+                    "prop_size": round(float(rng.uniform(1, 10)), 1), "pitch": round(float(rng.uniform(2, 6.5)), 1),
+                    "blades": int(rng.choice([2, 3, 4]))})
+        for _ in range(3000)
+    ]
+    outputs = []
+    for workers in (1, 2):
+        dst = io.StringIO()
+        run(io.StringIO("\n".join(lines)), dst, "ndjson", "ndjson", 1024, workers)
+        outputs.append(dst.getvalue().splitlines()[:-1])  # last line = summary (timings)
+    assert outputs[0] == outputs[1]
+    assert len(outputs[0]) > 0
@@ -0,0 +1,112 @@
+# tests/test_profiler.py
+# RequestProfiler: เลือก request (secret header / sample), เขียนไฟล์ครบชุด, หมุนเก็บแค่ keep และ /api/profiles ปฏิเสธ id แปลก ๆ
+import json
+import os
+import pstats
+
+import pytest
+from werkzeug.test import Client
+
+import app
+from logic.profiler import HEADER, ID_HEADER, RequestProfiler
+
+SECRET = "s3cret"
+PATH = "/api/preset/2.5_micro"
+
+
+def _files(directory):
+    return sorted(os.listdir(directory))
+
+
+def _client(profiler):
+    return Client(profiler.wrap(app.app.wsgi_app))
+
+
+def test_authorized_needs_the_exact_secret(tmp_path):
+    prof = RequestProfiler(str(tmp_path), secret=SECRET)
+    assert prof.authorized(SECRET)
+    assert not prof.authorized(None) and not prof.authorized("") and not prof.authorized(SECRET + "x")
+    assert not RequestProfiler(str(tmp_path)).authorized(SECRET)
+
+
+@pytest.mark.parametrize("path,headers,sample,trigger", [
+    (PATH, {HEADER: SECRET}, 0.0, "header"),
+    (PATH, {HEADER: "wrong"}, 0.0, None),
+    (PATH, {}, 0.0, None),
+    (PATH, {}, 1.0, "sample"),
+    ("/metrics", {HEADER: SECRET}, 1.0, None),         # outside the prefixes
+    ("/api/profiles", {HEADER: SECRET}, 1.0, None),    # the profile listing itself
+])
+def test_trigger(tmp_path, path, headers, sample, trigger):
+    prof = RequestProfiler(str(tmp_path), secret=SECRET, sample=sample)
+    environ = {"PATH_INFO": path, **{"HTTP_" + k.upper().replace("-", "_"): v for k, v in headers.items()}}
+    assert prof.trigger(environ) == trigger
+
+
+def test_wrap_writes_a_complete_profile(tmp_path):
+    prof = RequestProfiler(str(tmp_path), secret=SECRET)
+    client = _client(prof)
+
+    plain = client.get(PATH)
+    assert plain.status_code == 200 and ID_HEADER not in plain.headers
+    assert _files(tmp_path) == []
+
+    resp = client.get(PATH + "?x=1", headers={HEADER: SECRET}, buffered=True)
+    assert resp.status_code == 200
+    profile_id = resp.headers[ID_HEADER]
+    assert _files(tmp_path) == [f"{profile_id}.{ext}" for ext in ("collapsed", "json", "pstats")]
+    assert prof.written == 1
+
+    meta = json.loads((tmp_path / f"{profile_id}.json").read_text(encoding="utf-8"))
+    assert (meta["id"], meta["method"], meta["path"], meta["query"]) == (profile_id, "GET", PATH, "x=1")
+    assert (meta["status"], meta["trigger"]) == (200, "header") and meta["ms"] >= 0
+    assert pstats.Stats(str(tmp_path / f"{profile_id}.pstats")).total_calls > 0
+    lines = (tmp_path / f"{profile_id}.collapsed").read_text(encoding="utf-8").splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert prof.list() == [meta]
+
+
+def test_rotation_keeps_the_newest(tmp_path):
+    prof = RequestProfiler(str(tmp_path), sample=1.0, keep=2)
+    client = _client(prof)
+    ids = [client.get(PATH, buffered=True).headers[ID_HEADER] for _ in range(4)]
+    assert prof.written == 4
+    assert [m["id"] for m in prof.list()] == ids[:1:-1]
+    assert len(_files(tmp_path)) == 2 * 3
+
+
+def test_file_validates_id_and_format(tmp_path):
+    prof = RequestProfiler(str(tmp_path), sample=1.0)
+    profile_id = _client(prof).get(PATH, buffered=True).headers[ID_HEADER]
+    assert prof.file(profile_id, "pstats") == str(tmp_path / f"{profile_id}.pstats")
+    assert prof.file(profile_id, "collapsed") is not None
+    assert prof.file(profile_id, "json") is None            # meta is served by the listing only
+    assert prof.file(profile_id, "exe") is None
+    for bad in ("", "..", "../" + profile_id, profile_id + "/x", "a b", "x" * 65):
+        assert prof.file(bad, "pstats") is None
+    assert prof.file("missing", "pstats") is None
+
+
+@pytest.fixture
+def profiles(tmp_path, monkeypatch):
+    prof = RequestProfiler(str(tmp_path), secret=SECRET, sample=1.0)
+    profile_id = _client(prof).get(PATH, buffered=True).headers[ID_HEADER]
+    monkeypatch.setattr(app, "PROFILER", prof)
+    return app.app.test_client(), profile_id
+
+
+def test_profile_route_serves_valid_ids(profiles):
+    client, profile_id = profiles
+    resp = client.get(f"/api/profiles/{profile_id}.pstats", headers={HEADER: SECRET})
+    assert resp.status_code == 200 and resp.data
+    assert client.get(f"/api/profiles/{profile_id}.pstats").status_code == 404   # no secret
+    listing = client.get("/api/profiles", headers={HEADER: SECRET}).get_json()
+    assert [p["id"] for p in listing["profiles"]] == [profile_id]
+
+
+@pytest.mark.parametrize("name", ["a%20b.pstats", "..%2Fsecret.pstats", "x.json", "x.exe", f"{'x' * 65}.pstats",
+                                  "%2E%2E.collapsed"])
+def test_profile_route_rejects_bad_ids(profiles, name):
+    client, _ = profiles
+    resp = client.get(f"/api/profiles/{name}", headers={HEADER: SECRET})
+    assert resp.status_code == 404
@@ -0,0 +1,119 @@
+# tests/test_rules.py
+# golden: กฎ validate / doctor ใน data/rules.json ต้องให้ผลเหมือน if/elif เดิมก่อนย้ายมาเป็นตาราง
+# (collect ทีละ build และ masks ทีละ column) บน grid ที่รวมขอบช่วง, NaN และ inf
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from logic import doctor
+from logic.results import RowMessages
+from logic.rules import RULES
+
+NAN, INF = math.nan, math.inf
+
+# ข้อความ size / weight เปลี่ยนเป็น "ช่วงที่ใช้ทั่วไป" ภายหลัง (เงื่อนไขเดิม) -> แปลงข้อความเก่าเป็นข้อความปัจจุบัน
+REWORDED = {
+    "ขนาดโดรนควรอยู่ระหว่าง 1–10 นิ้ว": RULES["warn_size"].outcomes[0]["warn"],
+    "น้ำหนักโดรนควรอยู่ระหว่าง 1–3000 กรัม": RULES["warn_weight"].outcomes[0]["warn"],
+}
+
+
+def old_validate_input(size, weight, prop_size, pitch, blades):
+    """app.validate_input() before the rule table (verbatim)."""
+    warnings = []
+
+    if not (1 <= size <= 10):
+        warnings.append("ขนาดโดรนควรอยู่ระหว่าง 1–10 นิ้ว")
+
+    if weight <= 0 or weight > 3000:
+        warnings.append("น้ำหนักโดรนควรอยู่ระหว่าง 1–3000 กรัม")
+
+    if prop_size > size:
+        warnings.append("ขนาดใบพัดใหญ่กว่าขนาดโดรน อาจติดเฟรม")
+
+    if not (2.0 <= pitch <= 6.5):
+        warnings.append("Pitch ใบพัดอยู่นอกช่วงที่ใช้ทั่วไป")
+
+    if blades not in [2, 3, 4]:
+        warnings.append("จำนวนใบพัดผิดปกติ")
+
+    return [REWORDED.get(w, w) for w in warnings]
+
+
+def old_doctor_advice(size, battery, style):
+    """logic.doctor.analyze() before the rule table, as a list."""
+    advice = []
+
+    size = int(size)
+
+    if size >= 5:
+        advice.append("เหมาะกับการปรับ PID แบบไม่แข็งเกิน เพื่อประหยัดมอเตอร์")
+    else:
+        advice.append("โดรนเล็ก ควรเน้น Filter มากกว่าดัน PID")
+
+    if battery == "6S":
+        advice.append("แนะนำ Throttle Limit 85–90% ลด heat")
+    else:
+        advice.append("4S คุม Throttle curve ให้เนียน จะบินได้นานขึ้น")
+
+    if style == "freestyle":
+        advice.append("ลด D-term นิดหน่อย จะคุมคันง่าย")
+    elif style == "longrange":
+        advice.append("เพิ่ม Filter + ลด RPM noise จะประหยัดแบต")
+    else:
+        advice.append("เน้น Smooth → ลด Feedforward")
+
+    return advice
+
+
+VALIDATE_GRID = {
+    "size": [NAN, -INF, 0.0, 0.99, 1.0, 1.0001, 5.0, 9.99, 10.0, 10.01, 60.0, INF],
+    "weight": [NAN, -1.0, 0.0, 0.5, 1.0, 650.0, 3000.0, 3000.5, INF],
+    "prop_size": [NAN, 0.5, 5.0, 5.01, 12.0],
+    "pitch": [NAN, 1.99, 2.0, 4.0, 6.5, 6.51],
+    "blades": [NAN, 1.0, 2.0, 2.5, 3.0, 4.0, 5.0],
+}
+DOCTOR_GRID = {
+    "size": [0.5, 1.0, 4.0, 4.99, 5.0, 5.5, 7.0, 60.0],
+    "battery": ["6S", "4S", "1S", "6s", ""],
+    "style": ["freestyle", "longrange", "racing", "cine", "Freestyle", ""],
+}
+
+
+def _grid(spec):
+    names = list(spec)
+    return names, list(itertools.product(*spec.values()))
+
+
+def _columns(names, rows):
+    return {name: np.array([r[i] for r in rows]) for i, name in enumerate(names)}
+
+
+def test_validate_collect_matches_old_chain():
+    names, rows = _grid(VALIDATE_GRID)
+    for row in rows:
+        assert RULES.collect("validate", dict(zip(names, row)), "warn") == old_validate_input(*row), row
+
+
+def test_validate_masks_match_old_chain():
+    names, rows = _grid(VALIDATE_GRID)
+    got = RowMessages(len(rows), RULES.masks("validate", _columns(names, rows), "warn")).to_lists()
+    assert got == [old_validate_input(*row) for row in rows]
+
+
+@pytest.mark.parametrize("as_int", [True, False], ids=["int-size", "float-size"])
+def test_doctor_matches_old_chain(as_int):
+    names, rows = _grid(DOCTOR_GRID)
+    builds = [dict(zip(names, row)) for row in rows]
+    if as_int:
+        # logic.doctor.analyze() truncates the size like the old code did
+        for b in builds:
+            b["size"] = int(b["size"])
+    expected = [old_doctor_advice(*row) for row in rows]
+    assert [RULES.collect("doctor", b, "advice") for b in builds] == expected
+    columns = {k: np.array([b[k] for b in builds]) for k in names}
+    assert RowMessages(len(rows), RULES.masks("doctor", columns, "advice")).to_lists() == expected
+    if as_int:
+        assert [doctor.analyze(*row) for row in rows] == ["\n".join(f"- {x}" for x in e) for e in expected]
@@ -0,0 +1,87 @@
+# tests/test_stages.py
+# StageGraph.delta: คำนวณใหม่เฉพาะ stage ที่อยู่ปลายทางของ field ที่เปลี่ยน และ patch = ผลเต็มของ build ใหม่
+import json
+
+import pytest
+
+import app
+from logic.inputs import normalize_build
+from logic.results import to_builtin
+from logic.stages import Stage, StageGraph
+
+
+def _json(obj):
+    return json.loads(json.dumps(obj, default=to_builtin))
+
+
+def _counting_graph(calls):
+    def stage(name, *outputs):
+        def fn(*args):
+            calls.append(name)
+            return {out: (name, args) for out in outputs}
+        return fn
+
+    return StageGraph(("a", "b", "c"), [
+        Stage("s_a", ("a",), ("x",), stage("s_a", "x")),
+        Stage("s_b", ("b",), ("y",), stage("s_b", "y")),
+        Stage("s_ab", ("s_a", "s_b"), ("z",), stage("s_ab", "z")),
+        Stage("s_c", ("c",), ("w",), stage("s_c", "w")),
+    ])
+
+
+def test_delta_recomputes_only_downstream_stages():
+    calls = []
+    graph = _counting_graph(calls)
+    graph.run({"a": 1, "b": 1, "c": 1})
+    assert calls == ["s_a", "s_b", "s_ab", "s_c"]
+
+    calls.clear()
+    res = graph.delta({"a": 1, "b": 2, "c": 1}, ["b"])
+    assert res["stages"] == ["s_b", "s_ab"]
+    assert calls == ["s_b", "s_ab"]
+    assert set(res["patch"]) == {"y", "z"}
+    assert res["patch"]["y"] == ("s_b", (2,))
+
+    # same inputs again: all memo hits
+    calls.clear()
+    graph.delta({"a": 1, "b": 2, "c": 1}, ["b"])
+    assert calls == []
+    assert graph.affected(["c"]) == ["s_c"]
+
+
+def test_affected_rejects_unknown_fields():
+    graph = _counting_graph([])
+    with pytest.raises(ValueError, match="unknown field"):
+        graph.affected(["b", "nope", 1])
+
+
+BASE = {"size": 5.0, "battery": "4S", "style": "freestyle", "weight": 750.0,
+        "prop_size": 5.0, "pitch": 4.0, "blades": 3, "preset": ""}
+
+
+@pytest.mark.parametrize("changes", [
+    {"pitch": 4.6},
+    {"blades": 2},
+    {"weight": 1300.0},
+    {"size": 7.0, "prop_size": 7.0},
+    {"battery": "6S", "style": "racing"},
+])
+def test_delta_patch_equals_full_analysis(changes):
+    old = _json(app.build_analysis(*normalize_build(**BASE)))
+    new_inputs = {**BASE, **changes}
+    new_key = normalize_build(**new_inputs)
+    res = app.PIPELINE.delta(app._build(*new_key), list(changes))
+
+    assert set(res["stages"]) == set(app.PIPELINE.affected(changes))
+    patched = {**old, **_json(res["patch"])}
+    assert patched == _json(app.build_analysis(*new_key))
+
+
+def test_delta_route_rejects_bad_changed():
+    client = app.app.test_client()
+    for changed in ([1], ["pitch", None], "pitch", ["bogus"]):
+        resp = client.post("/api/analyze/delta", json={"inputs": BASE, "changed": changed})
+        assert resp.status_code == 400, changed
+    resp = client.post("/api/analyze/delta", json={"inputs": {**BASE, "pitch": 4.6}, "changed": ["pitch"]})
+    assert resp.status_code == 200
+    assert "prop_result" in resp.get_json()["patch"]
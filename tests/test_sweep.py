@@ -0,0 +1,28 @@
+# tests/test_sweep.py
+# /api/sweep: จำนวนจุดต้องถูกเช็คก่อนสร้าง axis ใด ๆ
+import pytest
+
+import app
+from analyzer.sweep import MAX_SWEEP_POINTS, axis_values, sweep, sweep_points
+
+
+@pytest.mark.parametrize("spec,error", [
+    ({"weight": {"start": 1, "stop": 3e7, "step": 1}}, "30000000 points"),
+    ({"weight": {"start": 1, "stop": 1e15}}, "points"),
+    ({"weight": {"start": 0, "stop": 1e308, "step": 1e-300}}, "too many points"),
+    ({"weight": {"start": 1, "stop": "inf"}}, "finite"),
+    ({"pitch": {"start": 2, "stop": 5, "step": "nan"}}, "finite"),
+    ({"prop_size": {"start": 5, "stop": 4}}, "stop >= start"),
+])
+def test_sweep_rejects_before_allocating(spec, error):
+    resp = app.app.test_client().post("/api/sweep", json=spec)
+    assert resp.status_code == 400
+    assert error in resp.get_json()["error"]
+
+
+def test_sweep_points_matches_grid():
+    spec = {"weight": {"start": 100, "stop": 1000, "step": 100}, "pitch": [3, 4, 5], "battery": ["4S", "6S"]}
+    res = sweep(spec)
+    assert sweep_points(spec) == res["points"] == 10 * 3 * 2
+    assert len(axis_values(spec["weight"], "weight")) == 10
+    assert sweep_points({"weight": {"start": 1, "stop": MAX_SWEEP_POINTS}}) == MAX_SWEEP_POINTS